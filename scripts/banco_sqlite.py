@@ -0,0 +1,253 @@
+# Banco SQLite local do BanVic: fato e dimensões com índices, e os resumos como views SQL
+# Autor: Nayara Vieira
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from cubo_transacoes import recuar_meses, MESES_RESUMO_AGENCIAS
+
+# Arquivo do banco, gravado em dados/processed junto dos CSVs
+ARQUIVO_BANCO = 'banvic.db'
+
+# Linhas por executemany; cada carga inteira roda numa transação só
+LOTE_INSERCAO = 50_000
+
+TABELA_FATO = 'fato_transacoes'
+
+# Tabela de uma linha com os parâmetros das views, recalculada a cada carga da fato
+TABELA_PARAMETROS = 'parametros_resumos'
+
+# Índices da tabela fato (as colunas usadas nos filtros das consultas)
+INDICES_FATO = {
+    'idx_fato_data': 'data_transacao',
+    'idx_fato_conta': 'num_conta',
+    'idx_fato_agencia': 'cod_agencia',
+    'idx_fato_cliente': 'cod_cliente',
+}
+
+# Chave primária de cada dimensão
+CHAVES_DIMENSOES = {
+    'dim_clientes': 'cod_cliente',
+    'dim_agencias': 'cod_agencia',
+    'dim_datas': 'data',
+    'dim_colaboradores': 'cod_colaborador',
+}
+
+# Resumos definidos em SQL (mesmas regras dos CSVs de resumo do ETL).
+# As datas ficam como texto ISO ('AAAA-MM-DD HH:MM:SS.ffffff'), então comparar
+# e recortar (substr) o texto é o mesmo que comparar as datas.
+VIEWS = {
+    'vw_transacoes_diarias': f"""
+        SELECT substr(data_transacao, 1, 10) AS data, cod_agencia, tipo_cliente,
+               COUNT(cod_transacao) AS qtd, COUNT(valor_transacao) AS n_valor,
+               SUM(valor_transacao) AS soma
+        FROM {TABELA_FATO}
+        WHERE data_transacao IS NOT NULL
+        GROUP BY 1, 2, 3""",
+    'vw_resumo_dias_semana': f"""
+        SELECT dia_semana_pt, COUNT(cod_transacao) AS Qtd_Transacoes,
+               ROUND(SUM(valor_transacao), 2) AS Volume_Total,
+               ROUND(AVG(valor_transacao), 2) AS Valor_Medio
+        FROM {TABELA_FATO}
+        WHERE dia_semana_pt IS NOT NULL
+        GROUP BY dia_semana_pt""",
+    'vw_resumo_meses_tipo': f"""
+        SELECT mes_tipo, COUNT(cod_transacao) AS Qtd_Transacoes,
+               ROUND(SUM(valor_transacao), 2) AS Volume_Total,
+               ROUND(AVG(valor_transacao), 2) AS Valor_Medio
+        FROM {TABELA_FATO}
+        GROUP BY mes_tipo""",
+    # Últimos 6 meses em dias inteiros, contados do último dia com transação. O início vem
+    # de parametros_resumos, calculado em Python igual ao resumo_agencias_6m.csv: o date()
+    # do SQLite não prende no fim do mês (31/12 - 6 meses viraria 01/07, não 30/06)
+    'vw_resumo_agencias_6m': f"""
+        SELECT f.cod_agencia, a.nome AS nome_agencia, COUNT(f.cod_transacao) AS Qtd_Transacoes,
+               ROUND(SUM(f.valor_transacao), 2) AS Volume_Total,
+               ROUND(AVG(f.valor_transacao), 2) AS Valor_Medio
+        FROM {TABELA_FATO} f
+        JOIN dim_agencias a ON a.cod_agencia = f.cod_agencia
+        WHERE f.data_transacao >= (SELECT inicio_resumo_agencias FROM {TABELA_PARAMETROS})
+        GROUP BY f.cod_agencia, a.nome
+        ORDER BY Qtd_Transacoes DESC""",
+}
+
+def arquivo_banco(processed_path):
+    return Path(processed_path) / ARQUIVO_BANCO
+
+def conectar(caminho, somente_leitura=False):
+    """
+    Abre o banco. Para leitura usa o modo read-only do SQLite (vários leitores
+    ao mesmo tempo, sem risco de alterar o arquivo).
+    """
+    if somente_leitura:
+        return sqlite3.connect(f"file:{Path(caminho).as_posix()}?mode=ro", uri=True)
+    conexao = sqlite3.connect(caminho)
+    # Carga em lote: WAL e sincronização normal deixam os inserts bem mais rápidos
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.execute("PRAGMA synchronous=NORMAL")
+    return conexao
+
+def _tipo_sql(serie):
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(serie):
+        return 'REAL'
+    return 'TEXT'
+
+def _colunas_sql(df):
+    """Colunas em tipos que o sqlite3 entende: datas em texto ISO e ausentes como None."""
+    colunas = []
+    for nome in df.columns:
+        serie = df[nome]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            if serie.dt.tz is not None:
+                serie = serie.dt.tz_convert('UTC').dt.tz_localize(None)
+            valores = serie.to_numpy(dtype='datetime64[us]')
+            # Datas sem horário (dimensões, cubo) ficam só como AAAA-MM-DD
+            so_dia = bool((serie.dropna() == serie.dropna().dt.normalize()).all())
+            texto = np.datetime_as_string(valores, unit='D' if so_dia else 'us')
+            texto = np.char.replace(texto, 'T', ' ').astype(object)
+            texto[np.isnat(valores)] = None
+            colunas.append(texto)
+        else:
+            # Inteiros, floats, textos e categorias viram tipos do Python; NaN/NA viram NULL
+            colunas.append(serie.to_numpy(dtype=object, na_value=None))
+    return colunas
+
+def criar_tabela(conexao, nome, df, chave=None):
+    """(Re)cria a tabela com as colunas de `df`; `chave` vira PRIMARY KEY."""
+    definicoes = []
+    for coluna in df.columns:
+        definicao = f'"{coluna}" {_tipo_sql(df[coluna])}'
+        if coluna == chave:
+            definicao += ' PRIMARY KEY'
+        definicoes.append(definicao)
+    conexao.execute(f'DROP TABLE IF EXISTS "{nome}"')
+    conexao.execute(f'CREATE TABLE "{nome}" ({", ".join(definicoes)})')
+
+def inserir(conexao, nome, df):
+    """Insere `df` em lotes de LOTE_INSERCAO linhas (quem chama controla a transação)."""
+    marcadores = ', '.join('?' * len(df.columns))
+    colunas = ', '.join(f'"{c}"' for c in df.columns)
+    comando = f'INSERT INTO "{nome}" ({colunas}) VALUES ({marcadores})'
+    for inicio in range(0, len(df), LOTE_INSERCAO):
+        parte = df.iloc[inicio:inicio + LOTE_INSERCAO]
+        conexao.executemany(comando, zip(*_colunas_sql(parte)))
+    return len(df)
+
+def carregar_tabela(conexao, nome, df, chave=None):
+    """Recria a tabela e carrega `df` numa única transação."""
+    with conexao:
+        criar_tabela(conexao, nome, df, chave)
+        inserir(conexao, nome, df)
+
+def parametros_resumos(conexao):
+    """Linha de parametros_resumos a partir da fato: último dia com transação e início da janela por agência."""
+    ultimo_dia = conexao.execute(f'SELECT MAX(substr(data_transacao, 1, 10)) FROM {TABELA_FATO}').fetchone()[0]
+    inicio = None if ultimo_dia is None else recuar_meses(ultimo_dia, MESES_RESUMO_AGENCIAS)
+    return pd.DataFrame({
+        'ultimo_dia': [ultimo_dia],
+        'inicio_resumo_agencias': [None if inicio is None else inicio.strftime('%Y-%m-%d')],
+    })
+
+def criar_indices_e_views(conexao):
+    """Índices da fato (criados depois da carga, que é mais rápido), os parâmetros e as views de resumo."""
+    carregar_tabela(conexao, TABELA_PARAMETROS, parametros_resumos(conexao))
+    with conexao:
+        for indice, coluna in INDICES_FATO.items():
+            conexao.execute(f'CREATE INDEX IF NOT EXISTS {indice} ON {TABELA_FATO} ("{coluna}")')
+        for view, sql in VIEWS.items():
+            conexao.execute(f'DROP VIEW IF EXISTS {view}')
+            conexao.execute(f'CREATE VIEW {view} AS {sql}')
+    conexao.execute('ANALYZE')
+
+class CargaFato:
+    """
+    Carga da tabela fato em blocos (modo streaming e incremental): a tabela é
+    criada no primeiro bloco (ou recebe os blocos no fim, com anexar=True) e tudo
+    fica numa transação, confirmada em finalizar() junto com índices e views.
+    """
+
+    def __init__(self, caminho, anexar=False):
+        self.conexao = conectar(caminho)
+        self.criada = anexar
+        self.linhas = 0
+        self.conexao.execute('BEGIN')
+        if not anexar:
+            # Índices antigos atrasariam a carga: saem agora e voltam em finalizar()
+            for indice in INDICES_FATO:
+                self.conexao.execute(f'DROP INDEX IF EXISTS {indice}')
+
+    def adicionar(self, bloco):
+        if not self.criada:
+            criar_tabela(self.conexao, TABELA_FATO, bloco)
+            self.criada = True
+        self.linhas += inserir(self.conexao, TABELA_FATO, bloco)
+
+    def finalizar(self, dimensoes=None):
+        """Confirma a fato, (re)carrega as dimensões/cubo de `dimensoes` (nome → df) e cria índices e views."""
+        self.conexao.commit()
+        for nome, df in (dimensoes or {}).items():
+            carregar_tabela(self.conexao, nome, df, CHAVES_DIMENSOES.get(nome))
+        if self.criada:
+            criar_indices_e_views(self.conexao)
+        self.conexao.close()
+        return self.linhas
+
+    def cancelar(self):
+        self.conexao.rollback()
+        self.conexao.close()
+
+def salvar_banco(processed_path, fato, dimensoes):
+    """Grava o banco inteiro de uma vez (tabela fato em memória + dimensões). Retorna o caminho."""
+    caminho = arquivo_banco(processed_path)
+    carga = CargaFato(caminho)
+    try:
+        carga.adicionar(fato)
+    except Exception:
+        carga.cancelar()
+        raise
+    carga.finalizar(dimensoes)
+    return caminho
+
+def consultar_sql(caminho, sql, parametros=()):
+    """Roda uma consulta SQL qualquer no banco (somente leitura) e devolve um DataFrame."""
+    with closing(conectar(caminho, somente_leitura=True)) as conexao:
+        return pd.read_sql_query(sql, conexao, params=parametros)
+
+def transacoes_filtradas(caminho, inicio=None, fim=None, agencias=None, clientes=None, contas=None, colunas=None):
+    """
+    Só as transações que passam nos filtros, direto do banco (usando os índices),
+    sem carregar a tabela inteira. `inicio`/`fim` são datas (inclusive, por dia);
+    agencias/clientes/contas são listas de códigos.
+    """
+    condicoes, parametros = [], []
+    if inicio is not None:
+        condicoes.append('data_transacao >= ?')
+        parametros.append(pd.Timestamp(inicio).strftime('%Y-%m-%d'))
+    if fim is not None:
+        condicoes.append('data_transacao < ?')
+        parametros.append((pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+    for coluna, valores in (('cod_agencia', agencias), ('cod_cliente', clientes), ('num_conta', contas)):
+        if valores is not None:
+            valores = list(valores)
+            condicoes.append(f"{coluna} IN ({', '.join('?' * len(valores))})")
+            parametros.extend(int(v) for v in valores)
+    
+    selecao = ', '.join(f'"{c}"' for c in colunas) if colunas else '*'
+    sql = f'SELECT {selecao} FROM {TABELA_FATO}'
+    if condicoes:
+        sql += ' WHERE ' + ' AND '.join(condicoes)
+    tabela = consultar_sql(caminho, sql, parametros)
+    if 'data_transacao' in tabela.columns:
+        tabela['data_transacao'] = pd.to_datetime(tabela['data_transacao'], format='ISO8601')
+    return tabela
+
+def ler_view(caminho, view):
+    """Lê uma das views de resumo (VIEWS)."""
+    if view not in VIEWS:
+        raise ValueError(f"View desconhecida: {view} (use {list(VIEWS)})")
+    return consultar_sql(caminho, f'SELECT * FROM {view}')
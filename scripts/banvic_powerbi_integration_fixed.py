@@ -5,60 +5,632 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
+import io
 import os
+import argparse
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import warnings
+from date_normalization import normalizar_datas
+from parquet_io import salvar_parquet, limpar_parquet
+from etl_state import hash_arquivo, carregar_estado, salvar_estado
+from dimension_lookup import criar_indices_dimensoes
+from banvic_schema import ler_tabela
+from calendario import DIAS_PT, MESES_PT, obter_calendario
+from cubo_transacoes import (montar_cubo, combinar_cubos, salvar_cubo, ler_cubo, arquivo_cubo,
+                             consultar, inicio_janela, resumo_executivo, MESES_RESUMO_AGENCIAS)
+from ranking_janelas import SomasAcumuladas, JANELAS_PADRAO, rankings_por_janela, ranking_por_periodo
+from perfil_execucao import etapa, iniciar_perfil, finalizar_perfil, PASTA_RELATORIOS
+from banco_sqlite import CargaFato, arquivo_banco
+from validacao_dados import validar_pasta, linhas_rejeitadas, ARQUIVO_REJEITADOS
+from produtividade import (criar_produtividade, ler_produtividade_anterior, TABELA_PRODUTIVIDADE,
+                           TABELA_COLABORADORES, TABELA_PRODUTIVIDADE_AGENCIAS)
+from perfil_clientes import PerfilClientes, ler_perfil_anterior
 warnings.filterwarnings('ignore')
 
+# Pastas padrão, relativas à raiz do projeto (podem ser trocadas por parâmetro/linha de comando)
+RAIZ_PROJETO = Path(__file__).resolve().parent.parent
+PASTA_ENTRADA_PADRAO = RAIZ_PROJETO / "dados" / "raw" / "banvic_data"
+PASTA_SAIDA_PADRAO = RAIZ_PROJETO / "dados" / "processed"
+
+# Cache do calendário em dados/processed (estendido quando aparecem datas novas)
+ARQUIVO_CALENDARIO = 'calendario.csv'
+
+# Formatos de saída aceitos em dados/processed ('ambos' grava CSV e Parquet)
+FORMATOS_SAIDA = ('csv', 'parquet', 'ambos')
+
+# Modo incremental: se alguma dimensão mudar, o ETL refaz tudo do zero
+ARQUIVOS_DIMENSAO = ['contas.csv', 'clientes.csv', 'agencias.csv']
+ARQUIVO_ESTADO = 'etl_estado.json'
+BLOCO_INCREMENTAL = 500_000
+
+# Modo paralelo: transacoes.csv é dividido em PARTES_POR_PROCESSO faixas de bytes por processo
+PARTES_POR_PROCESSO = 2
+
 def safe_date_conversion(date_series, column_name="data"):
     """
-    Converte uma coluna de data para o formato datetime, tentando vários formatos.
+    Converte uma coluna de data para o formato datetime usando os formatos conhecidos do BanVic.
     """
     print(f"  🔄 Processando {column_name}...")
     
-    # Tenta converter a data de forma automática, que é mais rápido
+    # Conversão vetorizada, formato a formato (ver date_normalization.py)
+    converted, rejeitadas = normalizar_datas(date_series)
+    valid_count = converted.notna().sum()
+    print(f"  ✅ {column_name}: {valid_count}/{len(date_series)} datas convertidas com sucesso")
+    
+    if len(rejeitadas) > 0:
+        exemplos = rejeitadas.drop_duplicates().head(3).tolist()
+        print(f"  ⚠️ {column_name}: {len(rejeitadas)} valores em formato desconhecido (ex.: {exemplos})")
+    
+    return converted
+
+def enriquecer_transacoes(df_transacoes, dimensoes, verbose=True):
+    """
+    Trata as datas, faz os joins com as dimensões e cria as colunas calculadas.
+    Funciona tanto com a tabela inteira quanto com um bloco dela (modo streaming).
+    `dimensoes` vem de criar_indices_dimensoes (contas, clientes e agências).
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    
+    log("\n📅 PROCESSAMENTO DE DATAS")
+    log("="*40)
+    
+    # 1. Tratamento da coluna de data_transacao
+    with etapa('conversao_datas', linhas=len(df_transacoes)):
+        if verbose:
+            df_transacoes['data_transacao'] = safe_date_conversion(
+                df_transacoes['data_transacao'],
+                "data_transacao"
+            )
+        else:
+            df_transacoes['data_transacao'], _ = normalizar_datas(df_transacoes['data_transacao'])
+    
+        # O Power BI pode se confundir com timezone, melhor remover
+        if pd.api.types.is_datetime64_any_dtype(df_transacoes['data_transacao']):
+            if df_transacoes['data_transacao'].dt.tz is not None:
+                df_transacoes['data_transacao'] = df_transacoes['data_transacao'].dt.tz_localize(None)
+    
+    # Checa se a data foi convertida antes de criar novas colunas
+    if pd.api.types.is_datetime64_any_dtype(df_transacoes['data_transacao']):
+        with etapa('colunas_data', linhas=len(df_transacoes)):
+            log("  🔧 Criando colunas derivadas de data...")
+        
+            # Quebrando a data em várias colunas para facilitar os filtros no PBI
+            # (inteiros anuláveis, pra não virar 2023.0 quando alguma data é inválida)
+            df_transacoes['ano'] = df_transacoes['data_transacao'].dt.year.astype('Int64')
+            df_transacoes['mes'] = df_transacoes['data_transacao'].dt.month.astype('Int64')
+            df_transacoes['dia'] = df_transacoes['data_transacao'].dt.day.astype('Int64')
+            df_transacoes['dia_semana'] = df_transacoes['data_transacao'].dt.day_name()
+            df_transacoes['mes_nome'] = df_transacoes['data_transacao'].dt.month_name()
+            df_transacoes['trimestre'] = df_transacoes['data_transacao'].dt.quarter.astype('Int64')
+            df_transacoes['semana_ano'] = df_transacoes['data_transacao'].dt.isocalendar().week
+        
+            # Traduzindo para português pra ficar mais fácil de ler no relatório
+            df_transacoes['dia_semana_pt'] = df_transacoes['dia_semana'].map(DIAS_PT).fillna(df_transacoes['dia_semana'])
+            df_transacoes['mes_nome_pt'] = df_transacoes['mes_nome'].map(MESES_PT).fillna(df_transacoes['mes_nome'])
+        
+            # Coluna para a análise de meses pares vs. ímpares
+            df_transacoes['mes_tipo'] = np.where(df_transacoes['mes'].fillna(1) % 2 == 0, 'Par', 'Ímpar')
+    
+    else:
+        log("  ⚠️ Datas não foram convertidas. Pulando criação de colunas derivadas.")
+    
+    log("\n🔗 FAZENDO JOINS DOS DADOS")
+    log("="*40)
+    
+    # 2. Juntando tudo em uma tabela só (modelo desnormalizado para o CSV final).
+    # Em vez de três merges (cada um copiando a tabela inteira), cada dimensão tem um
+    # índice chave → linha e os atributos são anexados direto, coluna a coluna.
     try:
-        converted = pd.to_datetime(date_series, infer_datetime_format=True, errors='coerce')
-        valid_count = converted.notna().sum()
-        print(f"  ✅ {column_name}: {valid_count}/{len(date_series)} datas convertidas com sucesso")
-        return converted
-    except Exception as e:
-        print(f"  ⚠️ Erro na conversão automática de {column_name}: {e}")
+        with etapa('joins', linhas=len(df_transacoes)):
+            df_transacoes_completo = df_transacoes
         
-        # Se a conversão automática falhar, tenta na mão com os formatos mais comuns
-        formats_to_try = [
-            '%Y-%m-%d %H:%M:%S UTC',
-            '%Y-%m-%d %H:%M:%S.%f UTC', 
-            '%Y-%m-%d %H:%M:%S',
-            '%Y-%m-%d',
-            'mixed'
-        ]
+            # Transações <- Contas (para pegar cod_agencia e cod_cliente)
+            dimensoes['contas'].anexar(df_transacoes_completo, ['cod_agencia', 'cod_cliente'])
+            log(f"✅ Join transações + contas: {len(df_transacoes_completo):,} registros")
         
-        for fmt in formats_to_try:
-            try:
-                if fmt == 'mixed':
-                    converted = pd.to_datetime(date_series, format='mixed', errors='coerce')
-                else:
-                    converted = pd.to_datetime(date_series, format=fmt, errors='coerce')
-                
-                valid_count = converted.notna().sum()
-                if valid_count > 0:
-                    print(f"  ✅ {column_name}: {valid_count}/{len(date_series)} datas convertidas (formato: {fmt})")
-                    return converted
-            except Exception:
+            # Join com a tabela de clientes
+            dimensoes['clientes'].anexar(
+                df_transacoes_completo,
+                ['primeiro_nome', 'ultimo_nome', 'tipo_cliente', 'endereco'],
+                renomear={'endereco': 'endereco_cliente'}
+            )
+            log(f"✅ Join + clientes: {len(df_transacoes_completo):,} registros")
+        
+            # Join com a tabela de agências
+            dimensoes['agencias'].anexar(
+                df_transacoes_completo,
+                ['nome', 'cidade', 'uf', 'tipo_agencia'],
+                renomear={'nome': 'nome_agencia'}
+            )
+            log(f"✅ Join + agências: {len(df_transacoes_completo):,} registros")
+        
+            # Chaves sem correspondência viram métrica, não NaN silencioso
+            for indice in dimensoes.values():
+                log(f"  {indice.resumo()}")
+    
+    except Exception as e:
+        print(f"⚠️ Erro no join: {e}")
+        df_transacoes_completo = df_transacoes
+    
+    log("\n📊 CRIANDO MÉTRICAS CALCULADAS")
+    log("="*40)
+    
+    # 3. Criando algumas colunas calculadas direto no script
+    try:
+        # Criando faixas de valor pra facilitar a análise
+        if 'valor_transacao' in df_transacoes_completo.columns:
+            with etapa('categoria_valor', linhas=len(df_transacoes_completo)):
+                df_transacoes_completo['categoria_valor'] = pd.cut(
+                    df_transacoes_completo['valor_transacao'],
+                    bins=[0, 100, 500, 1000, 5000, float('inf')],
+                    labels=['Até R$ 100', 'R$ 101-500', 'R$ 501-1000', 'R$ 1001-5000', 'Acima de R$ 5000'],
+                    include_lowest=True
+                )
+                log("✅ Categoria de valor criada")
+    
+    except Exception as e:
+        print(f"⚠️ Erro ao criar métricas: {e}")
+    
+    return df_transacoes_completo
+
+def finalizar_resumos(cubo, df_agencias, janelas_ranking=None):
+    """
+    Monta as tabelas de resumo salvas em CSV a partir do cubo diário
+    (dia x agência x tipo de cliente), sem voltar às transações.
+    Os rankings por janela (em dias) e por mês saem das somas acumuladas do cubo.
+    """
+    resumos = {
+        'resumo_dias_semana': resumo_executivo(consultar(cubo, 'dia_semana_pt'), 'dia_semana_pt'),
+        'resumo_meses_tipo': resumo_executivo(consultar(cubo, 'mes_tipo'), 'mes_tipo')
+    }
+    
+    # Resumo por agência: últimos 6 meses em dias inteiros, a partir do último dia com transação
+    por_agencia = consultar(cubo, 'cod_agencia', inicio=inicio_janela(cubo, MESES_RESUMO_AGENCIAS))
+    if len(por_agencia) > 0:
+        nomes = df_agencias.drop_duplicates('cod_agencia').set_index('cod_agencia')['nome']
+        nome_agencia = por_agencia.index.map(nomes)
+        por_agencia = por_agencia[nome_agencia.notna()]
+        por_agencia.index = pd.MultiIndex.from_arrays(
+            [por_agencia.index, nome_agencia[nome_agencia.notna()]], names=['cod_agencia', 'nome_agencia']
+        )
+        resumo_agencias = resumo_executivo(por_agencia)
+        resumos['resumo_agencias_6m'] = resumo_agencias.sort_values('Qtd_Transacoes', ascending=False)
+        
+        somas = SomasAcumuladas.do_cubo(cubo)
+        janelas = rankings_por_janela(somas, janelas_ranking or JANELAS_PADRAO)
+        resumos['ranking_agencias_janelas'] = janelas.set_index(['Janela_Dias', 'cod_agencia'])
+        resumos['ranking_agencias_mensal'] = ranking_por_periodo(somas).set_index(['Periodo', 'cod_agencia'])
+    
+    return resumos
+
+def salvar_tabela(df, processed_path, nome, output_format, index=False):
+    """Grava uma tabela de dados/processed em CSV (utf-8-sig) e/ou Parquet."""
+    if output_format in ('csv', 'ambos'):
+        df.to_csv(processed_path / f"{nome}.csv", index=index, encoding='utf-8-sig')
+    if output_format in ('parquet', 'ambos'):
+        # O Parquet não guarda o índice, então os resumos levam a chave como coluna
+        salvar_parquet(df.reset_index() if index else df, processed_path / f"{nome}.parquet")
+
+def salvar_calendario(data_min, data_max, processed_path, output_format):
+    """Gera (ou estende, pelo cache) a dim_datas do período e grava em dados/processed."""
+    dim_dates = obter_calendario(data_min, data_max, cache=processed_path / ARQUIVO_CALENDARIO)
+    salvar_tabela(dim_dates, processed_path, "dim_datas", output_format)
+    return dim_dates
+
+def salvar_resumos(cubo, df_agencias, processed_path, output_format, janelas_ranking=None, mensagem="✅ {nome}"):
+    """Calcula os resumos a partir do cubo e grava cada um em dados/processed."""
+    with etapa('calculo_resumos'):
+        resumos = finalizar_resumos(cubo, df_agencias, janelas_ranking)
+    with etapa('gravacao_resumos', linhas=sum(len(tabela) for tabela in resumos.values())):
+        for nome, tabela in resumos.items():
+            salvar_tabela(tabela, processed_path, nome, output_format, index=True)
+            print(mensagem.format(nome=nome))
+    return resumos
+
+def salvar_produtividade(produtividade, df_agencias, processed_path, output_format, mensagem="✅ {nome}: {linhas:,} registros"):
+    """Grava dim_colaboradores, fato_produtividade e o resumo por agência. Retorna as tabelas."""
+    tabelas = produtividade.tabelas(df_agencias)
+    with etapa('gravacao_produtividade', linhas=sum(len(tabela) for tabela in tabelas.values())):
+        for nome, tabela in tabelas.items():
+            salvar_tabela(tabela, processed_path, nome, output_format)
+            print(mensagem.format(nome=nome, linhas=len(tabela)))
+    return tabelas
+
+def processar_em_blocos(arquivo_transacoes, output_file, dimensoes, chunksize, output_format='csv', carga=None,
+                        produtividade=None, perfil=None):
+    """
+    Lê transacoes.csv em blocos de `chunksize` linhas, enriquece cada bloco e
+    vai gravando na saída final. Só o cubo diário (dia x agência x tipo de cliente) fica em memória.
+    Com uma `carga` (banco_sqlite.CargaFato) cada bloco também vai para o banco SQLite,
+    com uma `produtividade` (produtividade.Produtividade) entra nos totais por colaborador
+    e com um `perfil` (perfil_clientes.PerfilClientes) nos totais por cliente.
+    """
+    print(f"\n🌊 MODO STREAMING: blocos de {chunksize:,} linhas")
+    print("="*40)
+    
+    cubo = None
+    total_linhas = 0
+    datas_invalidas = 0
+    volume_total = 0.0
+    data_min = pd.NaT
+    data_max = pd.NaT
+    
+    gravar_csv = output_format in ('csv', 'ambos')
+    pasta_parquet = output_file.with_suffix('.parquet') if output_format in ('parquet', 'ambos') else None
+    if pasta_parquet is not None:
+        limpar_parquet(pasta_parquet)
+    
+    # Um único handle de arquivo, pra o BOM do utf-8-sig sair só uma vez
+    with open(output_file if gravar_csv else os.devnull, 'w', encoding='utf-8-sig', newline='') as saida:
+        for i, bloco in enumerate(ler_tabela(arquivo_transacoes, chunksize=chunksize)):
+            bloco = enriquecer_transacoes(bloco, dimensoes, verbose=False)
+            with etapa('gravacao_transacoes', linhas=len(bloco)):
+                if gravar_csv:
+                    bloco.to_csv(saida, index=False, header=(i == 0))
+                if pasta_parquet is not None:
+                    salvar_parquet(bloco, pasta_parquet, particionar=True, parte=f'{i:05d}')
+            if carga is not None:
+                with etapa('gravacao_sqlite', linhas=len(bloco)):
+                    carga.adicionar(bloco)
+            
+            with etapa('cubo', linhas=len(bloco)):
+                cubo = combinar_cubos(cubo, montar_cubo(bloco))
+            if produtividade is not None:
+                with etapa('produtividade', linhas=len(bloco)):
+                    produtividade.adicionar(bloco)
+            if perfil is not None:
+                with etapa('perfil_clientes', linhas=len(bloco)):
+                    perfil.adicionar(bloco)
+            
+            total_linhas += len(bloco)
+            datas_invalidas += bloco['data_transacao'].isna().sum()
+            volume_total += bloco['valor_transacao'].sum()
+            data_min = min([d for d in [data_min, bloco['data_transacao'].min()] if pd.notna(d)], default=pd.NaT)
+            data_max = max([d for d in [data_max, bloco['data_transacao'].max()] if pd.notna(d)], default=pd.NaT)
+            print(f"  ✅ Bloco {i + 1}: {total_linhas:,} registros processados")
+    
+    if datas_invalidas > 0:
+        print(f"  ⚠️ data_transacao: {datas_invalidas:,} datas não convertidas")
+    for indice in dimensoes.values():
+        print(f"  {indice.resumo()}")
+    
+    return {
+        'cubo': cubo,
+        'total_linhas': total_linhas,
+        'volume_total': volume_total,
+        'data_min': data_min,
+        'data_max': data_max
+    }
+
+def particoes_csv(caminho, partes):
+    """
+    Divide o CSV em até `partes` faixas de bytes de tamanhos parecidos, cada uma
+    começando e terminando em fim de linha. Retorna o cabeçalho (bytes) e a lista
+    de (inicio, fim). Supõe que nenhum campo tem quebra de linha entre aspas,
+    o que vale para o transacoes.csv do BanVic.
+    """
+    tamanho = os.path.getsize(caminho)
+    with open(caminho, 'rb') as f:
+        cabecalho = f.readline()
+        inicio_dados = f.tell()
+        limites = [inicio_dados]
+        for i in range(1, partes):
+            alvo = inicio_dados + (tamanho - inicio_dados) * i // partes
+            if alvo <= limites[-1]:
                 continue
+            f.seek(alvo - 1)
+            f.readline()  # vai até o fim da linha em que o alvo caiu
+            if f.tell() >= tamanho:
+                break
+            limites.append(f.tell())
+        limites.append(tamanho)
+    return cabecalho, [(a, b) for a, b in zip(limites, limites[1:]) if b > a]
+
+# Índices das dimensões de cada processo do pool (recebidos uma vez, no início)
+_dimensoes_processo = None
+
+def _iniciar_processo(dimensoes):
+    global _dimensoes_processo
+    _dimensoes_processo = dimensoes
+
+def _processar_particao(caminho, cabecalho, inicio, fim):
+    """
+    Trabalho de cada processo: lê uma faixa de bytes do CSV e enriquece.
+    Retorna a tabela e os contadores de chaves das dimensões.
+    """
+    with open(caminho, 'rb') as f:
+        f.seek(inicio)
+        dados = f.read(fim - inicio)
+    bloco = ler_tabela(io.BytesIO(cabecalho + dados), tabela='transacoes')
+    del dados
+    bloco = enriquecer_transacoes(bloco, _dimensoes_processo, verbose=False)
+    metricas = {nome: indice.metricas(zerar=True) for nome, indice in _dimensoes_processo.items()}
+    return bloco, metricas
+
+def juntar_particoes(partes):
+    """
+    Junta as tabelas das partições na ordem do arquivo. Colunas category que saíram
+    com categorias diferentes em cada parte voltam a ser category (categorias
+    ordenadas, como o read_csv faz na leitura serial).
+    """
+    tabela = pd.concat(partes, ignore_index=True)
+    for coluna in partes[0].columns:
+        if isinstance(partes[0][coluna].dtype, pd.CategoricalDtype) and not isinstance(tabela[coluna].dtype, pd.CategoricalDtype):
+            tabela[coluna] = tabela[coluna].astype('category')
+    return tabela
+
+def processar_em_paralelo(arquivo_transacoes, dimensoes, processos):
+    """
+    Lê e enriquece transacoes.csv em faixas de bytes num pool de `processos`
+    processos (datas, colunas derivadas, joins e categoria_valor são por linha).
+    As partes voltam na ordem do arquivo, então a tabela sai igual à da execução serial.
+    
+    O cubo é montado depois, uma vez, na tabela já junta: somar cubos parciais
+    muda a soma de ponto flutuante na última casa (a soma do groupby é compensada),
+    e o cubo_diario.csv deixaria de ser idêntico ao da execução serial.
+    """
+    cabecalho, faixas = particoes_csv(arquivo_transacoes, processos * PARTES_POR_PROCESSO)
+    print(f"\n⚙️ MODO PARALELO: {len(faixas)} partes em {processos} processos")
+    print("="*40)
+    
+    tabelas = []
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo, initargs=(dimensoes,)) as executor:
+        tarefas = [executor.submit(_processar_particao, str(arquivo_transacoes), cabecalho, inicio, fim)
+                   for inicio, fim in faixas]
+        # Resultados consumidos na ordem das faixas: a saída não depende de qual processo termina antes
+        for i, tarefa in enumerate(tarefas):
+            tabela, metricas = tarefa.result()
+            tabelas.append(tabela)
+            for nome, indice in dimensoes.items():
+                indice.somar_metricas(metricas[nome])
+            print(f"  ✅ Parte {i + 1}/{len(faixas)}: {len(tabela):,} registros")
+    
+    with etapa('juncao_particoes'):
+        df_transacoes_completo = juntar_particoes(tabelas)
+    del tabelas
+    
+    datas_invalidas = df_transacoes_completo['data_transacao'].isna().sum()
+    if datas_invalidas > 0:
+        print(f"  ⚠️ data_transacao: {datas_invalidas:,} datas não convertidas")
+    for indice in dimensoes.values():
+        print(f"  {indice.resumo()}")
+    return df_transacoes_completo
+
+def motivo_reconstrucao(estado, hashes, processed_path, output_format, sqlite=False, produtividade=False):
+    """Retorna por que o modo incremental não pode ser usado (ou None se pode)."""
+    if estado is None:
+        return "nenhuma execução anterior registrada"
+    if estado.get('formato') != output_format:
+        return f"formato de saída mudou ({estado.get('formato')} → {output_format})"
+    # Um banco de uma execução sem --sqlite estaria faltando as transações dela
+    if sqlite and not estado.get('sqlite'):
+        return "banco SQLite não foi atualizado na última execução"
+    if sqlite and not arquivo_banco(processed_path).exists():
+        return f"{arquivo_banco(processed_path).name} não encontrado"
+    for nome in ARQUIVOS_DIMENSAO:
+        if estado['hashes'].get(nome) != hashes[nome]:
+            return f"{nome} foi alterado"
+    if estado.get('data_max') is None:
+        return "execução anterior sem datas válidas"
+    if arquivo_cubo(processed_path) is None:
+        return "cubo_diario não encontrado"
+    # Os totais de transações por colaborador são somados aos da execução anterior
+    if produtividade and ler_produtividade_anterior(processed_path) is None:
+        return f"{TABELA_PRODUTIVIDADE} não encontrada"
+    # Idem para o perfil dos clientes (totais de transações por cliente na dim_clientes)
+    if ler_perfil_anterior(processed_path) is None:
+        return "dim_clientes sem o perfil dos clientes"
+    saidas = []
+    if output_format in ('csv', 'ambos'):
+        saidas.append(processed_path / "transacoes_powerbi.csv")
+    if output_format in ('parquet', 'ambos'):
+        saidas.append(processed_path / "transacoes_powerbi.parquet")
+    for saida in saidas:
+        if not saida.exists():
+            return f"{saida.name} não encontrado"
+    return None
+
+def montar_estado(hashes, output_format, total_linhas, volume_total, data_min, data_max, execucoes, sqlite=False):
+    """Monta o dicionário gravado em etl_estado.json ao final de cada execução."""
+    return {
+        'formato': output_format,
+        'sqlite': sqlite,
+        'data_min': str(data_min) if pd.notna(data_min) else None,
+        'data_max': str(data_max) if pd.notna(data_max) else None,
+        'hashes': hashes,
+        'total_linhas': int(total_linhas),
+        'volume_total': float(volume_total),
+        'execucoes': execucoes,
+        'atualizado_em': datetime.now().isoformat(timespec='seconds')
+    }
+
+def atualizar_incremental(data_path, processed_path, estado, hashes, dimensoes, chunksize, output_format,
+                          janelas_ranking=None, criar_calendario=True, criar_resumos=True, sqlite=False,
+                          produtividade=None, perfil=None):
+    """
+    Processa só as transações com data_transacao posterior à marca d'água
+    (data_max do estado): enriquece, anexa à saída e atualiza dim_datas, cubo e resumos
+    (e, com sqlite=True, anexa as transações novas ao banco SQLite). A produtividade
+    dos colaboradores é regravada sempre: propostas e contas podem mudar sem transações novas.
+    O `perfil` dos clientes parte dos totais da dim_clientes anterior e é regravado quando há transações novas.
+    """
+    output_file = processed_path / "transacoes_powerbi.csv"
+    marca_dagua = pd.Timestamp(estado['data_max'])
+    execucao = estado.get('execucoes', 0) + 1
+    
+    print("\n⏩ MODO INCREMENTAL")
+    print("="*40)
+    print(f"  📌 Última data processada: {marca_dagua}")
+    
+    if produtividade is not None:
+        produtividade.somar_anterior(ler_produtividade_anterior(processed_path))
+    if perfil is not None:
+        perfil.somar_anterior(ler_perfil_anterior(processed_path))
+    
+    if estado['hashes'].get('transacoes.csv') == hashes['transacoes.csv']:
+        print("  ✅ transacoes.csv não mudou desde a última execução. Nada a fazer.")
+        if produtividade is not None:
+            tabelas = salvar_produtividade(produtividade, dimensoes['agencias'].df, processed_path, output_format,
+                                           mensagem="  ✅ {nome} atualizada")
+            if sqlite:
+                CargaFato(arquivo_banco(processed_path), anexar=True).finalizar(tabelas)
+        return output_file
+    
+    cubo = ler_cubo(processed_path)
+    novas_linhas = 0
+    novo_volume = 0.0
+    ignoradas = 0
+    data_max = marca_dagua
+    
+    gravar_csv = output_format in ('csv', 'ambos')
+    pasta_parquet = output_file.with_suffix('.parquet') if output_format in ('parquet', 'ambos') else None
+    carga = CargaFato(arquivo_banco(processed_path), anexar=True) if sqlite else None
+    
+    # Anexando sem BOM (o utf-8-sig só escreve o BOM no começo do arquivo)
+    try:
+        with open(output_file if gravar_csv else os.devnull, 'a', encoding='utf-8', newline='') as saida:
+            leitor = ler_tabela(data_path / "transacoes.csv", chunksize=chunksize or BLOCO_INCREMENTAL)
+            for i, bloco in enumerate(leitor):
+                datas, _ = normalizar_datas(bloco['data_transacao'])
+                ignoradas += datas.isna().sum()
+                novos = bloco[(datas > marca_dagua).to_numpy()].copy()
+                if novos.empty:
+                    continue
+                novos['data_transacao'] = datas[datas > marca_dagua]
+            
+                novos = enriquecer_transacoes(novos, dimensoes, verbose=False)
+                with etapa('gravacao_transacoes', linhas=len(novos)):
+                    if gravar_csv:
+                        novos.to_csv(saida, index=False, header=False)
+                    if pasta_parquet is not None:
+                        salvar_parquet(novos, pasta_parquet, particionar=True, parte=f'inc{execucao:04d}-{i:05d}')
+                if carga is not None:
+                    with etapa('gravacao_sqlite', linhas=len(novos)):
+                        carga.adicionar(novos)
+            
+                with etapa('cubo', linhas=len(novos)):
+                    cubo = combinar_cubos(cubo, montar_cubo(novos))
+                if produtividade is not None:
+                    with etapa('produtividade', linhas=len(novos)):
+                        produtividade.adicionar(novos)
+                if perfil is not None:
+                    with etapa('perfil_clientes', linhas=len(novos)):
+                        perfil.adicionar(novos)
+                novas_linhas += len(novos)
+                novo_volume += novos['valor_transacao'].sum()
+                data_max = max(data_max, novos['data_transacao'].max())
+    except Exception:
+        if carga is not None:
+            carga.cancelar()
+        raise
+    
+    if ignoradas > 0:
+        print(f"  ⚠️ {ignoradas:,} transações com data inválida não entram no modo incremental")
+    if novas_linhas > 0:
+        for indice in dimensoes.values():
+            print(f"  {indice.resumo()}")
+    
+    print(f"  ✅ Novas transações: {novas_linhas:,}")
+    
+    data_min = pd.Timestamp(estado['data_min'])
+    tabelas_sqlite = {}
+    if novas_linhas > 0:
+        # Só os dias novos são gerados; o resto vem do cache do calendário
+        if criar_calendario and data_max.date() > marca_dagua.date():
+            dim_dates = salvar_calendario(data_min, data_max, processed_path, output_format)
+            tabelas_sqlite['dim_datas'] = dim_dates
+            print(f"  ✅ dim_datas estendida até {data_max.date()}: {len(dim_dates):,} registros")
+        
+        with etapa('gravacao_cubo', linhas=len(cubo)):
+            salvar_cubo(cubo, processed_path, output_format)
+        tabelas_sqlite['cubo_diario'] = cubo.reset_index()
+        print(f"  ✅ cubo_diario atualizado: {len(cubo):,} células")
+        
+        if criar_resumos:
+            salvar_resumos(cubo, dimensoes['agencias'].df, processed_path, output_format,
+                           janelas_ranking, mensagem="  ✅ {nome} atualizado")
         
-        print(f"  ❌ Não foi possível converter {column_name}. Mantendo como string.")
-        return date_series
+        # Recência e tempo de relacionamento passam a contar até a nova marca d'água
+        if perfil is not None:
+            with etapa('gravacao_perfil_clientes'):
+                dim_clientes = perfil.tabela(dimensoes['clientes'].df, data_max)
+                salvar_tabela(dim_clientes, processed_path, "dim_clientes", output_format)
+            tabelas_sqlite['dim_clientes'] = dim_clientes
+            print(f"  ✅ dim_clientes atualizada (perfil até {data_max.date()})")
+    
+    if produtividade is not None:
+        tabelas_sqlite.update(salvar_produtividade(produtividade, dimensoes['agencias'].df, processed_path,
+                                                   output_format, mensagem="  ✅ {nome} atualizada"))
+    
+    if carga is not None:
+        with etapa('indices_sqlite'):
+            carga.finalizar(tabelas_sqlite)
+        print(f"  ✅ {arquivo_banco(processed_path).name}: {novas_linhas:,} transações anexadas")
+    
+    total_linhas = estado['total_linhas'] + novas_linhas
+    salvar_estado(processed_path / ARQUIVO_ESTADO, montar_estado(
+        hashes, output_format, total_linhas, estado['volume_total'] + novo_volume,
+        data_min, data_max, execucao, sqlite
+    ))
+    
+    print(f"  💳 Total de transações na saída: {total_linhas:,}")
+    print(f"  📌 Nova marca d'água: {data_max}")
+    
+    return output_file
 
-def load_banvic_data():
+def load_banvic_data(chunksize=None, output_format='csv', incremental=False, janelas_ranking=None,
+                     data_path=None, processed_path=None, criar_calendario=True, criar_resumos=True,
+                     sqlite=False, processos=None, validar=False, descartar_rejeitados=False):
     """
     Função principal que carrega, limpa, junta e salva os dados do BanVic.
+    
+    Com chunksize=None a tabela de transações é processada inteira em memória e a
+    função retorna o DataFrame final. Com um chunksize (nº de linhas) ela roda em
+    modo streaming, com memória limitada, e retorna o caminho do CSV gerado.
+    
+    output_format escolhe o formato dos arquivos em dados/processed: 'csv' (padrão),
+    'parquet' (tipos compactos, transações particionadas por ano) ou 'ambos'.
+    
+    Com incremental=True o ETL guarda um estado (etl_estado.json) com a última
+    data_transacao processada e o hash de cada arquivo de origem. Nas execuções
+    seguintes só as transações novas são processadas e anexadas; o rebuild completo
+    só acontece quando contas, clientes ou agências mudam. Retorna o caminho do CSV.
+    
+    janelas_ranking: janelas (em dias) do ranking de agências (padrão 30/90/180/365).
+    
+    data_path e processed_path trocam as pastas de entrada (CSVs originais) e de
+    saída; o padrão é dados/raw/banvic_data e dados/processed na raiz do projeto.
+    Com criar_calendario/criar_resumos=False a dim_datas e os resumos ficam de fora
+    (o pipeline.py roda essas etapas separadas, a partir do cubo).
+    
+    Com sqlite=True a fato, as dimensões e o cubo também vão para dados/processed/banvic.db,
+    com índices na fato e os resumos como views SQL (ver banco_sqlite.py).
+    
+    Com processos > 1 (e sem chunksize) a leitura e o enriquecimento das transações
+    rodam em paralelo, em faixas de transacoes.csv, com o mesmo resultado da execução serial.
+    
+    Com validar=True as regras de qualidade de validacao_dados.py (integridade entre
+    tabelas, faixas de valor, datas, códigos repetidos) são checadas e as linhas
+    reprovadas vão para rejeitados.csv; com descartar_rejeitados=True as transações
+    reprovadas também ficam fora da fato e do cubo. A validação precisa da tabela
+    inteira, então não roda no modo streaming nem na atualização incremental.
+    
+    Se colaboradores.csv, colaborador_agencia.csv e propostas_credito.csv existirem, também
+    saem dim_colaboradores, fato_produtividade e resumo_produtividade_agencias (contas
+    abertas, volume das contas geridas e propostas por colaborador e agência, ver produtividade.py).
+    
+    A dim_clientes sai com o perfil de cada cliente (recência, frequência e valor das
+    transações, tempo de relacionamento, faixa etária, notas RFM por quintil dentro de
+    PF/PJ e segmento, ver perfil_clientes.py), calculado em todos os modos.
     """
+    if output_format not in FORMATOS_SAIDA:
+        print(f"❌ Formato de saída inválido: {output_format} (use {', '.join(FORMATOS_SAIDA)})")
+        return None
+    
     # Definindo os caminhos das pastas pra organizar o projeto
-    base_path = Path(r"C:\Users\Nayara\Desktop\LH_EA_NAYARA_VIEIRA")
-    data_path = base_path / "dados" / "raw" / "banvic_data"
-    processed_path = base_path / "dados" / "processed"
+    data_path = Path(data_path) if data_path is not None else PASTA_ENTRADA_PADRAO
+    processed_path = Path(processed_path) if processed_path is not None else PASTA_SAIDA_PADRAO
     
     # Garante que a pasta de destino exista
     processed_path.mkdir(parents=True, exist_ok=True)
@@ -68,20 +640,23 @@ def load_banvic_data():
     
     # 1. Leitura dos arquivos CSV originais
     try:
-        # Tabela Fato: transacoes.csv
-        df_transacoes = pd.read_csv(data_path / "transacoes.csv")
-        print(f"✅ Transações carregadas: {len(df_transacoes):,} registros")
-        
-        # Dimensões
-        df_clientes = pd.read_csv(data_path / "clientes.csv")
-        print(f"✅ Clientes carregados: {len(df_clientes):,} registros")
+        if not (data_path / "transacoes.csv").exists():
+            raise FileNotFoundError(data_path / "transacoes.csv")
         
-        df_agencias = pd.read_csv(data_path / "agencias.csv")
-        print(f"✅ Agências carregadas: {len(df_agencias):,} registros")
+        with etapa('leitura_dimensoes') as medida:
+            # Dimensões (tipos compactos e datas já convertidas, ver banvic_schema.py)
+            df_clientes = ler_tabela(data_path / "clientes.csv")
+            print(f"✅ Clientes carregados: {len(df_clientes):,} registros")
         
-        df_contas = pd.read_csv(data_path / "contas.csv")
-        print(f"✅ Contas carregadas: {len(df_contas):,} registros")
+            df_agencias = ler_tabela(data_path / "agencias.csv")
+            print(f"✅ Agências carregadas: {len(df_agencias):,} registros")
         
+            # De contas o ETL só usa as chaves (cod_colaborador vai para a produtividade)
+            df_contas = ler_tabela(data_path / "contas.csv",
+                                   colunas=['num_conta', 'cod_cliente', 'cod_agencia', 'cod_colaborador'])
+            print(f"✅ Contas carregadas: {len(df_contas):,} registros")
+            medida['linhas'] = len(df_clientes) + len(df_agencias) + len(df_contas)
+    
     except FileNotFoundError as e:
         print(f"❌ Erro: Arquivo não encontrado - {e}")
         return None
@@ -89,157 +664,144 @@ def load_banvic_data():
         print(f"❌ Erro ao carregar dados: {e}")
         return None
     
-    print("\n📅 PROCESSAMENTO DE DATAS")
-    print("="*40)
+    output_file = processed_path / "transacoes_powerbi.csv"
     
-    # 2. Tratamento da coluna de data_transacao
-    df_transacoes['data_transacao'] = safe_date_conversion(
-        df_transacoes['data_transacao'], 
-        "data_transacao"
-    )
+    # Índices das dimensões, montados uma vez e reaproveitados em todos os blocos
+    dimensoes = criar_indices_dimensoes(df_contas, df_clientes, df_agencias)
     
-    # O Power BI pode se confundir com timezone, melhor remover
-    if pd.api.types.is_datetime64_any_dtype(df_transacoes['data_transacao']):
-        if df_transacoes['data_transacao'].dt.tz is not None:
-            df_transacoes['data_transacao'] = df_transacoes['data_transacao'].dt.tz_localize(None)
+    # Produtividade por colaborador/agência (colaboradores, lotação e propostas), somada a cada bloco
+    try:
+        with etapa('leitura_produtividade'):
+            produtividade = criar_produtividade(data_path, df_contas)
+    except Exception as e:
+        print(f"⚠️ Erro ao preparar a produtividade (seguindo sem ela): {e}")
+        produtividade = None
     
-    # Checa se a data foi convertida antes de criar novas colunas
-    if pd.api.types.is_datetime64_any_dtype(df_transacoes['data_transacao']):
-        print("  🔧 Criando colunas derivadas de data...")
-        
-        # Quebrando a data em várias colunas para facilitar os filtros no PBI
-        df_transacoes['ano'] = df_transacoes['data_transacao'].dt.year
-        df_transacoes['mes'] = df_transacoes['data_transacao'].dt.month
-        df_transacoes['dia'] = df_transacoes['data_transacao'].dt.day
-        df_transacoes['dia_semana'] = df_transacoes['data_transacao'].dt.day_name()
-        df_transacoes['mes_nome'] = df_transacoes['data_transacao'].dt.month_name()
-        df_transacoes['trimestre'] = df_transacoes['data_transacao'].dt.quarter
-        df_transacoes['semana_ano'] = df_transacoes['data_transacao'].dt.isocalendar().week
-        
-        # Traduzindo para português pra ficar mais fácil de ler no relatório
-        dias_pt = {
-            'Monday': 'Segunda-feira', 'Tuesday': 'Terça-feira', 
-            'Wednesday': 'Quarta-feira', 'Thursday': 'Quinta-feira',
-            'Friday': 'Sexta-feira', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
-        }
-        df_transacoes['dia_semana_pt'] = df_transacoes['dia_semana'].map(dias_pt).fillna(df_transacoes['dia_semana'])
-        
-        meses_pt = {
-            'January': 'Janeiro', 'February': 'Fevereiro', 'March': 'Março',
-            'April': 'Abril', 'May': 'Maio', 'June': 'Junho',
-            'July': 'Julho', 'August': 'Agosto', 'September': 'Setembro',
-            'October': 'Outubro', 'November': 'Novembro', 'December': 'Dezembro'
-        }
-        df_transacoes['mes_nome_pt'] = df_transacoes['mes_nome'].map(meses_pt).fillna(df_transacoes['mes_nome'])
+    # Totais de transações por cliente para o perfil da dim_clientes, somados a cada bloco
+    perfil = PerfilClientes(df_clientes)
+    
+    # Modo incremental: se as dimensões não mudaram, processa só as transações novas
+    if incremental:
+        hashes = {nome: hash_arquivo(data_path / nome) for nome in ['transacoes.csv'] + ARQUIVOS_DIMENSAO}
+        estado = carregar_estado(processed_path / ARQUIVO_ESTADO)
+        motivo = motivo_reconstrucao(estado, hashes, processed_path, output_format, sqlite,
+                                     produtividade is not None)
         
-        # Coluna para a análise de meses pares vs. ímpares
-        df_transacoes['mes_tipo'] = df_transacoes['mes'].apply(
-            lambda x: 'Par' if pd.notna(x) and x % 2 == 0 else 'Ímpar'
-        )
+        if motivo is None:
+            if validar:
+                print("⏭️ Validação não roda na atualização incremental (use validacao_dados.py)")
+            try:
+                with etapa('incremental'):
+                    return atualizar_incremental(
+                        data_path, processed_path, estado, hashes, dimensoes, chunksize,
+                        output_format, janelas_ranking, criar_calendario, criar_resumos, sqlite,
+                        produtividade, perfil
+                    )
+            except Exception as e:
+                print(f"❌ Erro na atualização incremental: {e}")
+                return None
         
-    else:
-        print("  ⚠️ Datas não foram convertidas. Pulando criação de colunas derivadas.")
+        print(f"\n🔁 Reconstrução completa: {motivo}")
     
-    print("\n🔗 FAZENDO JOINS DOS DADOS")
-    print("="*40)
+    # Modo paralelo: cada processo lê e enriquece uma faixa do arquivo
+    paralelo = chunksize is None and processos is not None and processos > 1
     
-    # 3. Juntando tudo em uma tabela só (modelo desnormalizado para o CSV final)
-    try:
-        # Transações <- Contas (para pegar cod_agencia e cod_cliente)
-        df_transacoes_completo = df_transacoes.merge(
-            df_contas[['num_conta', 'cod_agencia', 'cod_cliente']], 
-            on='num_conta', 
-            how='left'
-        )
-        print(f"✅ Join transações + contas: {len(df_transacoes_completo):,} registros")
-        
-        # Join com a tabela de clientes
-        colunas_clientes = [col for col in ['cod_cliente', 'primeiro_nome', 'ultimo_nome', 'tipo_cliente', 'endereco'] 
-                            if col in df_clientes.columns]
-        
-        df_transacoes_completo = df_transacoes_completo.merge(
-            df_clientes[colunas_clientes], 
-            on='cod_cliente', 
-            how='left'
-        )
-        print(f"✅ Join + clientes: {len(df_transacoes_completo):,} registros")
-        
-        # Join com a tabela de agências
-        colunas_agencias = [col for col in ['cod_agencia', 'nome', 'cidade', 'uf', 'tipo_agencia'] 
-                            if col in df_agencias.columns]
-        
-        df_transacoes_completo = df_transacoes_completo.merge(
-            df_agencias[colunas_agencias], 
-            on='cod_agencia', 
-            how='left',
-            suffixes=('', '_agencia')
-        )
-        print(f"✅ Join + agências: {len(df_transacoes_completo):,} registros")
-        
-        # Renomeando colunas para evitar conflitos de nome e melhorar a clareza
-        if 'nome' in df_transacoes_completo.columns:
-            df_transacoes_completo = df_transacoes_completo.rename(columns={'nome': 'nome_agencia'})
-        if 'endereco' in df_transacoes_completo.columns:
-            df_transacoes_completo = df_transacoes_completo.rename(columns={'endereco': 'endereco_cliente'})
-            
-    except Exception as e:
-        print(f"⚠️ Erro no join: {e}")
-        df_transacoes_completo = df_transacoes.copy()
+    # Tabela Fato: transacoes.csv (no modo streaming ela é lida depois, em blocos)
+    if chunksize is None and not paralelo:
+        try:
+            with etapa('leitura_transacoes') as medida:
+                df_transacoes = ler_tabela(data_path / "transacoes.csv")
+                medida['linhas'] = len(df_transacoes)
+            print(f"✅ Transações carregadas: {len(df_transacoes):,} registros")
+        except Exception as e:
+            print(f"❌ Erro ao carregar dados: {e}")
+            return None
     
-    print("\n📊 CRIANDO MÉTRICAS CALCULADAS")
-    print("="*40)
+    # Banco SQLite: a fato entra bloco a bloco (ou inteira) e o resto no final
+    carga = CargaFato(arquivo_banco(processed_path)) if sqlite else None
     
-    # 4. Criando algumas colunas calculadas direto no script
-    try:
-        # Criando faixas de valor pra facilitar a análise
-        if 'valor_transacao' in df_transacoes_completo.columns:
-            df_transacoes_completo['categoria_valor'] = pd.cut(
-                df_transacoes_completo['valor_transacao'],
-                bins=[0, 100, 500, 1000, 5000, float('inf')],
-                labels=['Até R$ 100', 'R$ 101-500', 'R$ 501-1000', 'R$ 1001-5000', 'Acima de R$ 5000'],
-                include_lowest=True
-            )
-            print("✅ Categoria de valor criada")
-            
-    except Exception as e:
-        print(f"⚠️ Erro ao criar métricas: {e}")
+    # 2-4. Datas, joins e métricas calculadas
+    if paralelo:
+        try:
+            with etapa('paralelo') as medida:
+                df_transacoes_completo = processar_em_paralelo(data_path / "transacoes.csv", dimensoes, processos)
+                medida['linhas'] = len(df_transacoes_completo)
+        except Exception as e:
+            print(f"❌ Erro no processamento em paralelo: {e}")
+            if carga is not None:
+                carga.cancelar()
+            return None
+    elif chunksize is None:
+        with etapa('enriquecimento', linhas=len(df_transacoes)):
+            df_transacoes_completo = enriquecer_transacoes(df_transacoes, dimensoes)
+    
+    # Regras de qualidade sobre a tabela inteira (os repetidos podem estar em blocos diferentes)
+    if validar and chunksize is None:
+        print("\n🔎 VALIDANDO OS DADOS")
+        print("="*40)
+        try:
+            with etapa('validacao', linhas=len(df_transacoes_completo)):
+                rejeitados = validar_pasta(data_path, processed_path, {
+                    'transacoes': df_transacoes_completo, 'clientes': df_clientes, 'agencias': df_agencias
+                })
+            if descartar_rejeitados:
+                descartadas = linhas_rejeitadas(rejeitados, 'transacoes')
+                df_transacoes_completo = df_transacoes_completo.drop(
+                    index=df_transacoes_completo.index[descartadas]).reset_index(drop=True)
+                print(f"🗑️ {len(descartadas):,} transações reprovadas ficam fora da fato")
+        except Exception as e:
+            print(f"⚠️ Erro na validação (seguindo sem ela): {e}")
+    elif validar:
+        print("⏭️ Validação não roda no modo streaming (use validacao_dados.py)")
+        
+    if chunksize is None:
+        with etapa('cubo', linhas=len(df_transacoes_completo)):
+            cubo = montar_cubo(df_transacoes_completo)
+        if produtividade is not None:
+            with etapa('produtividade', linhas=len(df_transacoes_completo)):
+                produtividade.adicionar(df_transacoes_completo)
+        with etapa('perfil_clientes', linhas=len(df_transacoes_completo)):
+            perfil.adicionar(df_transacoes_completo)
+        total_linhas = len(df_transacoes_completo)
+        volume_total = df_transacoes_completo['valor_transacao'].sum()
+        data_min = df_transacoes_completo['data_transacao'].min()
+        data_max = df_transacoes_completo['data_transacao'].max()
+    else:
+        try:
+            with etapa('streaming') as medida:
+                streaming = processar_em_blocos(
+                    data_path / "transacoes.csv", output_file,
+                    dimensoes, chunksize, output_format, carga, produtividade, perfil
+                )
+                medida['linhas'] = streaming['total_linhas']
+        except Exception as e:
+            print(f"❌ Erro no processamento em blocos: {e}")
+            if carga is not None:
+                carga.cancelar()
+            return None
+        
+        cubo = streaming['cubo']
+        total_linhas = streaming['total_linhas']
+        volume_total = streaming['volume_total']
+        data_min = streaming['data_min']
+        data_max = streaming['data_max']
     
     print("\n📅 CRIANDO DIMENSÃO DE DATAS")
     print("="*40)
     
     # 5. Criando a dim_datas separada (melhor prática de BI)
-    if pd.api.types.is_datetime64_any_dtype(df_transacoes_completo['data_transacao']):
+    if not criar_calendario:
+        print("  ⏭️ dim_datas fica para a etapa de calendário do pipeline")
+        dim_dates = pd.DataFrame()
+    elif pd.notna(data_min) and pd.notna(data_max):
         try:
-            # Pega a data mínima e máxima das transações pra criar o range
-            data_min = df_transacoes_completo['data_transacao'].min()
-            data_max = df_transacoes_completo['data_transacao'].max()
-            
             print(f"  📅 Período: {data_min.date()} a {data_max.date()}")
             
-            # Cria um range de todas as datas no período, sem faltar nenhuma
-            datas_completas = pd.date_range(start=data_min.date(), end=data_max.date(), freq='D')
-            
-            # Monta o DataFrame da dimensão de datas
-            dim_dates = pd.DataFrame({
-                'data': datas_completas,
-                'ano': datas_completas.year,
-                'mes': datas_completas.month,
-                'dia': datas_completas.day,
-                'dia_semana': datas_completas.day_name(),
-                'mes_nome': datas_completas.month_name(),
-                'trimestre': datas_completas.quarter,
-                'semana_ano': datas_completas.isocalendar().week,
-                'dia_ano': datas_completas.dayofyear,
-                'semestre': ((datas_completas.quarter + 1) // 2).astype(int)
-            })
-            
-            # Traduz as colunas de data para português
-            dim_dates['dia_semana_pt'] = dim_dates['dia_semana'].map(dias_pt)
-            dim_dates['mes_nome_pt'] = dim_dates['mes_nome'].map(meses_pt)
-            dim_dates['mes_tipo'] = dim_dates['mes'].apply(lambda x: 'Par' if x % 2 == 0 else 'Ímpar')
-            
+            with etapa('calendario') as medida:
+                dim_dates = obter_calendario(data_min, data_max, cache=processed_path / ARQUIVO_CALENDARIO)
+                medida['linhas'] = len(dim_dates)
             print(f"✅ Dimensão de datas criada: {len(dim_dates):,} registros")
-            
+        
         except Exception as e:
             print(f"⚠️ Erro ao criar dimensão de datas: {e}")
             dim_dates = pd.DataFrame()
@@ -247,118 +809,173 @@ def load_banvic_data():
         print("⚠️ Não foi possível criar dimensão de datas (data_transacao não é datetime)")
         dim_dates = pd.DataFrame()
     
+    # Perfil dos clientes (RFM, relacionamento e faixa etária) acrescentado à dim_clientes
+    try:
+        with etapa('perfil_clientes', linhas=len(df_clientes)):
+            df_dim_clientes = perfil.tabela(df_clientes, data_max)
+    except Exception as e:
+        print(f"⚠️ Erro ao calcular o perfil dos clientes (dim_clientes sai sem ele): {e}")
+        df_dim_clientes = df_clientes
+    
     print("\n💾 SALVANDO ARQUIVOS PARA POWER BI")
     print("="*40)
     
     # 6. Exportando os arquivos CSV que serão usados no Power BI
     try:
-        # Tabela principal com tudo junto
-        output_file = processed_path / "transacoes_powerbi.csv"
-        df_transacoes_completo.to_csv(output_file, index=False, encoding='utf-8-sig')
-        print(f"✅ {output_file.name}: {len(df_transacoes_completo):,} registros")
-        
-        # Dimensões separadas para montar o modelo estrela no PBI
-        df_clientes.to_csv(processed_path / "dim_clientes.csv", index=False, encoding='utf-8-sig')
-        print(f"✅ dim_clientes.csv: {len(df_clientes):,} registros")
+        # Tabela principal com tudo junto (no modo streaming ela já foi gravada bloco a bloco)
+        if chunksize is None:
+            with etapa('gravacao_transacoes', linhas=total_linhas):
+                if output_format in ('csv', 'ambos'):
+                    df_transacoes_completo.to_csv(output_file, index=False, encoding='utf-8-sig')
+                if output_format in ('parquet', 'ambos'):
+                    limpar_parquet(output_file.with_suffix('.parquet'))
+                    salvar_parquet(df_transacoes_completo, output_file.with_suffix('.parquet'), particionar=True)
+            if carga is not None:
+                with etapa('gravacao_sqlite', linhas=total_linhas):
+                    carga.adicionar(df_transacoes_completo)
+        print(f"✅ {output_file.stem} ({output_format}): {total_linhas:,} registros")
         
-        df_agencias.to_csv(processed_path / "dim_agencias.csv", index=False, encoding='utf-8-sig')
-        print(f"✅ dim_agencias.csv: {len(df_agencias):,} registros")
+        with etapa('gravacao_dimensoes', linhas=len(df_clientes) + len(df_agencias) + len(dim_dates)):
+            # Dimensões separadas para montar o modelo estrela no PBI
+            salvar_tabela(df_dim_clientes, processed_path, "dim_clientes", output_format)
+            print(f"✅ dim_clientes: {len(df_dim_clientes):,} registros")
         
-        if not dim_dates.empty:
-            dim_dates.to_csv(processed_path / "dim_datas.csv", index=False, encoding='utf-8-sig')
-            print(f"✅ dim_datas.csv: {len(dim_dates):,} registros")
+            salvar_tabela(df_agencias, processed_path, "dim_agencias", output_format)
+            print(f"✅ dim_agencias: {len(df_agencias):,} registros")
         
+            if not dim_dates.empty:
+                salvar_tabela(dim_dates, processed_path, "dim_datas", output_format)
+                print(f"✅ dim_datas: {len(dim_dates):,} registros")
+    
+        # Colaboradores e produtividade por colaborador e por agência
+        tabelas_produtividade = {}
+        if produtividade is not None:
+            tabelas_produtividade = salvar_produtividade(produtividade, df_agencias, processed_path, output_format)
+    
     except Exception as e:
         print(f"❌ Erro ao salvar arquivos: {e}")
+        if carga is not None:
+            carga.cancelar()
         return None
     
     print("\n📈 CRIANDO RESUMOS EXECUTIVOS")
     print("="*40)
     
-    # 7. Gerando alguns resumos pré-calculados (opcional, mas pode ser útil para validar)
+    # 7. Cubo diário (dia x agência x tipo de cliente) e os resumos calculados a partir dele
     try:
-        if 'dia_semana_pt' in df_transacoes_completo.columns and 'valor_transacao' in df_transacoes_completo.columns:
-            # Resumo por dia da semana
-            resumo_dias = df_transacoes_completo.groupby('dia_semana_pt').agg({
-                'cod_transacao': 'count',
-                'valor_transacao': ['sum', 'mean']
-            }).round(2)
-            resumo_dias.columns = ['Qtd_Transacoes', 'Volume_Total', 'Valor_Medio']
-            resumo_dias.to_csv(processed_path / "resumo_dias_semana.csv", encoding='utf-8-sig')
-            print("✅ resumo_dias_semana.csv")
-        
-        if 'mes_tipo' in df_transacoes_completo.columns:
-            # Resumo por mês (par/ímpar)
-            resumo_meses = df_transacoes_completo.groupby('mes_tipo').agg({
-                'cod_transacao': 'count',
-                'valor_transacao': ['sum', 'mean']
-            }).round(2)
-            resumo_meses.columns = ['Qtd_Transacoes', 'Volume_Total', 'Valor_Medio']
-            resumo_meses.to_csv(processed_path / "resumo_meses_tipo.csv", encoding='utf-8-sig')
-            print("✅ resumo_meses_tipo.csv")
+        with etapa('gravacao_cubo', linhas=len(cubo)):
+            salvar_cubo(cubo, processed_path, output_format)
+        print(f"✅ cubo_diario: {len(cubo):,} células")
         
-        # Resumo por agência (últimos 6 meses)
-        if pd.api.types.is_datetime64_any_dtype(df_transacoes_completo['data_transacao']):
-            data_max = df_transacoes_completo['data_transacao'].max()
-            data_corte = data_max - pd.DateOffset(months=6)
-            dados_recentes = df_transacoes_completo[df_transacoes_completo['data_transacao'] >= data_corte]
-            
-            if 'cod_agencia' in dados_recentes.columns and len(dados_recentes) > 0:
-                agencia_cols = ['cod_agencia']
-                if 'nome_agencia' in dados_recentes.columns:
-                    agencia_cols.append('nome_agencia')
-                
-                resumo_agencias = dados_recentes.groupby(agencia_cols).agg({
-                    'cod_transacao': 'count',
-                    'valor_transacao': ['sum', 'mean']
-                }).round(2)
-                resumo_agencias.columns = ['Qtd_Transacoes', 'Volume_Total', 'Valor_Medio']
-                resumo_agencias = resumo_agencias.sort_values('Qtd_Transacoes', ascending=False)
-                resumo_agencias.to_csv(processed_path / "resumo_agencias_6m.csv", encoding='utf-8-sig')
-                print("✅ resumo_agencias_6m.csv")
-                
+        if criar_resumos:
+            salvar_resumos(cubo, df_agencias, processed_path, output_format, janelas_ranking)
+        else:
+            print("  ⏭️ Resumos ficam para a etapa de resumos do pipeline")
+    
     except Exception as e:
         print(f"⚠️ Erro ao criar resumos: {e}")
     
+    # 8. Banco SQLite: dimensões e cubo junto da fato, índices e views de resumo
+    if carga is not None:
+        tabelas_sqlite = {'dim_clientes': df_dim_clientes, 'dim_agencias': df_agencias, 'cubo_diario': cubo.reset_index(),
+                          **tabelas_produtividade}
+        if not dim_dates.empty:
+            tabelas_sqlite['dim_datas'] = dim_dates
+        try:
+            with etapa('indices_sqlite'):
+                carga.finalizar(tabelas_sqlite)
+            print(f"✅ {arquivo_banco(processed_path).name}: fato, dimensões, cubo e views de resumo")
+        except Exception as e:
+            print(f"❌ Erro ao gravar o banco SQLite: {e}")
+            sqlite = False
+    
+    # Guarda a marca d'água para a próxima execução incremental (o cubo já está salvo)
+    if incremental:
+        salvar_estado(processed_path / ARQUIVO_ESTADO, montar_estado(
+            hashes, output_format, total_linhas, volume_total, data_min, data_max, 1, sqlite
+        ))
+        print(f"✅ {ARQUIVO_ESTADO}")
+    
     print("\n" + "="*60)
     print("✅ PROCESSAMENTO CONCLUÍDO!")
     print("="*60)
     
     # Algumas estatísticas pra conferir no final
-    if pd.api.types.is_datetime64_any_dtype(df_transacoes_completo['data_transacao']):
-        data_min = df_transacoes_completo['data_transacao'].min()
-        data_max = df_transacoes_completo['data_transacao'].max()
+    if pd.notna(data_min) and pd.notna(data_max):
         print(f"📊 Período dos dados: {data_min.strftime('%d/%m/%Y')} a {data_max.strftime('%d/%m/%Y')}")
     
-    print(f"💳 Total de transações: {len(df_transacoes_completo):,}")
-    
-    if 'valor_transacao' in df_transacoes_completo.columns:
-        volume_total = df_transacoes_completo['valor_transacao'].sum()
-        print(f"💰 Volume total: R$ {volume_total:,.2f}")
-    
+    print(f"💳 Total de transações: {total_linhas:,}")
+    print(f"💰 Volume total: R$ {volume_total:,.2f}")
     print(f"👥 Total de clientes: {len(df_clientes):,}")
     print(f"🏢 Total de agências: {len(df_agencias):,}")
     
-    print(f"\n📁 Arquivos criados em: {processed_path}")
-    print("  - transacoes_powerbi.csv (arquivo principal)")
-    print("  - dim_clientes.csv")
-    print("  - dim_agencias.csv") 
+    print(f"\n📁 Arquivos criados em: {processed_path} (formato: {output_format})")
+    print("  - transacoes_powerbi (arquivo principal)")
+    print("  - dim_clientes (com o perfil RFM dos clientes)")
+    print("  - dim_agencias")
     if not dim_dates.empty:
-        print("  - dim_datas.csv")
-    print("  - resumo_dias_semana.csv")
-    print("  - resumo_meses_tipo.csv")
-    print("  - resumo_agencias_6m.csv")
+        print("  - dim_datas")
+    print("  - cubo_diario")
+    print("  - resumo_dias_semana")
+    print("  - resumo_meses_tipo")
+    print("  - resumo_agencias_6m")
+    print("  - ranking_agencias_janelas / ranking_agencias_mensal")
+    if produtividade is not None:
+        print(f"  - {TABELA_COLABORADORES} / {TABELA_PRODUTIVIDADE} / {TABELA_PRODUTIVIDADE_AGENCIAS}")
+    if sqlite:
+        print(f"  - {arquivo_banco(processed_path).name} (SQLite com a fato, as dimensões e as views de resumo)")
+    if validar and chunksize is None:
+        print(f"  - {ARQUIVO_REJEITADOS} (linhas reprovadas na validação, com o motivo)")
     print("="*60)
     
+    if chunksize is not None or incremental:
+        return output_file
     return df_transacoes_completo
 
 # Bloco principal para rodar o script todo
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETL BanVic para o Power BI")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="processa transacoes.csv em blocos de N linhas (memória limitada)")
+    parser.add_argument('--formato', choices=FORMATOS_SAIDA, default='csv',
+                        help="formato dos arquivos em dados/processed")
+    parser.add_argument('--incremental', action='store_true',
+                        help="processa só as transações novas desde a última execução")
+    parser.add_argument('--janelas-ranking', type=int, nargs='+', default=None,
+                        help="janelas (em dias) do ranking de agências (padrão: 30 90 180 365)")
+    parser.add_argument('--entrada', default=str(PASTA_ENTRADA_PADRAO),
+                        help="pasta com os CSVs originais do BanVic")
+    parser.add_argument('--saida', default=str(PASTA_SAIDA_PADRAO),
+                        help="pasta onde os arquivos para o Power BI são gravados")
+    parser.add_argument('--processos', type=int, default=None,
+                        help="lê e enriquece transacoes.csv em N processos (sem --chunksize)")
+    parser.add_argument('--sqlite', action='store_true',
+                        help="grava também <saida>/banvic.db (SQLite com índices e views de resumo)")
+    parser.add_argument('--validar', action='store_true',
+                        help="checa as regras de qualidade e grava <saida>/rejeitados.csv (sem --chunksize)")
+    parser.add_argument('--descartar-rejeitados', action='store_true',
+                        help="com --validar, deixa as transações reprovadas fora da fato e do cubo")
+    parser.add_argument('--perfil', action='store_true',
+                        help="mede tempo, CPU, memória e linhas de cada etapa (JSON em <saida>/relatorios)")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="com --perfil, inclui o pico de memória alocada pelo Python em cada etapa")
+    parser.add_argument('--cprofile', action='store_true',
+                        help="com --perfil, inclui as funções mais caras do cProfile (e o .prof)")
+    args = parser.parse_args()
+    
+    if args.perfil or args.tracemalloc or args.cprofile:
+        iniciar_perfil('etl', tracemalloc=args.tracemalloc, cprofile=args.cprofile)
+    
     print("🚀 INICIANDO INTEGRAÇÃO BANVIC + POWER BI")
     print("="*60)
     
     try:
-        dados = load_banvic_data()
+        with etapa('etl'):
+            dados = load_banvic_data(chunksize=args.chunksize, output_format=args.formato,
+                                     incremental=args.incremental, janelas_ranking=args.janelas_ranking,
+                                     data_path=args.entrada, processed_path=args.saida, sqlite=args.sqlite,
+                                     processos=args.processos, validar=args.validar,
+                                     descartar_rejeitados=args.descartar_rejeitados)
         if dados is not None:
             print("\n🎉 SUCESSO! Dados prontos para importação no Power BI")
         else:
@@ -366,4 +983,6 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"\n❌ ERRO GERAL: {e}")
         import traceback
-        traceback.print_exc()
\ No newline at end of file
+        traceback.print_exc()
+    finally:
+        finalizar_perfil(Path(args.saida) / PASTA_RELATORIOS)
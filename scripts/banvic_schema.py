@@ -0,0 +1,197 @@
+# Esquema de tipos das tabelas do BanVic, usado por todos os leitores de CSV
+# Autor: Nayara Vieira
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from date_normalization import normalizar_datas
+
+# Tipos por arquivo. Chaves em int32/int16, float32 só onde a precisão sobra
+# (taxa com 4 casas) - valores em reais continuam float64 pra não perder centavos
+# nas somas -, category para textos com poucos valores distintos e 'str' para
+# códigos que parecem número mas não são (CEP, CPF). As colunas em 'datas' já
+# saem convertidas para datetime64 na leitura.
+ESQUEMAS = {
+    'transacoes': {
+        'tipos': {
+            'cod_transacao': 'int32',
+            'num_conta': 'int32',
+            'nome_transacao': 'category',
+            'valor_transacao': 'float64',
+        },
+        'datas': ['data_transacao'],
+    },
+    'contas': {
+        'tipos': {
+            'num_conta': 'int32',
+            'cod_cliente': 'int32',
+            'cod_agencia': 'int16',
+            'cod_colaborador': 'int16',
+            'tipo_conta': 'category',
+            'saldo_total': 'float64',
+            'saldo_disponivel': 'float64',
+        },
+        'datas': ['data_abertura', 'data_ultimo_lancamento'],
+    },
+    'clientes': {
+        'tipos': {
+            'cod_cliente': 'int32',
+            'primeiro_nome': 'category',
+            'ultimo_nome': 'category',
+            'email': 'str',
+            'tipo_cliente': 'category',
+            'cpfcnpj': 'str',
+            'endereco': 'str',
+            'cep': 'str',
+        },
+        'datas': ['data_inclusao', 'data_nascimento'],
+    },
+    'agencias': {
+        'tipos': {
+            'cod_agencia': 'int16',
+            'nome': 'category',
+            'endereco': 'str',
+            'cidade': 'category',
+            'uf': 'category',
+            'tipo_agencia': 'category',
+        },
+        'datas': ['data_abertura'],
+    },
+    'colaboradores': {
+        'tipos': {
+            'cod_colaborador': 'int16',
+            'primeiro_nome': 'str',
+            'ultimo_nome': 'str',
+            'email': 'str',
+            'cpf': 'str',
+            'endereco': 'str',
+            'cep': 'str',
+        },
+        'datas': ['data_nascimento'],
+    },
+    'colaborador_agencia': {
+        'tipos': {
+            'cod_colaborador': 'int16',
+            'cod_agencia': 'int16',
+        },
+        'datas': [],
+    },
+    'propostas_credito': {
+        'tipos': {
+            'cod_proposta': 'int32',
+            'cod_cliente': 'int32',
+            'cod_colaborador': 'int16',
+            'taxa_juros_mensal': 'float32',
+            'valor_proposta': 'float64',
+            'valor_financiamento': 'float64',
+            'valor_entrada': 'float64',
+            'valor_prestacao': 'float64',
+            'quantidade_parcelas': 'int16',
+            'carencia': 'int8',
+            'status_proposta': 'category',
+        },
+        'datas': ['data_entrada_proposta'],
+    },
+    # Calendário canônico (calendario.py), gravado pelo ETL como dim_datas.csv
+    'dim_datas': {
+        'tipos': {
+            'ano': 'int16',
+            'mes': 'int8',
+            'dia': 'int8',
+            'dia_semana': 'category',
+            'mes_nome': 'category',
+            'trimestre': 'int8',
+            'semana_ano': 'int8',
+            'dia_ano': 'int16',
+            'semestre': 'int8',
+            'dia_semana_pt': 'category',
+            'mes_nome_pt': 'category',
+            'mes_tipo': 'category',
+            'dia_semana_num': 'int8',
+            'eh_fim_semana': 'int8',
+            'eh_mes_par': 'int8',
+            'eh_feriado': 'int8',
+            'nome_feriado': 'category',
+            'eh_dia_util': 'int8',
+        },
+        'datas': ['data'],
+    },
+}
+
+# dim_dates.csv (dashboard) mantém os nomes antigos: dia_semana é o número (segunda = 1)
+# e os nomes em inglês ficam em nome_dia_semana/nome_mes; o resto segue o calendário canônico
+NOMES_DIM_DATES = {'dia_semana_num': 'dia_semana', 'dia_semana': 'nome_dia_semana', 'mes_nome': 'nome_mes'}
+ESQUEMAS['dim_dates'] = {
+    'tipos': {NOMES_DIM_DATES.get(col, col): tipo for col, tipo in ESQUEMAS['dim_datas']['tipos'].items()},
+    'datas': ['data'],
+}
+
+def esquema_do_arquivo(caminho):
+    """Retorna o esquema de um CSV pelo nome do arquivo (ou None se não for uma tabela conhecida)."""
+    nome = Path(caminho).stem.replace('_corrigido', '')
+    return ESQUEMAS.get(nome)
+
+def tipos_leitura(esquema, colunas=None):
+    """
+    Monta o dtype do read_csv. Inteiros são lidos como inteiros anuláveis (Int32...)
+    pra um valor vazio não quebrar a leitura; depois compactar_inteiros devolve o
+    tipo numpy quando a coluna não tem nulos.
+    """
+    tipos = {}
+    for col, tipo in esquema['tipos'].items():
+        if colunas is not None and col not in colunas:
+            continue
+        if tipo.startswith('int'):
+            tipo = 'I' + tipo[1:]
+        tipos[col] = tipo
+    return tipos
+
+def compactar_inteiros(df, esquema):
+    """Troca Int32/Int16 anulável por int32/int16 numpy nas colunas sem nulos."""
+    for col, tipo in esquema['tipos'].items():
+        if tipo.startswith('int') and col in df.columns and not df[col].isna().any():
+            df[col] = df[col].to_numpy(dtype=np.dtype(tipo))
+    return df
+
+def aplicar_esquema(df, esquema, nome='tabela'):
+    """Finaliza os tipos de um bloco lido: inteiros compactos e datas já convertidas."""
+    df = compactar_inteiros(df, esquema)
+    for col in esquema['datas']:
+        if col in df.columns:
+            df[col], rejeitadas = normalizar_datas(df[col])
+            if len(rejeitadas) > 0:
+                print(f"⚠️ {nome}.{col}: {len(rejeitadas)} datas em formato desconhecido "
+                      f"(ex.: {rejeitadas.drop_duplicates().head(3).tolist()})")
+    return df
+
+def ler_tabela(caminho, colunas=None, chunksize=None, converter_datas=True, tabela=None, **kwargs):
+    """
+    Lê um CSV do BanVic com os tipos do esquema (o nome do arquivo define a tabela).
+    
+    - colunas: projeção de colunas (usecols); só essas são lidas do disco.
+    - chunksize: se informado, retorna um iterador de blocos já tipados.
+    - converter_datas: com False as colunas de data ficam como texto (útil pra quem
+      quer tratar as rejeitadas por conta própria).
+    - tabela: nome do esquema, quando o arquivo não tem o nome da tabela (ou quando
+      `caminho` é um buffer, como as faixas de bytes do ETL paralelo).
+    """
+    esquema = esquema_do_arquivo(caminho) if tabela is None else ESQUEMAS[tabela]
+    if esquema is None:
+        return pd.read_csv(caminho, usecols=colunas, chunksize=chunksize, **kwargs)
+    
+    if not converter_datas:
+        esquema = dict(esquema, datas=[])
+    
+    nome = Path(caminho).stem if isinstance(caminho, (str, Path)) else (tabela or 'tabela')
+    leitor = pd.read_csv(
+        caminho,
+        usecols=colunas,
+        dtype=tipos_leitura(esquema, colunas),
+        chunksize=chunksize,
+        **kwargs
+    )
+    
+    if chunksize is None:
+        return aplicar_esquema(leitor, esquema, nome)
+    return (aplicar_esquema(bloco, esquema, nome) for bloco in leitor)
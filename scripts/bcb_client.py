@@ -0,0 +1,211 @@
+# Cliente da API de séries temporais (SGS) do Banco Central do Brasil, com cache local
+# Autor: Nayara Vieira
+
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from etl_state import carregar_estado, salvar_estado
+
+# Endereço da API. Pode ser trocado (ex.: um servidor local nos testes)
+URL_BCB = 'https://api.bcb.gov.br'
+CAMINHO_SERIE = '/dados/serie/bcdata.sgs.{codigo}/dados'
+
+# Códigos SGS usados no projeto
+SERIE_DOLAR = 1
+
+# (conexão, leitura) em segundos
+TIMEOUT_PADRAO = (5, 30)
+
+# A API recusa consultas de séries diárias com mais de 10 anos, então os
+# períodos longos são quebrados em janelas menores
+DIAS_MAX_POR_CONSULTA = 3650
+
+# Cache em disco: dados/cache/bcb na raiz do projeto
+PASTA_CACHE_PADRAO = Path(__file__).resolve().parent.parent / 'dados' / 'cache' / 'bcb'
+
+class ErroBCB(RuntimeError):
+    """Falha ao buscar uma série no BCB (depois de esgotar as tentativas)."""
+
+def criar_sessao(tentativas=5, backoff=0.5, conexoes=10):
+    """
+    Sessão HTTP reaproveitada entre as consultas (pool de conexões), que repete
+    sozinha os erros temporários (429 e 5xx) esperando 0.5s, 1s, 2s...
+    Com `conexoes` o pool fica limitado: threads a mais esperam uma conexão livre.
+    """
+    retry = Retry(
+        total=tentativas,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    sessao = requests.Session()
+    for prefixo in ('https://', 'http://'):
+        sessao.mount(prefixo, HTTPAdapter(max_retries=retry, pool_maxsize=conexoes, pool_block=True))
+    sessao.headers.update({'Accept': 'application/json'})
+    return sessao
+
+def faixas_faltantes(inicio, fim, faixas):
+    """
+    Dado o período pedido e as faixas já baixadas (lista de pares de datas),
+    retorna as janelas que ainda precisam ser buscadas.
+    """
+    faltando = []
+    cursor = inicio
+    for ini, fi in sorted(faixas):
+        if fi < cursor:
+            continue
+        if ini > fim:
+            break
+        if ini > cursor:
+            faltando.append((cursor, min(fim, ini - timedelta(days=1))))
+        cursor = max(cursor, fi + timedelta(days=1))
+        if cursor > fim:
+            break
+    if cursor <= fim:
+        faltando.append((cursor, fim))
+    return faltando
+
+def unir_faixas(faixas):
+    """Junta faixas de datas que se sobrepõem ou se encostam."""
+    unidas = []
+    for ini, fim in sorted(faixas):
+        if unidas and ini <= unidas[-1][1] + timedelta(days=1):
+            unidas[-1] = (unidas[-1][0], max(unidas[-1][1], fim))
+        else:
+            unidas.append((ini, fim))
+    return unidas
+
+def quebrar_janela(inicio, fim, dias=DIAS_MAX_POR_CONSULTA):
+    """Divide um período em janelas de no máximo `dias` dias."""
+    janelas = []
+    while inicio <= fim:
+        limite = min(fim, inicio + timedelta(days=dias - 1))
+        janelas.append((inicio, limite))
+        inicio = limite + timedelta(days=1)
+    return janelas
+
+class ClienteBCB:
+    """
+    Busca séries do SGS só nas janelas de data que ainda não estão no cache.
+    
+    Para cada série o cache guarda os valores (sgs_<codigo>.csv) e as faixas de
+    datas já consultadas (sgs_<codigo>_faixas.json). As faixas são o que vale pra
+    saber se algo falta: fim de semana e feriado não têm cotação, então um
+    "buraco" nos dados não significa que a consulta não foi feita.
+    """
+    
+    def __init__(self, base_url=URL_BCB, pasta_cache=PASTA_CACHE_PADRAO,
+                 timeout=TIMEOUT_PADRAO, tentativas=5, backoff=0.5, conexoes=10, sessao=None):
+        self.base_url = base_url.rstrip('/')
+        self.pasta_cache = Path(pasta_cache) if pasta_cache is not None else None
+        self.timeout = timeout
+        self.sessao = sessao or criar_sessao(tentativas, backoff, conexoes)
+        self.consultas = 0
+        # A mesma instância pode ser usada por várias threads (uma série por thread)
+        self._trava = threading.Lock()
+    
+    def _arquivos_cache(self, codigo):
+        return (self.pasta_cache / f'sgs_{codigo}.csv',
+                self.pasta_cache / f'sgs_{codigo}_faixas.json')
+    
+    def _ler_cache(self, codigo):
+        """Retorna (valores, faixas) do cache; vazio se não houver cache."""
+        vazio = pd.Series(dtype='float64', name='valor', index=pd.DatetimeIndex([], name='data'))
+        if self.pasta_cache is None:
+            return vazio, []
+        
+        arquivo_dados, arquivo_faixas = self._arquivos_cache(codigo)
+        estado = carregar_estado(arquivo_faixas)
+        if estado is None or not arquivo_dados.exists():
+            return vazio, []
+        
+        dados = pd.read_csv(arquivo_dados, parse_dates=['data'])
+        valores = dados.set_index('data')['valor'].astype('float64')
+        faixas = [(date.fromisoformat(ini), date.fromisoformat(fim)) for ini, fim in estado['faixas']]
+        return valores, faixas
+    
+    def _salvar_cache(self, codigo, valores, faixas):
+        self.pasta_cache.mkdir(parents=True, exist_ok=True)
+        arquivo_dados, arquivo_faixas = self._arquivos_cache(codigo)
+        
+        # Primeiro os dados, depois as faixas: se cair no meio, as faixas
+        # antigas continuam valendo e a janela nova é buscada de novo
+        temporario = arquivo_dados.with_suffix('.csv.tmp')
+        valores.rename('valor').to_frame().to_csv(temporario, date_format='%Y-%m-%d')
+        temporario.replace(arquivo_dados)
+        salvar_estado(arquivo_faixas, {
+            'codigo': codigo,
+            'faixas': [[ini.isoformat(), fim.isoformat()] for ini, fim in faixas]
+        })
+    
+    def _buscar_janela(self, codigo, inicio, fim):
+        """Uma consulta à API (dataInicial/dataFinal). Levanta ErroBCB se falhar."""
+        url = self.base_url + CAMINHO_SERIE.format(codigo=codigo)
+        params = {
+            'formato': 'json',
+            'dataInicial': inicio.strftime('%d/%m/%Y'),
+            'dataFinal': fim.strftime('%d/%m/%Y')
+        }
+        
+        try:
+            resposta = self.sessao.get(url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ErroBCB(f"Série {codigo} ({inicio} a {fim}): falha de conexão - {e}") from e
+        with self._trava:
+            self.consultas += 1
+        
+        # Janela sem nenhuma cotação (ex.: só fim de semana ou feriado): a API responde
+        # 404 (com "Value(s) not found" ou mensagem parecida), que não é erro pra gente
+        if resposta.status_code == 404:
+            return pd.Series(dtype='float64', name='valor', index=pd.DatetimeIndex([], name='data'))
+        if resposta.status_code != 200:
+            raise ErroBCB(f"Série {codigo} ({inicio} a {fim}): HTTP {resposta.status_code} - {resposta.text[:200]}")
+        
+        try:
+            registros = resposta.json()
+            dados = pd.DataFrame(registros, columns=['data', 'valor'])
+            datas = pd.to_datetime(dados['data'], format='%d/%m/%Y')
+            valores = pd.to_numeric(dados['valor'])
+        except (ValueError, TypeError, KeyError) as e:
+            raise ErroBCB(f"Série {codigo} ({inicio} a {fim}): resposta inesperada - {e}") from e
+        
+        return pd.Series(valores.to_numpy(dtype='float64'), index=pd.DatetimeIndex(datas, name='data'), name='valor')
+    
+    def serie(self, codigo, inicio, fim):
+        """
+        Retorna a série `codigo` entre `inicio` e `fim` (Series indexada por data).
+        Só as janelas que faltam no cache vão para a API.
+        """
+        inicio = pd.Timestamp(inicio).date()
+        fim = pd.Timestamp(fim).date()
+        if fim < inicio:
+            raise ValueError(f"Período inválido: {inicio} a {fim}")
+        
+        valores, faixas = self._ler_cache(codigo)
+        faltando = faixas_faltantes(inicio, fim, faixas)
+        
+        if faltando:
+            novos = []
+            for ini, fi in faltando:
+                for janela in quebrar_janela(ini, fi):
+                    novos.append(self._buscar_janela(codigo, *janela))
+            
+            valores = pd.concat([valores] + novos)
+            valores = valores[~valores.index.duplicated(keep='last')].sort_index()
+            
+            # O dia de hoje (e o futuro) ainda pode ganhar cotação, então não
+            # entra como "já consultado" e é buscado de novo na próxima vez
+            ontem = date.today() - timedelta(days=1)
+            concluidas = [(ini, min(fi, ontem)) for ini, fi in faltando if ini <= ontem]
+            if self.pasta_cache is not None:
+                self._salvar_cache(codigo, valores, unir_faixas(faixas + concluidas))
+        
+        periodo = (valores.index >= pd.Timestamp(inicio)) & (valores.index <= pd.Timestamp(fim))
+        return valores[periodo]
@@ -0,0 +1,229 @@
+# Benchmark do BanVic: ETL, dashboard e correção de datas em várias escalas de dados sintéticos
+# Autor: Nayara Vieira
+
+import argparse
+import contextlib
+import json
+import math
+import shutil
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from gerar_dados_sinteticos import ESCALAS, gerar_dados, dados_prontos, numero_transacoes
+from perfil_execucao import etapa, iniciar_perfil
+
+RAIZ_PROJETO = Path(__file__).resolve().parent.parent
+PASTA_BENCHMARK_PADRAO = RAIZ_PROJETO / "dados" / "benchmark"
+
+# Histórico de todas as execuções (uma linha por escala x etapa), pra comparar rodadas
+ARQUIVO_HISTORICO = 'benchmark_historico.csv'
+
+# Passos medidos → nome da etapa no relatório (o processar_datas roda dentro da carga do dashboard)
+PASSOS = {
+    'load_banvic_data': 'load_banvic_data',
+    'processar_datas': 'dashboard/processar_datas',
+    'analise_transacoes_por_dia_semana': 'analise_transacoes_por_dia_semana',
+    'verificar_hipotese_meses_pares': 'verificar_hipotese_meses_pares',
+    'ranking_agencias': 'ranking_agencias',
+    'corrigir_formato_data': 'corrigir_formato_data',
+}
+
+# Arquivos que os próprios scripts gravam na pasta de dados (cache do calendário,
+# rankings, CSVs corrigidos) e que são apagados antes de cada medição
+DERIVADOS = ['dim_dates.csv', 'ranking_agencias*.csv', '*_corrigido.csv']
+
+# Acima disso o custo cresce mais rápido que os dados (expoente do log-log entre escalas)
+EXPOENTE_ALERTA = 1.2
+
+# Acima disso o passo ficou mais lento que na execução anterior da mesma escala
+RAZAO_ALERTA = 1.2
+
+def medir_escala(pasta_dados, pasta_saida, chunksize=None, pular=()):
+    """
+    Roda os passos do benchmark numa pasta de dados, cada um dentro de uma etapa
+    do perfil ativo. Os scripts importam matplotlib e afins, por isso só aqui.
+    """
+    from banvic_powerbi_integration_fixed import load_banvic_data
+    from dashboard_banvic_csv import BanVicDashboard
+    from fix_csv_issues import corrigir_formato_data
+    
+    pasta_dados = Path(pasta_dados)
+    for padrao in DERIVADOS:
+        for arquivo in pasta_dados.glob(padrao):
+            arquivo.unlink()
+    shutil.rmtree(pasta_saida, ignore_errors=True)
+    
+    if 'load_banvic_data' not in pular:
+        with etapa('load_banvic_data'):
+            load_banvic_data(chunksize=chunksize, data_path=pasta_dados, processed_path=pasta_saida)
+    
+    analises = [p for p in PASSOS if p.startswith(('analise', 'verificar', 'ranking')) and p not in pular]
+    if 'processar_datas' not in pular or analises:
+        with etapa('dashboard'):
+            # Sem o cache colunar: o benchmark mede a leitura e o tratamento dos CSVs
+            dashboard = BanVicDashboard(data_path=f'{pasta_dados}/', usar_cache=False)
+        for nome in analises:
+            with etapa(nome):
+                getattr(dashboard, nome)()
+        del dashboard
+    
+    if 'corrigir_formato_data' not in pular:
+        with etapa('corrigir_formato_data'):
+            corrigir_formato_data(str(pasta_dados / 'transacoes.csv'), 'data_transacao',
+                                  output_path=str(Path(pasta_saida) / 'transacoes_corrigido.csv'))
+
+def executar_interno(args):
+    """Modo usado pelo subprocesso de cada escala: mede e grava o relatório JSON."""
+    perfil = iniciar_perfil(f'benchmark_{args.escala}', tracemalloc=args.tracemalloc)
+    pasta = Path(args.pasta) / args.escala
+    with open(pasta / 'benchmark.log', 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        medir_escala(pasta / 'dados', pasta / 'saida', args.chunksize, args.pular)
+    
+    with open(args.interno, 'w', encoding='utf-8') as f:
+        json.dump(perfil.relatorio({'escala': args.escala, 'transacoes': numero_transacoes(args.escala)}),
+                  f, ensure_ascii=False, indent=2, default=str)
+
+def rodar_escala(escala, args):
+    """
+    Gera os dados da escala (se ainda não existirem) e mede num processo separado,
+    pra o pico de memória de uma escala não contaminar a seguinte. Retorna o relatório (ou None).
+    """
+    pasta_dados = Path(args.pasta) / escala / 'dados'
+    if not dados_prontos(pasta_dados, escala, args.semente):
+        gerar_dados(pasta_dados, escala, args.semente)
+    
+    arquivo = Path(args.pasta) / escala / 'relatorio.json'
+    comando = [sys.executable, __file__, '--interno', str(arquivo), '--escalas', escala, '--pasta', str(args.pasta)]
+    if args.chunksize:
+        comando += ['--chunksize', str(args.chunksize)]
+    if args.pular:
+        comando += ['--pular'] + args.pular
+    if args.tracemalloc:
+        comando.append('--tracemalloc')
+    
+    print(f"\n⏱️ Medindo {escala} ({numero_transacoes(escala):,} transações)...")
+    processo = subprocess.run(comando)
+    if processo.returncode != 0 or not arquivo.exists():
+        print(f"❌ {escala}: benchmark falhou (código {processo.returncode}); veja {Path(args.pasta) / escala / 'benchmark.log'}")
+        return None
+    with open(arquivo, encoding='utf-8') as f:
+        return json.load(f)
+
+def linhas_historico(relatorio, execucao):
+    """Uma linha por etapa do relatório, no formato do histórico."""
+    linhas = []
+    for medida in relatorio['etapas']:
+        linhas.append({
+            'execucao': execucao,
+            'escala': relatorio['escala'],
+            'transacoes': relatorio['transacoes'],
+            'etapa': medida['etapa'],
+            'segundos': medida['segundos'],
+            'cpu_segundos': medida['cpu_segundos'],
+            'linhas': medida.get('linhas'),
+            'rss_fim_mb': medida.get('rss_fim_mb'),
+            'pico_rss_processo_mb': medida.get('pico_rss_processo_mb'),
+            'pico_python_mb': medida.get('pico_python_mb'),
+            'status': medida['status']
+        })
+    return linhas
+
+def comparar(historico, execucao):
+    """
+    Quadro da execução atual: segundos de cada passo por escala, o expoente de
+    crescimento entre escalas vizinhas (1 = linear) e a razão contra a execução anterior.
+    """
+    atual = historico[(historico['execucao'] == execucao) & historico['etapa'].isin(PASSOS.values())]
+    if atual.empty:
+        return pd.DataFrame()
+    
+    passo_da_etapa = {nome: passo for passo, nome in PASSOS.items()}
+    tempos = atual.pivot_table(index='etapa', columns='transacoes', values='segundos', aggfunc='first')
+    tempos = tempos.reindex([e for e in PASSOS.values() if e in tempos.index]).rename(index=passo_da_etapa)
+    tempos.columns.name = None
+    tempos.index.name = None
+    
+    quadro = tempos.rename(columns=lambda n: f's@{n:,}')
+    escalas = list(tempos.columns)
+    for menor, maior in zip(escalas, escalas[1:]):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expoente = np.log(tempos[maior] / tempos[menor]) / math.log(maior / menor)
+        quadro[f'expoente {menor:,}→{maior:,}'] = expoente.replace([np.inf, -np.inf], np.nan).round(2)
+    
+    # Mesma escala e passo na execução anterior
+    anteriores = historico[(historico['execucao'] < execucao) & historico['etapa'].isin(PASSOS.values())]
+    if not anteriores.empty and escalas:
+        maior = escalas[-1]
+        ultima = anteriores[anteriores['transacoes'] == maior].sort_values('execucao').groupby('etapa')['segundos'].last()
+        ultima = ultima.rename(index=passo_da_etapa)
+        quadro[f'vs anterior @{maior:,}'] = (tempos[maior] / ultima.reindex(tempos.index)).round(2)
+    return quadro
+
+def imprimir_comparacao(quadro):
+    print("\n" + "="*60)
+    print("📋 RESULTADO DO BENCHMARK (segundos)")
+    print("="*60)
+    if quadro.empty:
+        print("⚠️ Nenhuma escala foi medida")
+        return
+    print(quadro.to_string())
+    
+    alertas = []
+    for coluna in quadro.columns:
+        if coluna.startswith('expoente'):
+            for passo, valor in quadro[coluna].items():
+                if pd.notna(valor) and valor > EXPOENTE_ALERTA:
+                    alertas.append(f"⚠️ {passo}: cresce mais que linear ({coluna} = {valor})")
+        elif coluna.startswith('vs anterior'):
+            for passo, valor in quadro[coluna].items():
+                if pd.notna(valor) and valor > RAZAO_ALERTA:
+                    alertas.append(f"⚠️ {passo}: {valor}x mais lento que a execução anterior")
+    for alerta in alertas:
+        print(alerta)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do BanVic em escalas de dados sintéticos")
+    parser.add_argument('--escalas', nargs='+', default=['10k', '1m'],
+                        help=f"escalas a medir ({' / '.join(ESCALAS)} ou nº de transações)")
+    parser.add_argument('--pasta', default=str(PASTA_BENCHMARK_PADRAO), help="pasta dos dados e resultados")
+    parser.add_argument('--semente', type=int, default=42, help="semente dos dados sintéticos")
+    parser.add_argument('--chunksize', type=int, default=None, help="ETL em blocos de N linhas (para escalas grandes)")
+    parser.add_argument('--pular', nargs='+', choices=list(PASSOS), default=[], help="passos que não são medidos")
+    parser.add_argument('--tracemalloc', action='store_true', help="inclui o pico de memória do Python por etapa")
+    parser.add_argument('--interno', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.interno:
+        args.escala = args.escalas[0]
+        executar_interno(args)
+        return
+    
+    print("🏁 BENCHMARK BANVIC")
+    print("="*60)
+    execucao = datetime.now().isoformat(timespec='seconds')
+    escalas = sorted(args.escalas, key=numero_transacoes)
+    
+    linhas = []
+    for escala in escalas:
+        relatorio = rodar_escala(escala, args)
+        if relatorio is not None:
+            linhas += linhas_historico(relatorio, execucao)
+    
+    arquivo_historico = Path(args.pasta) / ARQUIVO_HISTORICO
+    novas = pd.DataFrame(linhas)
+    if arquivo_historico.exists():
+        historico = pd.concat([pd.read_csv(arquivo_historico), novas], ignore_index=True)
+    else:
+        historico = novas
+    if not novas.empty:
+        novas.to_csv(arquivo_historico, mode='a', header=not arquivo_historico.exists(), index=False)
+        print(f"\n💾 Histórico: {arquivo_historico}")
+    
+    imprimir_comparacao(comparar(historico, execucao) if not historico.empty else pd.DataFrame())
+
+if __name__ == "__main__":
+    main()
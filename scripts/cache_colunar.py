@@ -0,0 +1,154 @@
+# Cache colunar das transações já tratadas (arrays NumPy mapeados em memória)
+# Autor: Nayara Vieira
+
+import json
+import os
+import shutil
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from etl_state import hash_arquivo, carregar_estado, salvar_estado
+
+# Pasta do cache, dentro da pasta dos CSVs (uma subpasta por versão dos arquivos de origem)
+PASTA_CACHE = '.cache_transacoes'
+
+# Suba quando o tratamento das transações mudar: os caches antigos deixam de valer
+VERSAO_CACHE = 1
+
+ARQUIVO_META = 'meta.json'
+ARQUIVO_ASSINATURAS = 'assinaturas.json'
+
+# Tipos anuláveis do pandas guardados como valores + máscara
+ANULAVEIS = {
+    **{nome: pd.arrays.IntegerArray for nome in ('Int8', 'Int16', 'Int32', 'Int64', 'UInt8', 'UInt16', 'UInt32', 'UInt64')},
+    'Float32': pd.arrays.FloatingArray,
+    'Float64': pd.arrays.FloatingArray,
+    'boolean': pd.arrays.BooleanArray,
+}
+
+def chave_cache(arquivos, pasta_cache):
+    """
+    Chave do cache: hash dos arquivos de origem + VERSAO_CACHE. O SHA-256 de cada
+    arquivo fica guardado com mtime e tamanho, e só é recalculado quando eles mudam.
+    """
+    pasta_cache = Path(pasta_cache)
+    assinaturas = carregar_estado(pasta_cache / ARQUIVO_ASSINATURAS) or {}
+    mudou = False
+    
+    sha = hashlib.sha256(f'v{VERSAO_CACHE}'.encode())
+    for arquivo in arquivos:
+        arquivo = Path(arquivo)
+        if not arquivo.exists():
+            sha.update(f'{arquivo.name}:ausente'.encode())
+            continue
+        info = os.stat(arquivo)
+        atual = {'mtime_ns': info.st_mtime_ns, 'tamanho': info.st_size}
+        anterior = assinaturas.get(arquivo.name) or {}
+        if anterior.get('mtime_ns') != atual['mtime_ns'] or anterior.get('tamanho') != atual['tamanho']:
+            assinaturas[arquivo.name] = dict(atual, sha256=hash_arquivo(arquivo))
+            mudou = True
+        sha.update(f"{arquivo.name}:{assinaturas[arquivo.name]['sha256']}".encode())
+    
+    if mudou:
+        pasta_cache.mkdir(parents=True, exist_ok=True)
+        salvar_estado(pasta_cache / ARQUIVO_ASSINATURAS, assinaturas)
+    return sha.hexdigest()[:20]
+
+def _gravar_coluna(pasta, i, serie):
+    """Grava uma coluna como .npy (mais as categorias/fuso no dicionário de metadados)."""
+    meta = {'nome': serie.name}
+    dtype = serie.dtype
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        meta.update(tipo='data', fuso=str(dtype.tz))
+        valores = serie.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+    elif pd.api.types.is_datetime64_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+        meta.update(tipo='numpy')
+        valores = serie.to_numpy()
+    elif isinstance(dtype, pd.CategoricalDtype):
+        meta.update(tipo='categoria', categorias=dtype.categories.tolist(), ordenada=bool(dtype.ordered))
+        valores = serie.cat.codes.to_numpy()
+    elif str(dtype) in ANULAVEIS:
+        # Inteiros/floats/booleanos anuláveis (Int64, boolean...): valores + máscara de ausentes
+        meta.update(tipo='anulavel', dtype=str(dtype))
+        valores = serie.to_numpy(dtype=dtype.numpy_dtype, na_value=dtype.numpy_dtype.type(0))
+        np.save(pasta / f'{i:03d}_mascara.npy', serie.isna().to_numpy())
+    elif pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        meta.update(tipo='numpy')
+        valores = serie.to_numpy()
+    else:
+        # Textos: códigos + lista de valores distintos, como uma categoria
+        codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+        meta.update(tipo='texto', categorias=distintos.tolist(), dtype=str(dtype))
+        valores = codigos.astype(np.int32)
+    np.save(pasta / f'{i:03d}.npy', np.ascontiguousarray(valores))
+    return meta
+
+def _abrir_coluna(pasta, i, meta):
+    """Abre uma coluna mapeada em memória (sem copiar, exceto o ajuste de fuso das datas)."""
+    valores = np.load(pasta / f'{i:03d}.npy', mmap_mode='c')
+    if meta['tipo'] == 'data':
+        # tz_localize('UTC') faz uma cópia simples dos inteiros; a troca de fuso não copia
+        return pd.Series(valores, copy=False).dt.tz_localize('UTC').dt.tz_convert(meta['fuso']).array
+    if meta['tipo'] == 'categoria':
+        return pd.Categorical.from_codes(valores, meta['categorias'], ordered=meta['ordenada'], validate=False)
+    if meta['tipo'] == 'anulavel':
+        mascara = np.load(pasta / f'{i:03d}_mascara.npy', mmap_mode='c')
+        return ANULAVEIS[meta['dtype']](valores, mascara, copy=False)
+    if meta['tipo'] == 'texto':
+        # Texto solto não tem representação sem cópia: volta a ser montado a partir dos códigos
+        distintos = np.array(meta['categorias'] + [None], dtype=object)
+        return pd.array(distintos[valores], dtype=meta['dtype'])
+    return valores
+
+def salvar_cache(df, pasta_cache, chave):
+    """
+    Grava `df` em pasta_cache/<chave>/ (um .npy por coluna + meta.json). A gravação
+    é feita numa pasta temporária e trocada no final; os caches de outras chaves são apagados.
+    """
+    pasta_cache = Path(pasta_cache)
+    destino = pasta_cache / chave
+    temporaria = pasta_cache / f'{chave}.tmp-{os.getpid()}'
+    shutil.rmtree(temporaria, ignore_errors=True)
+    temporaria.mkdir(parents=True)
+    
+    colunas = [_gravar_coluna(temporaria, i, df[nome]) for i, nome in enumerate(df.columns)]
+    indice = None
+    if not isinstance(df.index, pd.RangeIndex):
+        np.save(temporaria / 'indice.npy', df.index.to_numpy())
+        indice = 'indice.npy'
+    with open(temporaria / ARQUIVO_META, 'w', encoding='utf-8') as f:
+        json.dump({'versao': VERSAO_CACHE, 'chave': chave, 'linhas': len(df),
+                   'colunas': colunas, 'indice': indice}, f, ensure_ascii=False, indent=2)
+    
+    shutil.rmtree(destino, ignore_errors=True)
+    temporaria.replace(destino)
+    
+    # Só a versão atual fica em disco (no Windows um cache ainda aberto não sai, e tudo bem)
+    for antiga in pasta_cache.iterdir():
+        if antiga.is_dir() and antiga.name != chave:
+            shutil.rmtree(antiga, ignore_errors=True)
+    return destino
+
+def abrir_cache(pasta_cache, chave):
+    """
+    DataFrame com as colunas mapeadas em memória, ou None se não houver cache válido.
+    O mapeamento é cópia-na-escrita: alterar o DataFrame não mexe nos arquivos do cache.
+    """
+    pasta = Path(pasta_cache) / chave
+    try:
+        with open(pasta / ARQUIVO_META, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('versao') != VERSAO_CACHE:
+            return None
+        colunas = {coluna['nome']: _abrir_coluna(pasta, i, coluna) for i, coluna in enumerate(meta['colunas'])}
+        indice = np.load(pasta / meta['indice'], mmap_mode='c') if meta['indice'] else None
+        df = pd.DataFrame(colunas, index=indice, copy=False)
+    except (OSError, ValueError, KeyError) as e:
+        if (pasta / ARQUIVO_META).exists():
+            print(f"⚠️ Cache ilegível ({pasta.name}): {e}")
+        return None
+    if len(df) != meta['linhas']:
+        return None
+    return df
@@ -0,0 +1,207 @@
+# Dimensão de datas (calendário) única do Desafio BanVic, usada pelo ETL e pelo dashboard
+# Autor: Nayara Vieira
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from banvic_schema import ESQUEMAS, NOMES_DIM_DATES, ler_tabela
+
+# Traduções usadas nas colunas de data (transações e calendário)
+DIAS_PT = {
+    'Monday': 'Segunda-feira', 'Tuesday': 'Terça-feira',
+    'Wednesday': 'Quarta-feira', 'Thursday': 'Quinta-feira',
+    'Friday': 'Sexta-feira', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
+}
+
+MESES_PT = {
+    'January': 'Janeiro', 'February': 'Fevereiro', 'March': 'Março',
+    'April': 'Abril', 'May': 'Maio', 'June': 'Junho',
+    'July': 'Julho', 'August': 'Agosto', 'September': 'Setembro',
+    'October': 'Outubro', 'November': 'Novembro', 'December': 'Dezembro'
+}
+
+# Feriados nacionais de data fixa: (mês, dia, nome, primeiro ano em que vale)
+FERIADOS_FIXOS = [
+    (1, 1, 'Confraternização Universal', None),
+    (4, 21, 'Tiradentes', None),
+    (5, 1, 'Dia do Trabalho', None),
+    (9, 7, 'Independência do Brasil', None),
+    (10, 12, 'Nossa Senhora Aparecida', None),
+    (11, 2, 'Finados', None),
+    (11, 15, 'Proclamação da República', None),
+    (11, 20, 'Dia Nacional de Zumbi e da Consciência Negra', 2024),  # Lei 14.759/2023
+    (12, 25, 'Natal', None),
+]
+
+# Feriados móveis, em dias a partir do Domingo de Páscoa. Carnaval e Corpus Christi
+# são ponto facultativo, mas entram porque não há expediente bancário nesses dias.
+FERIADOS_MOVEIS = [
+    (-48, 'Carnaval (segunda-feira)'),
+    (-47, 'Carnaval (terça-feira)'),
+    (-2, 'Sexta-feira Santa'),
+    (60, 'Corpus Christi'),
+]
+
+# Esquema canônico do calendário (dim_datas.csv e o calendário em memória)
+COLUNAS_CALENDARIO = list(ESQUEMAS['dim_datas']['datas']) + list(ESQUEMAS['dim_datas']['tipos'])
+
+# dim_dates.csv do dashboard: as 10 colunas do arquivo original, na mesma ordem e com os
+# mesmos nomes (dia_semana numérico), seguidas das colunas novas do calendário canônico
+COLUNAS_DIM_DATES_ORIGINAIS = ['data', 'ano', 'mes', 'dia', 'dia_semana', 'nome_dia_semana', 'nome_mes',
+                               'trimestre', 'eh_fim_semana', 'eh_mes_par']
+COLUNAS_DIM_DATES = COLUNAS_DIM_DATES_ORIGINAIS + [
+    NOMES_DIM_DATES.get(col, col) for col in COLUNAS_CALENDARIO
+    if NOMES_DIM_DATES.get(col, col) not in COLUNAS_DIM_DATES_ORIGINAIS
+]
+
+def domingo_de_pascoa(anos):
+    """Data da Páscoa para cada ano (algoritmo de Meeus/Jones/Butcher, vetorizado)."""
+    y = np.asarray(anos, dtype=np.int64)
+    a = y % 19
+    b, c = y // 100, y % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes = (h + l - 7 * m + 114) // 31
+    dia = (h + l - 7 * m + 114) % 31 + 1
+    return pd.to_datetime(pd.DataFrame({'year': y, 'month': mes, 'day': dia}))
+
+def feriados_nacionais(anos):
+    """Tabela (data, nome_feriado) com os feriados bancários nacionais dos anos pedidos."""
+    anos = np.unique(np.asarray(anos, dtype=np.int64))
+    partes = []
+    
+    for mes, dia, nome, desde in FERIADOS_FIXOS:
+        validos = anos if desde is None else anos[anos >= desde]
+        datas = pd.to_datetime(pd.DataFrame({'year': validos, 'month': mes, 'day': dia}))
+        partes.append(pd.DataFrame({'data': datas, 'nome_feriado': nome}))
+    
+    pascoa = domingo_de_pascoa(anos)
+    for deslocamento, nome in FERIADOS_MOVEIS:
+        partes.append(pd.DataFrame({'data': pascoa + pd.Timedelta(days=deslocamento), 'nome_feriado': nome}))
+    
+    feriados = pd.concat(partes, ignore_index=True).sort_values('data', kind='stable')
+    # Se dois feriados caírem no mesmo dia (ex.: Tiradentes na Sexta-feira Santa), fica o primeiro
+    return feriados.drop_duplicates('data').reset_index(drop=True)
+
+def gerar_calendario(data_min, data_max):
+    """Monta o calendário (um registro por dia) entre data_min e data_max, tudo vetorizado."""
+    datas = pd.date_range(start=pd.Timestamp(data_min).date(), end=pd.Timestamp(data_max).date(), freq='D')
+    
+    calendario = pd.DataFrame({
+        'data': datas,
+        'ano': datas.year,
+        'mes': datas.month,
+        'dia': datas.day,
+        'dia_semana': datas.day_name(),
+        'mes_nome': datas.month_name(),
+        'trimestre': datas.quarter,
+        'semana_ano': datas.isocalendar().week.to_numpy(),
+        'dia_ano': datas.dayofyear,
+        'semestre': (datas.quarter + 1) // 2,
+        'dia_semana_num': datas.dayofweek + 1,  # Segunda = 1, Domingo = 7
+        'eh_fim_semana': (datas.dayofweek >= 5).astype(int),
+        'eh_mes_par': (datas.month % 2 == 0).astype(int)
+    })
+    
+    # Traduções para o relatório
+    calendario['dia_semana_pt'] = calendario['dia_semana'].map(DIAS_PT)
+    calendario['mes_nome_pt'] = calendario['mes_nome'].map(MESES_PT)
+    calendario['mes_tipo'] = np.where(calendario['eh_mes_par'] == 1, 'Par', 'Ímpar')
+    
+    # Feriados: uma busca por índice na tabela de feriados dos anos do período
+    feriados = feriados_nacionais(datas.year.unique())
+    posicoes = pd.Index(feriados['data']).get_indexer(datas)
+    calendario['nome_feriado'] = feriados['nome_feriado'].to_numpy(dtype=object).take(posicoes)
+    calendario.loc[posicoes < 0, 'nome_feriado'] = np.nan
+    calendario['eh_feriado'] = (posicoes >= 0).astype(int)
+    calendario['eh_dia_util'] = ((calendario['eh_fim_semana'] == 0) & (posicoes < 0)).astype(int)
+    
+    return calendario[COLUNAS_CALENDARIO].astype(ESQUEMAS['dim_datas']['tipos'])
+
+def para_dim_dates(calendario):
+    """Calendário canônico no layout da dim_dates.csv (nomes antigos na frente)."""
+    return calendario.rename(columns=NOMES_DIM_DATES)[COLUNAS_DIM_DATES]
+
+def de_dim_dates(dim_dates):
+    """Volta uma dim_dates.csv (layout do dashboard) para o calendário canônico."""
+    canonicos = {antigo: novo for novo, antigo in NOMES_DIM_DATES.items()}
+    return dim_dates.rename(columns=canonicos).reindex(columns=COLUNAS_CALENDARIO)
+
+def ler_cache_calendario(caminho, layout='dim_datas'):
+    """
+    Lê o calendário salvo em disco (`layout` é 'dim_datas' ou 'dim_dates') e devolve
+    no esquema canônico. Retorna None se não existir ou estiver fora do esquema.
+    """
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return None
+    
+    try:
+        calendario = ler_tabela(caminho, tabela=layout)
+    except Exception as e:
+        print(f"⚠️ Cache do calendário ilegível ({caminho.name}): {e}")
+        return None
+    
+    # Arquivos antigos (outro esquema) ou com buracos são descartados e refeitos
+    esperadas = COLUNAS_DIM_DATES if layout == 'dim_dates' else COLUNAS_CALENDARIO
+    if list(calendario.columns) != esperadas or calendario['data'].isna().any():
+        return None
+    if layout == 'dim_dates':
+        calendario = de_dim_dates(calendario)
+    esperado = (calendario['data'].max() - calendario['data'].min()).days + 1
+    if len(calendario) != esperado:
+        return None
+    
+    return calendario.astype(ESQUEMAS['dim_datas']['tipos'])
+
+def salvar_cache_calendario(calendario, caminho, layout='dim_datas'):
+    """Grava o cache (no layout pedido) em um arquivo temporário e troca no final."""
+    caminho = Path(caminho)
+    temporario = caminho.with_suffix(caminho.suffix + '.tmp')
+    if layout == 'dim_dates':
+        calendario = para_dim_dates(calendario)
+    calendario.to_csv(temporario, index=False)
+    temporario.replace(caminho)
+
+def obter_calendario(data_min, data_max, cache=None, layout='dim_datas'):
+    """
+    Retorna o calendário de data_min a data_max.
+    
+    Com `cache` (caminho de um CSV) o calendário fica guardado em disco: se o
+    período já estiver coberto ele só é recortado, e se aparecerem datas novas
+    só os dias que faltam (antes ou depois do que já existe) são gerados. Com
+    layout='dim_dates' o arquivo fica com as colunas da dim_dates.csv do dashboard;
+    o retorno é sempre o calendário canônico.
+    """
+    data_min = pd.Timestamp(data_min).normalize()
+    data_max = pd.Timestamp(data_max).normalize()
+    
+    if cache is None:
+        return gerar_calendario(data_min, data_max)
+    
+    calendario = ler_cache_calendario(cache, layout)
+    if calendario is None:
+        calendario = gerar_calendario(data_min, data_max)
+        salvar_cache_calendario(calendario, cache, layout)
+    else:
+        inicio, fim = calendario['data'].min(), calendario['data'].max()
+        partes = []
+        if data_min < inicio:
+            partes.append(gerar_calendario(data_min, inicio - pd.Timedelta(days=1)))
+        partes.append(calendario)
+        if data_max > fim:
+            partes.append(gerar_calendario(fim + pd.Timedelta(days=1), data_max))
+        
+        if len(partes) > 1:
+            calendario = pd.concat(partes, ignore_index=True).astype(ESQUEMAS['dim_datas']['tipos'])
+            salvar_cache_calendario(calendario, cache, layout)
+            print(f"  📅 Calendário estendido: {calendario['data'].min().date()} a {calendario['data'].max().date()}")
+    
+    periodo = (calendario['data'] >= data_min) & (calendario['data'] <= data_max)
+    return calendario[periodo].reset_index(drop=True)
@@ -0,0 +1,280 @@
+# Câmbio (USD/BRL) x transações: correlação móvel, correlação defasada e beta por agência
+# Autor: Nayara Vieira
+#
+# Responde a pergunta 5 (impacto do dólar) a partir do cubo diário do ETL e da tabela de
+# indicadores do BCB, sem merges repetidos: as transações viram uma matriz agências x dias
+# úteis e todas as janelas saem de somas acumuladas (uma passada para todas as agências).
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from calendario import obter_calendario
+from cubo_transacoes import ler_cubo, consultar
+
+RAIZ_PROJETO = Path(__file__).resolve().parent.parent
+
+# Série da tabela de indicadores (indicadores_macro.py) usada como câmbio
+SERIE_CAMBIO = 'usd_brl'
+
+# Janela da correlação móvel, em dias úteis (~3 meses)
+JANELA_PADRAO = 63
+
+# Defasagens testadas, em dias úteis, para os dois lados (câmbio antes e depois das transações)
+DEFASAGEM_MAXIMA = 10
+
+# Menos observações que isso numa janela (ou no período) deixa a correlação vazia
+MINIMO_OBSERVACOES = 20
+
+# Medidas do cubo que podem ser comparadas com o câmbio: nome nas tabelas e como medir a variação
+# diária (o volume é o valor líquido e pode ser negativo, então vai em diferença simples; a
+# quantidade vai em variação log, com log1p por causa dos dias sem transação)
+MEDIDAS = {'soma': ('volume', 'diferenca'), 'qtd': ('qtd', 'log')}
+
+ARQUIVOS_CAMBIO = {
+    'diario': 'cambio_transacoes_diario.csv',
+    'moveis': 'cambio_correlacao_movel_agencias.csv',
+    'defasagens': 'cambio_correlacao_defasagens.csv',
+    'betas': 'cambio_betas_agencias.csv',
+}
+
+def ler_cambio(caminho, serie=SERIE_CAMBIO):
+    """
+    Cotação por data, de indicadores_macro.csv (coluna `serie`) ou do
+    taxa_cambio_bcb.csv do get_taxa_cambio.py (data_cambio, taxa_usd_brl).
+    """
+    tabela = pd.read_csv(caminho)
+    if 'data_cambio' in tabela.columns:
+        tabela = tabela.rename(columns={'data_cambio': 'data', 'taxa_usd_brl': serie})
+    cambio = pd.DataFrame({
+        'data': pd.to_datetime(tabela['data']).dt.normalize().astype('datetime64[ns]'),
+        'cambio': pd.to_numeric(tabela[serie], errors='coerce'),
+    })
+    return cambio.dropna().sort_values('data').reset_index(drop=True)
+
+def dias_uteis(inicio, fim, calendario=None):
+    """Dias úteis (sem fim de semana e feriado) de `inicio` a `fim`, pela dim_datas."""
+    inicio, fim = pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize()
+    if calendario is None:
+        calendario = obter_calendario(inicio, fim)
+    uteis = (calendario['data'] >= inicio) & (calendario['data'] <= fim) & (calendario['eh_dia_util'] == 1)
+    return pd.DatetimeIndex(calendario.loc[uteis, 'data']).astype('datetime64[ns]')
+
+def _somas_moveis(valores, janela):
+    """Soma dos últimos `janela` valores ao longo do último eixo (NaN antes de completar a janela)."""
+    somas = np.full(valores.shape, np.nan)
+    if janela > valores.shape[-1]:
+        return somas
+    acumulado = np.cumsum(valores, axis=-1)
+    somas[..., janela - 1] = acumulado[..., janela - 1]
+    somas[..., janela:] = acumulado[..., janela:] - acumulado[..., :-janela]
+    return somas
+
+def _estatisticas(n, sx, sy, sxx, syy, sxy):
+    """Correlação, beta (y sobre x) e erro padrão do beta a partir das somas."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx ** 2 / n
+        var_y = syy - sy ** 2 / n
+        correlacao = cov / np.sqrt(var_x * var_y)
+        beta = cov / var_x
+        residuo = np.clip(var_y - beta * cov, 0, None)
+        erro_padrao = np.sqrt(residuo / (n - 2) / var_x)
+    poucas = n < MINIMO_OBSERVACOES
+    return (np.where(poucas, np.nan, correlacao), np.where(poucas, np.nan, beta),
+            np.where(poucas, np.nan, erro_padrao))
+
+def _somas(x, y, validos, eixo_soma):
+    """n, Σx, Σy, Σx², Σy², Σxy só onde x e y existem (eixo_soma=None devolve os termos sem somar)."""
+    xv = np.where(validos, x, 0.0)
+    yv = np.where(validos, y, 0.0)
+    termos = [validos.astype(np.float64), xv, yv, xv * xv, yv * yv, xv * yv]
+    return termos if eixo_soma is None else [t.sum(axis=eixo_soma) for t in termos]
+
+def correlacao_movel(x, y, janela=JANELA_PADRAO):
+    """
+    Correlação e beta de `y` sobre `x` nos últimos `janela` dias, para cada dia.
+    `x`: (dias,); `y`: (dias,) ou (agências, dias), tudo de uma vez por somas acumuladas.
+    As séries são centradas antes (média do período) para as somas não perderem precisão.
+    """
+    x = x - np.nanmean(x)
+    with np.errstate(invalid='ignore'):
+        y = y - np.nanmean(y, axis=-1, keepdims=True)
+    validos = np.isfinite(x) & np.isfinite(y)
+    somas = [_somas_moveis(t, janela) for t in _somas(x, y, validos, None)]
+    correlacao, beta, _ = _estatisticas(*somas)
+    return correlacao, beta
+
+def correlacao_defasada(x, y, defasagem_maxima=DEFASAGEM_MAXIMA):
+    """
+    Correlação entre x no dia t e y no dia t + k, para k de -defasagem_maxima a +defasagem_maxima
+    (k > 0: as transações vêm depois do câmbio). Retorna (defasagens, correlações, observações),
+    com correlações e observações no formato (defasagens, ...) — todas as agências de uma vez.
+    """
+    dias = x.shape[-1]
+    defasagens = np.arange(-defasagem_maxima, defasagem_maxima + 1)
+    correlacoes = np.full((len(defasagens),) + y.shape[:-1], np.nan)
+    observacoes = np.zeros((len(defasagens),) + y.shape[:-1], dtype=np.int64)
+    for i, k in enumerate(defasagens):
+        if abs(k) >= dias:
+            continue
+        xs = x[:dias - k] if k >= 0 else x[-k:]
+        ys = y[..., k:] if k >= 0 else y[..., :dias + k]
+        validos = np.isfinite(xs) & np.isfinite(ys)
+        somas = _somas(xs, ys, validos, -1)
+        correlacoes[i] = _estatisticas(*somas)[0]
+        observacoes[i] = somas[0]
+    return defasagens, correlacoes, observacoes
+
+class CambioTransacoes:
+    """
+    Transações por agência x dia útil, alinhadas à cotação vigente em cada dia.
+    
+    O alinhamento é as-of nos dois lados: cada dia útil recebe a última cotação publicada
+    até ele (merge_asof), e as transações de fim de semana e feriado entram no dia útil
+    anterior, o mesmo cuja cotação estava valendo. As comparações usam variações
+    (retorno log do câmbio e variação diária da medida), não os níveis das séries.
+    """
+    
+    def __init__(self, totais_diarios, cambio, medida='soma', calendario=None):
+        """`totais_diarios`: colunas data, cod_agencia e a `medida` (ex.: consultar(cubo, ['data', 'cod_agencia']))."""
+        totais = totais_diarios.dropna(subset=['data'])
+        datas = pd.to_datetime(totais['data']).dt.normalize().astype('datetime64[ns]')
+        self.medida = medida
+        self.dias = dias_uteis(datas.min(), datas.max(), calendario)
+        
+        cotacao = pd.merge_asof(pd.DataFrame({'data': self.dias}), cambio[['data', 'cambio']],
+                                on='data', direction='backward')
+        self.cambio = cotacao['cambio'].to_numpy(dtype=np.float64)
+        
+        # Dia útil de cada linha (as-of para trás); linhas antes do primeiro dia útil ficam de fora
+        colunas = np.searchsorted(self.dias.to_numpy(), datas.to_numpy(), side='right') - 1
+        valores = totais[medida].to_numpy(dtype=np.float64, na_value=np.nan)
+        dentro = (colunas >= 0) & np.isfinite(valores)
+        
+        self.total = np.bincount(colunas[dentro], weights=valores[dentro], minlength=len(self.dias))
+        
+        com_agencia = dentro & totais['cod_agencia'].notna().to_numpy()
+        self.agencias = pd.Index(np.sort(totais.loc[com_agencia, 'cod_agencia'].unique()), name='cod_agencia')
+        linhas = self.agencias.get_indexer(totais.loc[com_agencia, 'cod_agencia'])
+        self.por_agencia = np.zeros((len(self.agencias), len(self.dias)))
+        np.add.at(self.por_agencia, (linhas, colunas[com_agencia]), valores[com_agencia])
+    
+    @classmethod
+    def do_cubo(cls, cubo, cambio, medida='soma', calendario=None):
+        """Monta a partir do cubo diário (cubo_transacoes.py)."""
+        totais = consultar(cubo, ['data', 'cod_agencia'])[[medida]].reset_index()
+        return cls(totais, cambio, medida, calendario)
+    
+    def retorno_cambio(self):
+        """Variação log do câmbio de um dia útil para o seguinte."""
+        retorno = np.full(len(self.dias), np.nan)
+        retorno[1:] = np.diff(np.log(self.cambio))
+        return retorno
+    
+    def variacao(self, valores):
+        """Variação de um dia útil para o seguinte, ao longo do último eixo (ver MEDIDAS)."""
+        if MEDIDAS[self.medida][1] == 'log':
+            valores = np.log1p(np.clip(valores, 0, None))
+        variacao = np.full(valores.shape, np.nan)
+        variacao[..., 1:] = np.diff(valores, axis=-1)
+        return variacao
+    
+    def analisar(self, janela=JANELA_PADRAO, defasagem_maxima=DEFASAGEM_MAXIMA):
+        """Tabelas diario, moveis, defasagens e betas (ver ARQUIVOS_CAMBIO)."""
+        x = self.retorno_cambio()
+        # Linha 0 = total do banco, demais = agências
+        y = self.variacao(np.vstack([self.total, self.por_agencia]))
+        codigos = pd.array([pd.NA] + list(self.agencias), dtype='Int64')
+        
+        correlacao, beta = correlacao_movel(x, y, janela)
+        nome = MEDIDAS[self.medida][0]
+        diario = pd.DataFrame({
+            'data': self.dias,
+            'cambio': self.cambio,
+            'retorno_cambio': x,
+            nome: np.round(self.total, 2),
+            f'variacao_{nome}': y[0],
+            'correlacao_movel': correlacao[0],
+            'beta_movel': beta[0],
+        })
+        
+        # Formato longo, só os dias com janela completa
+        n_agencias = len(self.agencias)
+        moveis = pd.DataFrame({
+            'data': np.tile(self.dias.to_numpy(), n_agencias),
+            'cod_agencia': np.repeat(self.agencias.to_numpy(), len(self.dias)),
+            'correlacao_movel': correlacao[1:].ravel(),
+            'beta_movel': beta[1:].ravel(),
+        }).dropna(subset=['correlacao_movel']).reset_index(drop=True)
+        
+        defasagens, correlacoes, observacoes = correlacao_defasada(x, y, defasagem_maxima)
+        tabela_defasagens = pd.DataFrame({
+            'cod_agencia': pd.array(np.tile(codigos, len(defasagens)), dtype='Int64'),
+            'defasagem': np.repeat(defasagens, len(codigos)),
+            'correlacao': correlacoes.ravel(),
+            'observacoes': observacoes.ravel(),
+        })
+        
+        validos = np.isfinite(x) & np.isfinite(y)
+        somas = _somas(x, y, validos, -1)
+        correlacao_total, beta_total, erro_padrao = _estatisticas(*somas)
+        # Defasagem com a maior correlação em módulo (por agência)
+        absolutas = np.where(np.isnan(correlacoes), -1, np.abs(correlacoes))
+        melhor = absolutas.argmax(axis=0)
+        betas = pd.DataFrame({
+            'cod_agencia': codigos,
+            'observacoes': somas[0].astype(np.int64),
+            'beta': beta_total,
+            'erro_padrao': erro_padrao,
+            'correlacao': correlacao_total,
+            'r2': correlacao_total ** 2,
+            'melhor_defasagem': defasagens[melhor],
+            'correlacao_melhor_defasagem': correlacoes[melhor, np.arange(len(codigos))],
+        })
+        
+        return {'diario': diario, 'moveis': moveis, 'defasagens': tabela_defasagens, 'betas': betas}
+
+def analisar_cambio(processed_path, arquivo_cambio, pasta_saida=None, medida='soma',
+                    janela=JANELA_PADRAO, defasagem_maxima=DEFASAGEM_MAXIMA):
+    """Lê o cubo e o câmbio, calcula as tabelas e grava os CSVs de ARQUIVOS_CAMBIO em `pasta_saida`."""
+    pasta_saida = Path(pasta_saida or processed_path)
+    cambio = ler_cambio(arquivo_cambio)
+    analise = CambioTransacoes.do_cubo(ler_cubo(processed_path), cambio, medida)
+    tabelas = analise.analisar(janela, defasagem_maxima)
+    
+    print(f"📅 {len(analise.dias):,} dias úteis, {len(analise.agencias)} agências, "
+          f"câmbio de {cambio['data'].min().date()} a {cambio['data'].max().date()}")
+    total = tabelas['betas'].iloc[0]
+    print(f"📈 Banco todo: correlação {total['correlacao']:.3f}, beta {total['beta']:.3f} "
+          f"(erro padrão {total['erro_padrao']:.3f}), melhor defasagem {int(total['melhor_defasagem']):+d} dias úteis "
+          f"(correlação {total['correlacao_melhor_defasagem']:.3f})")
+    por_agencia = tabelas['betas'].iloc[1:].dropna(subset=['beta'])
+    if len(por_agencia):
+        extremos = por_agencia.sort_values('beta')
+        print(f"🏢 Betas por agência: de {extremos['beta'].iloc[0]:.3f} (agência {extremos['cod_agencia'].iloc[0]}) "
+              f"a {extremos['beta'].iloc[-1]:.3f} (agência {extremos['cod_agencia'].iloc[-1]})")
+    
+    pasta_saida.mkdir(parents=True, exist_ok=True)
+    for nome, tabela in tabelas.items():
+        tabela.to_csv(pasta_saida / ARQUIVOS_CAMBIO[nome], index=False, date_format='%Y-%m-%d')
+        print(f"💾 {ARQUIVOS_CAMBIO[nome]}: {len(tabela):,} linhas")
+    return tabelas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Correlação entre o câmbio e as transações (cubo diário do ETL)")
+    parser.add_argument('--saida', default=str(RAIZ_PROJETO / 'dados' / 'processed'),
+                        help="pasta do ETL (lê o cubo_diario e grava os resultados)")
+    parser.add_argument('--cambio', default=str(RAIZ_PROJETO / 'dados' / 'externos' / 'indicadores_macro.csv'),
+                        help="indicadores_macro.csv (indicadores_macro.py) ou taxa_cambio_bcb.csv (get_taxa_cambio.py)")
+    parser.add_argument('--medida', choices=list(MEDIDAS), default='soma', help="volume (soma) ou quantidade (qtd)")
+    parser.add_argument('--janela', type=int, default=JANELA_PADRAO, help="dias úteis da correlação móvel")
+    parser.add_argument('--defasagens', type=int, default=DEFASAGEM_MAXIMA,
+                        help="defasagem máxima, em dias úteis, para cada lado")
+    args = parser.parse_args()
+    
+    print("💱 CÂMBIO x TRANSAÇÕES")
+    print("="*50)
+    analisar_cambio(args.saida, args.cambio, medida=args.medida, janela=args.janela,
+                    defasagem_maxima=args.defasagens)
@@ -0,0 +1,285 @@
+# Carteira de crédito do BanVic: cronogramas de amortização, saldo devedor e funil de aprovação
+# Autor: Nayara Vieira
+#
+# Tudo é calculado com operações em arrays inteiros (NumPy), sem laço por proposta:
+# o saldo de cada parcela sai da fórmula fechada da tabela Price.
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from banvic_schema import ler_tabela
+from dimension_lookup import IndiceDimensao
+
+RAIZ_PROJETO = Path(__file__).resolve().parent.parent
+PASTA_ENTRADA_PADRAO = RAIZ_PROJETO / "dados" / "raw" / "banvic_data"
+PASTA_SAIDA_PADRAO = RAIZ_PROJETO / "dados" / "processed"
+
+# Etapas do funil, na ordem em que a proposta anda (o status é a etapa atual)
+ETAPAS_FUNIL = ['Enviada', 'Em análise', 'Validação documentos', 'Aprovada']
+STATUS_APROVADA = 'Aprovada'
+
+# Carência: 'juros' = o cliente paga só os juros e o saldo não muda (é o que bate com a
+# valor_prestacao dos CSVs); 'capitalizada' = os juros entram no saldo e a prestação é
+# recalculada sobre o saldo no fim da carência
+MODOS_CARENCIA = ('juros', 'capitalizada')
+
+# Diferença aceita entre a prestação informada e a calculada (em reais)
+TOLERANCIA_PRESTACAO = 0.01
+
+# Propostas por bloco no saldo mensal: o cronograma de um bloco (propostas x parcelas)
+# fica em memória, e só os totais por mês são acumulados entre blocos
+BLOCO_PROPOSTAS = 50_000
+
+# Busca da taxa implícita (bisseção vetorizada entre 0 e TAXA_MAXIMA ao mês)
+TAXA_MAXIMA = 1.0
+ITERACOES_TAXA = 60
+
+ARQUIVOS_CREDITO = {
+    'conferencia': 'credito_conferencia_prestacoes.csv',
+    'saldo': 'credito_saldo_mensal.csv',
+    'colaboradores': 'credito_funil_colaboradores.csv',
+    'agencias': 'credito_funil_agencias.csv',
+    'cronograma': 'credito_cronograma.csv',
+}
+
+def _fator_price(taxa, parcelas):
+    """Prestação por real financiado na tabela Price (taxa zero = principal / parcelas)."""
+    taxa = np.asarray(taxa, dtype=np.float64)
+    parcelas = np.asarray(parcelas, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fator = taxa / -np.expm1(-parcelas * np.log1p(taxa))
+    return np.where(taxa > 0, fator, 1 / parcelas)
+
+def prestacao_price(principal, taxa, parcelas):
+    """Prestação fixa de cada proposta (arrays do mesmo tamanho)."""
+    return np.asarray(principal, dtype=np.float64) * _fator_price(taxa, parcelas)
+
+def _saldo_apos(principal, taxa, prestacao, pagas):
+    """Saldo depois de `pagas` prestações: P(1+i)^k - PMT((1+i)^k - 1)/i (fórmula fechada)."""
+    crescimento = np.expm1(pagas * np.log1p(taxa))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acumulado = np.where(taxa > 0, crescimento / taxa, pagas)
+    return principal * (1 + crescimento) - prestacao * acumulado
+
+def taxa_implicita(principal, prestacao, parcelas):
+    """
+    Taxa mensal que transforma `principal` em `parcelas` prestações de `prestacao`
+    (bisseção nos arrays inteiros). NaN quando a soma das prestações não cobre o principal.
+    """
+    principal = np.asarray(principal, dtype=np.float64)
+    prestacao = np.asarray(prestacao, dtype=np.float64)
+    parcelas = np.asarray(parcelas, dtype=np.float64)
+    baixo = np.zeros(len(principal))
+    alto = np.full(len(principal), TAXA_MAXIMA)
+    for _ in range(ITERACOES_TAXA):
+        meio = (baixo + alto) / 2
+        # A prestação cresce com a taxa: se a do meio já passa da informada, a taxa é menor
+        maior = principal * _fator_price(meio, parcelas) > prestacao
+        alto = np.where(maior, meio, alto)
+        baixo = np.where(maior, baixo, meio)
+    taxa = (baixo + alto) / 2
+    return np.where(prestacao * parcelas >= principal, taxa, np.nan)
+
+def conferir_prestacoes(propostas):
+    """
+    Uma linha por proposta: prestação recalculada pela taxa informada, taxa implícita
+    na prestação informada e se as duas batem (diferença até TOLERANCIA_PRESTACAO).
+    """
+    principal = propostas['valor_proposta'].to_numpy(dtype=np.float64)
+    taxa = propostas['taxa_juros_mensal'].to_numpy(dtype=np.float64)
+    parcelas = propostas['quantidade_parcelas'].to_numpy(dtype=np.float64)
+    informada = propostas['valor_prestacao'].to_numpy(dtype=np.float64)
+    
+    calculada = prestacao_price(principal, taxa, parcelas)
+    conferencia = pd.DataFrame({
+        'cod_proposta': propostas['cod_proposta'].to_numpy(),
+        'taxa_juros_mensal': taxa,
+        'taxa_implicita': taxa_implicita(principal, informada, parcelas),
+        'valor_prestacao': informada,
+        'prestacao_calculada': calculada,
+        'diferenca': informada - calculada,
+    })
+    conferencia['prestacao_ok'] = conferencia['diferenca'].abs() <= TOLERANCIA_PRESTACAO
+    return conferencia
+
+def _cronograma_arrays(propostas, modo_carencia='juros'):
+    """
+    Cronograma de todas as propostas como arrays longos (uma posição por proposta x mês):
+    `origem` é a linha da proposta e `mes` o nº do mês (1 = mês seguinte à entrada).
+    """
+    if modo_carencia not in MODOS_CARENCIA:
+        raise ValueError(f"Modo de carência inválido: {modo_carencia} (use {', '.join(MODOS_CARENCIA)})")
+    principal = propostas['valor_proposta'].to_numpy(dtype=np.float64)
+    taxa = propostas['taxa_juros_mensal'].to_numpy(dtype=np.float64)
+    parcelas = propostas['quantidade_parcelas'].to_numpy(dtype=np.int64)
+    carencia = np.clip(propostas['carencia'].to_numpy(dtype=np.int64), 0, None)
+    
+    # Principal que entra na tabela Price no fim da carência
+    if modo_carencia == 'capitalizada':
+        base = principal * np.exp(carencia * np.log1p(taxa))
+    else:
+        base = principal
+    prestacao = base * _fator_price(taxa, parcelas)
+    
+    # Posições longas: a proposta p ocupa carencia[p] + parcelas[p] meses seguidos
+    meses = carencia + parcelas
+    origem = np.repeat(np.arange(len(principal)), meses)
+    inicio = np.cumsum(meses) - meses
+    mes = np.arange(len(origem)) - np.repeat(inicio, meses) + 1
+    
+    i, g = taxa[origem], carencia[origem]
+    na_carencia = mes <= g
+    pagas = np.where(na_carencia, 0, mes - g - 1)
+    saldo_inicial = _saldo_apos(base[origem], i, prestacao[origem], pagas)
+    if modo_carencia == 'capitalizada':
+        saldo_inicial = np.where(na_carencia, principal[origem] * np.exp((mes - 1) * np.log1p(i)), saldo_inicial)
+    juros = saldo_inicial * i
+    
+    # Na carência: 'juros' paga só os juros; 'capitalizada' não paga nada
+    if modo_carencia == 'capitalizada':
+        parcela = np.where(na_carencia, 0.0, prestacao[origem])
+    else:
+        parcela = np.where(na_carencia, juros, prestacao[origem])
+    amortizacao = parcela - juros
+    saldo_final = saldo_inicial - amortizacao
+    # Resíduo de ponto flutuante na última parcela
+    saldo_final = np.where(np.abs(saldo_final) < 1e-6, 0.0, saldo_final)
+    return {
+        'origem': origem, 'mes': mes, 'carencia': na_carencia,
+        'saldo_inicial': saldo_inicial, 'juros': juros, 'amortizacao': amortizacao,
+        'prestacao': parcela, 'saldo_final': saldo_final,
+    }
+
+def _mes_inicial(propostas):
+    """Mês de entrada de cada proposta (datetime64[M]; NaT continua NaT nas contas com meses)."""
+    return propostas['data_entrada_proposta'].to_numpy(dtype='datetime64[ns]').astype('datetime64[M]')
+
+def cronograma(propostas, modo_carencia='juros'):
+    """
+    Cronograma completo (uma linha por proposta x mês), com carência, juros,
+    amortização, prestação e saldo. `vencimento` é o 1º dia do mês da parcela.
+    """
+    arrays = _cronograma_arrays(propostas, modo_carencia)
+    origem = arrays.pop('origem')
+    vencimento = _mes_inicial(propostas)[origem] + arrays['mes']
+    return pd.DataFrame({
+        'cod_proposta': propostas['cod_proposta'].to_numpy()[origem],
+        'parcela': arrays.pop('mes'),
+        'vencimento': vencimento.astype('datetime64[ns]'),
+        'em_carencia': arrays.pop('carencia'),
+        **arrays,
+    })
+
+def saldo_devedor_mensal(propostas, modo_carencia='juros', status=(STATUS_APROVADA,)):
+    """
+    Saldo devedor da carteira no fim de cada mês, com juros, amortização, prestações
+    e contratos ativos. Só entram as propostas com status em `status` (None = todas).
+    Roda em blocos de BLOCO_PROPOSTAS propostas, somando os meses com bincount.
+    """
+    if status is not None:
+        propostas = propostas[propostas['status_proposta'].isin(status).to_numpy()]
+    propostas = propostas[propostas['data_entrada_proposta'].notna().to_numpy()]
+    colunas = ['saldo_devedor', 'juros', 'amortizacao', 'prestacoes', 'contratos_ativos']
+    if propostas.empty:
+        return pd.DataFrame(columns=['mes'] + colunas)
+    
+    mes_inicial = _mes_inicial(propostas).astype(np.int64)
+    primeiro = int(mes_inicial.min()) + 1
+    ultimo = int((mes_inicial + propostas['carencia'].to_numpy(dtype=np.int64)
+                  + propostas['quantidade_parcelas'].to_numpy(dtype=np.int64)).max())
+    tamanho = ultimo - primeiro + 1
+    totais = {coluna: np.zeros(tamanho) for coluna in colunas}
+    
+    for inicio in range(0, len(propostas), BLOCO_PROPOSTAS):
+        bloco = propostas.iloc[inicio:inicio + BLOCO_PROPOSTAS]
+        arrays = _cronograma_arrays(bloco, modo_carencia)
+        posicao = mes_inicial[inicio:inicio + BLOCO_PROPOSTAS][arrays['origem']] + arrays['mes'] - primeiro
+        for coluna, pesos in (('saldo_devedor', arrays['saldo_final']), ('juros', arrays['juros']),
+                              ('amortizacao', arrays['amortizacao']), ('prestacoes', arrays['prestacao'])):
+            totais[coluna] += np.bincount(posicao, weights=pesos, minlength=tamanho)
+        totais['contratos_ativos'] += np.bincount(posicao, minlength=tamanho)
+    
+    saldo = pd.DataFrame(totais)
+    saldo['contratos_ativos'] = saldo['contratos_ativos'].astype(np.int64)
+    saldo.insert(0, 'mes', np.arange(primeiro, ultimo + 1).astype('datetime64[M]').astype('datetime64[ns]'))
+    return saldo
+
+def _funil(propostas, grupo):
+    """Contagem por status e taxas do funil (quantas chegaram a cada etapa) por `grupo`."""
+    status = pd.Categorical(propostas['status_proposta'], categories=ETAPAS_FUNIL)
+    contagem = pd.crosstab(grupo, status, dropna=False).reindex(columns=ETAPAS_FUNIL, fill_value=0)
+    contagem.columns = [f'qtd_{etapa}' for etapa in ETAPAS_FUNIL]
+    
+    funil = contagem.copy()
+    funil.insert(0, 'total_propostas', grupo.value_counts().reindex(funil.index, fill_value=0).to_numpy())
+    # Chegaram à etapa k: status atual em k ou numa etapa seguinte (soma acumulada da direita)
+    alcancadas = contagem.to_numpy()[:, ::-1].cumsum(axis=1)[:, ::-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k, etapa in enumerate(ETAPAS_FUNIL[1:], start=1):
+            funil[f'taxa_{etapa}'] = np.round(alcancadas[:, k] / funil['total_propostas'].to_numpy(), 4)
+    funil['taxa_aprovacao'] = funil[f'taxa_{STATUS_APROVADA}']
+    funil['valor_aprovado'] = (propostas['valor_proposta']
+                               .where(propostas['status_proposta'] == STATUS_APROVADA, 0.0)
+                               .groupby(grupo).sum().reindex(funil.index).fillna(0.0).to_numpy())
+    return funil.sort_values('taxa_aprovacao', ascending=False)
+
+def funil_aprovacao(propostas, colaborador_agencia=None):
+    """
+    Funil de aprovação por cod_colaborador e, com a tabela colaborador_agencia, por
+    cod_agencia (agência do colaborador que fez a proposta). Retorna (por_colaborador, por_agencia).
+    """
+    por_colaborador = _funil(propostas, propostas['cod_colaborador'].rename('cod_colaborador'))
+    por_agencia = None
+    if colaborador_agencia is not None:
+        indice = IndiceDimensao(colaborador_agencia, 'cod_colaborador', nome='colaborador_agencia')
+        agencia = pd.Series(indice.valores('cod_agencia').take(indice.posicoes(propostas['cod_colaborador']),
+                                                               allow_fill=True),
+                            index=propostas.index, name='cod_agencia')
+        if indice.nao_encontradas:
+            print(indice.resumo())
+        por_agencia = _funil(propostas, agencia)
+    return por_colaborador.reset_index(), None if por_agencia is None else por_agencia.reset_index()
+
+def analisar_carteira(data_path, processed_path, modo_carencia='juros', salvar_cronograma=False):
+    """Lê as propostas, grava conferência, saldo mensal e funis em processed_path e retorna os resultados."""
+    data_path, processed_path = Path(data_path), Path(processed_path)
+    processed_path.mkdir(parents=True, exist_ok=True)
+    propostas = ler_tabela(data_path / 'propostas_credito.csv')
+    print(f"✅ Propostas carregadas: {len(propostas):,} registros")
+    colaborador_agencia = None
+    if (data_path / 'colaborador_agencia.csv').exists():
+        colaborador_agencia = ler_tabela(data_path / 'colaborador_agencia.csv')
+    
+    conferencia = conferir_prestacoes(propostas)
+    divergentes = int((~conferencia['prestacao_ok']).sum())
+    print(f"{'✅' if divergentes == 0 else '⚠️'} Prestações conferidas: {divergentes:,} divergentes "
+          f"da tabela Price (tolerância R$ {TOLERANCIA_PRESTACAO})")
+    
+    saldo = saldo_devedor_mensal(propostas, modo_carencia)
+    por_colaborador, por_agencia = funil_aprovacao(propostas, colaborador_agencia)
+    resultados = {'conferencia': conferencia, 'saldo': saldo, 'colaboradores': por_colaborador}
+    if por_agencia is not None:
+        resultados['agencias'] = por_agencia
+    if salvar_cronograma:
+        resultados['cronograma'] = cronograma(propostas, modo_carencia)
+    
+    for nome, tabela in resultados.items():
+        tabela.to_csv(processed_path / ARQUIVOS_CREDITO[nome], index=False, encoding='utf-8-sig')
+        print(f"✅ {ARQUIVOS_CREDITO[nome]}: {len(tabela):,} registros")
+    return resultados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análise da carteira de crédito do BanVic (propostas_credito.csv)")
+    parser.add_argument('--entrada', default=str(PASTA_ENTRADA_PADRAO), help="pasta com os CSVs originais do BanVic")
+    parser.add_argument('--saida', default=str(PASTA_SAIDA_PADRAO), help="pasta onde os resultados são gravados")
+    parser.add_argument('--carencia', choices=MODOS_CARENCIA, default='juros',
+                        help="juros pagos na carência (padrão) ou capitalizados no saldo")
+    parser.add_argument('--cronograma', action='store_true',
+                        help="grava também o cronograma completo (uma linha por proposta x mês)")
+    args = parser.parse_args()
+    
+    print("💳 CARTEIRA DE CRÉDITO BANVIC")
+    print("="*60)
+    analisar_carteira(args.entrada, args.saida, args.carencia, args.cronograma)
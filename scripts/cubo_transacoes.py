@@ -0,0 +1,167 @@
+# Cubo diário das transações do BanVic (dia x agência x tipo de cliente)
+# Autor: Nayara Vieira
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from calendario import DIAS_PT, MESES_PT
+from parquet_io import salvar_parquet, ler_parquet
+
+# Chaves do cubo e medidas guardadas em cada célula. Todas as medidas são
+# somáveis (ou min/max), então o cubo de vários blocos é a combinação dos cubos.
+DIMENSOES_CUBO = ['data', 'cod_agencia', 'tipo_cliente']
+MEDIDAS_CUBO = ['qtd', 'n_valor', 'soma', 'soma_quadrados', 'minimo', 'maximo']
+AGREGACAO_MEDIDAS = {
+    'qtd': 'sum', 'n_valor': 'sum', 'soma': 'sum',
+    'soma_quadrados': 'sum', 'minimo': 'min', 'maximo': 'max'
+}
+
+ARQUIVO_CUBO = 'cubo_diario'
+
+# Janela do resumo por agência (resumo_agencias_6m e a view de mesmo nome no SQLite)
+MESES_RESUMO_AGENCIAS = 6
+
+# Atributos de calendário que podem ser usados no `por` das consultas, além das chaves
+ATRIBUTOS_DATA = {
+    'ano': lambda d: d.dt.year.astype('Int64'),
+    'mes': lambda d: d.dt.month.astype('Int64'),
+    'trimestre': lambda d: d.dt.quarter.astype('Int64'),
+    'dia_semana_num': lambda d: (d.dt.dayofweek + 1).astype('Int64'),  # Segunda = 1
+    'dia_semana_pt': lambda d: d.dt.day_name().map(DIAS_PT),
+    'mes_nome_pt': lambda d: d.dt.month_name().map(MESES_PT),
+    # Mesma regra da coluna mes_tipo da fato: data inválida conta como mês ímpar
+    'mes_tipo': lambda d: pd.Series(np.where(d.dt.month.fillna(1) % 2 == 0, 'Par', 'Ímpar'), index=d.index),
+}
+
+def montar_cubo(df, coluna_data='data_transacao', coluna_valor='valor_transacao', coluna_id='cod_transacao'):
+    """
+    Agrega as transações (a tabela inteira ou um bloco) por dia x agência x tipo
+    de cliente. Chaves vazias (data inválida, conta sem agência, cliente não
+    encontrado) viram uma célula própria em vez de sumir do total.
+    """
+    valores = df[coluna_valor].astype('float64')
+    partes = pd.DataFrame({
+        'qtd': df[coluna_id].notna().astype('int64'),
+        'n_valor': valores.notna().astype('int64'),
+        'soma': valores,
+        'soma_quadrados': valores * valores,
+        'minimo': valores,
+        'maximo': valores
+    })
+    
+    chaves = [
+        df[coluna_data].dt.normalize().rename('data'),
+        df['cod_agencia'].astype('Int64').rename('cod_agencia') if 'cod_agencia' in df.columns
+        else pd.Series(pd.NA, index=df.index, dtype='Int64', name='cod_agencia'),
+        df['tipo_cliente'].astype('object').rename('tipo_cliente') if 'tipo_cliente' in df.columns
+        else pd.Series(None, index=df.index, dtype='object', name='tipo_cliente')
+    ]
+    
+    cubo = partes.groupby(chaves, dropna=False, observed=True).agg(AGREGACAO_MEDIDAS)
+    return cubo[MEDIDAS_CUBO]
+
+def combinar_cubos(a, b):
+    """Junta dois cubos (acumulado + bloco novo) somando as células com a mesma chave."""
+    if a is None:
+        return b
+    if b is None or b.empty:
+        return a
+    juntos = pd.concat([a, b])
+    return juntos.groupby(level=DIMENSOES_CUBO, dropna=False).agg(AGREGACAO_MEDIDAS)[MEDIDAS_CUBO]
+
+def salvar_cubo(cubo, processed_path, output_format='csv'):
+    """Grava o cubo em dados/processed (chaves como colunas), em CSV e/ou Parquet."""
+    tabela = cubo.reset_index()
+    if output_format in ('csv', 'ambos'):
+        tabela.to_csv(Path(processed_path) / f'{ARQUIVO_CUBO}.csv', index=False, date_format='%Y-%m-%d')
+    if output_format in ('parquet', 'ambos'):
+        salvar_parquet(tabela, Path(processed_path) / f'{ARQUIVO_CUBO}.parquet')
+
+def arquivo_cubo(processed_path):
+    """Caminho do cubo salvo (o Parquet tem preferência). None se não existir."""
+    for sufixo in ('.parquet', '.csv'):
+        caminho = Path(processed_path) / f'{ARQUIVO_CUBO}{sufixo}'
+        if caminho.exists():
+            return caminho
+    return None
+
+def ler_cubo(processed_path):
+    """Lê o cubo salvo pelo ETL, com as chaves de volta no índice."""
+    caminho = arquivo_cubo(processed_path)
+    if caminho is None:
+        raise FileNotFoundError(Path(processed_path) / f'{ARQUIVO_CUBO}.csv')
+    
+    if caminho.suffix == '.parquet':
+        tabela = ler_parquet(caminho)
+    else:
+        tabela = pd.read_csv(caminho, dtype={'tipo_cliente': 'object'}, parse_dates=['data'])
+    
+    tabela['data'] = pd.to_datetime(tabela['data'])
+    tabela['cod_agencia'] = tabela['cod_agencia'].astype('Int64')
+    tabela['tipo_cliente'] = tabela['tipo_cliente'].astype('object')
+    tabela = tabela.astype({'qtd': 'int64', 'n_valor': 'int64'})
+    return tabela.set_index(DIMENSOES_CUBO)[MEDIDAS_CUBO]
+
+def inicio_janela(cubo, meses):
+    """Primeiro dia da janela dos últimos `meses` meses, contada a partir do último dia do cubo."""
+    return recuar_meses(cubo.index.get_level_values('data').max(), meses)
+
+def recuar_meses(ultimo_dia, meses):
+    """`ultimo_dia` menos `meses` meses, preso no fim do mês (31/12 - 6 meses = 30/06)."""
+    return pd.Timestamp(ultimo_dia).normalize() - pd.DateOffset(months=meses)
+
+def consultar(cubo, por=None, inicio=None, fim=None, filtros=None):
+    """
+    Responde uma agregação a partir do cubo, sem voltar às transações.
+    
+    `por` é uma lista de chaves do cubo (data, cod_agencia, tipo_cliente) e/ou
+    atributos de calendário (ATRIBUTOS_DATA: ano, mes, dia_semana_pt, mes_tipo...).
+    `inicio`/`fim` recortam os dias (inclusive) e `filtros` é um dict
+    chave → valor ou lista de valores. Sem `por`, retorna o total (uma linha).
+    
+    Além das medidas do cubo, o resultado traz media e desvio_padrao do valor.
+    """
+    por = [por] if isinstance(por, str) else list(por or [])
+    celulas = cubo.reset_index()
+    
+    datas = celulas['data']
+    manter = np.ones(len(celulas), dtype=bool)
+    if inicio is not None:
+        manter &= (datas >= pd.Timestamp(inicio).normalize()).to_numpy(dtype=bool, na_value=False)
+    if fim is not None:
+        manter &= (datas <= pd.Timestamp(fim).normalize()).to_numpy(dtype=bool, na_value=False)
+    for coluna, valores in (filtros or {}).items():
+        valores = valores if isinstance(valores, (list, tuple, set)) else [valores]
+        manter &= celulas[coluna].isin(valores).to_numpy(dtype=bool)
+    celulas = celulas[manter]
+    
+    for atributo in por:
+        if atributo in ATRIBUTOS_DATA:
+            celulas[atributo] = ATRIBUTOS_DATA[atributo](celulas['data'])
+        elif atributo not in DIMENSOES_CUBO:
+            raise ValueError(f"'{atributo}' não é chave do cubo nem atributo de data "
+                             f"(use {DIMENSOES_CUBO + list(ATRIBUTOS_DATA)})")
+    
+    if por:
+        resultado = celulas.groupby(por, observed=True).agg(AGREGACAO_MEDIDAS)[MEDIDAS_CUBO]
+    else:
+        resultado = celulas[MEDIDAS_CUBO].agg(AGREGACAO_MEDIDAS).to_frame('total').T
+        resultado = resultado.astype({'qtd': 'int64', 'n_valor': 'int64'})
+    
+    n = resultado['n_valor']
+    resultado['media'] = resultado['soma'] / n
+    variancia = (resultado['soma_quadrados'] - resultado['soma'] ** 2 / n) / (n - 1)
+    resultado['desvio_padrao'] = np.sqrt(variancia.clip(lower=0))
+    return resultado
+
+def resumo_executivo(consulta, nome_indice=None):
+    """Formato dos resumos salvos pelo ETL: Qtd_Transacoes, Volume_Total e Valor_Medio."""
+    tabela = pd.DataFrame({
+        'Qtd_Transacoes': consulta['qtd'].astype('int64'),
+        'Volume_Total': consulta['soma'],
+        'Valor_Medio': consulta['soma'] / consulta['n_valor']
+    }).round(2)
+    if nome_indice is not None:
+        tabela.index.name = nome_indice
+    return tabela
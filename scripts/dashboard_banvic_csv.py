@@ -7,17 +7,51 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
 import os
+import argparse
 import warnings
+from date_normalization import normalizar_datas
+from parquet_io import ler_parquet
+from dimension_lookup import IndiceDimensao
+from banvic_schema import ler_tabela
+from calendario import obter_calendario
+from ranking_janelas import SomasAcumuladas, JANELAS_PADRAO, ranking_janela, extremos, rankings_por_janela, ranking_por_periodo
+from perfil_execucao import etapa, iniciar_perfil, finalizar_perfil, PASTA_RELATORIOS
+from banco_sqlite import ler_view, transacoes_filtradas
+from cache_colunar import PASTA_CACHE, chave_cache, abrir_cache, salvar_cache
+from testes_hipoteses import serie_diaria, teste_meses_pares, teste_dias_semana, imprimir_meses_pares, imprimir_dias_semana
 warnings.filterwarnings('ignore')
 
+# Nomes em português na ordem de dia_semana_num (0 = segunda)
+DIAS_SEMANA_PT = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira',
+                  'Sexta-feira', 'Sábado', 'Domingo']
+
+# Janela do ranking de agências
+MESES_RANKING = 6
+
+# Pasta padrão dos CSVs originais, relativa à raiz do projeto (não à pasta atual)
+PASTA_DADOS_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'dados', 'raw', 'banvic_data', '')
+
 class BanVicDashboard:
     """ Classe para centralizar o carregamento e análise dos dados do BanVic. """
-    def __init__(self, data_path='dados/raw/banvic_data/'):
+    def __init__(self, data_path='dados/raw/banvic_data/', parquet_path=None, usar_cache=True):
         self.data_path = data_path
+        # Se informado, lê os Parquet gerados pelo ETL (dados/processed) em vez dos CSVs brutos
+        self.parquet_path = parquet_path
+        # Transações já tratadas ficam em <data_path>/.cache_transacoes (ver cache_colunar.py)
+        self.usar_cache = usar_cache and parquet_path is None
+        self.chave_cache = None
+        self.transacoes_do_cache = False
         self.df_transacoes = None
         self.df_clientes = None
         self.df_agencias = None
         self.dim_dates = None
+        # Agregado diário (dia x agência x janela do ranking), montado uma vez na carga
+        self.cubo = None
+        self.data_limite_ranking = None
+        # Transações por dia do calendário e resultados dos testes de hipótese (testes_hipoteses.py)
+        self.diario = None
+        self.testes_hipoteses = {}
         
         print("============================================================")
         print("🏦 DASHBOARD BANVIC - ANÁLISE DE DADOS")
@@ -31,29 +65,46 @@ class BanVicDashboard:
         print("\n📂 Carregando dados...")
         
         try:
-            # Tabela principal de transações
-            print("📊 Carregando transações...")
-            self.df_transacoes = pd.read_csv(f'{self.data_path}transacoes.csv')
-            print("✅ Transações carregadas!")
-            
-            # Carrega as dimensões
-            if os.path.exists(f'{self.data_path}clientes.csv'):
-                self.df_clientes = pd.read_csv(f'{self.data_path}clientes.csv')
-                print("✅ Clientes carregados!")
-            
-            if os.path.exists(f'{self.data_path}agencias.csv'):
-                self.df_agencias = pd.read_csv(f'{self.data_path}agencias.csv')
-                print("✅ Agências carregadas!")
+            with etapa('leitura') as medida:
+                if self.parquet_path is not None:
+                    self.load_parquet()
+                else:
+                    # Transações já tratadas de uma carga anterior, se os CSVs não mudaram
+                    if self.usar_cache:
+                        self.abrir_cache_transacoes()
+                    
+                    if not self.transacoes_do_cache:
+                        # Tabela principal de transações (tipos compactos de banvic_schema.py)
+                        print("📊 Carregando transações...")
+                        self.df_transacoes = ler_tabela(f'{self.data_path}transacoes.csv')
+                        print("✅ Transações carregadas!")
+                
+                    # Carrega as dimensões
+                    if os.path.exists(f'{self.data_path}clientes.csv'):
+                        self.df_clientes = ler_tabela(f'{self.data_path}clientes.csv')
+                        print("✅ Clientes carregados!")
+                
+                    if os.path.exists(f'{self.data_path}agencias.csv'):
+                        self.df_agencias = ler_tabela(f'{self.data_path}agencias.csv')
+                        print("✅ Agências carregadas!")
+                medida['linhas'] = len(self.df_transacoes)
             
             # Chamo o tratamento de datas logo em seguida
-            self.processar_datas()
-            
-            # Se a dim_dates já existir, usa ela. Se não, cria na hora.
-            try:
-                self.dim_dates = pd.read_csv(f'{self.data_path}dim_dates.csv')
-                print("✅ Dimensão de datas carregada!")
-            except FileNotFoundError:
-                print("⚠️ dim_dates.csv não encontrado - criando...")
+            with etapa('processar_datas', linhas=len(self.df_transacoes)):
+                self.processar_datas()
+            
+            # Chaves derivadas e agregado diário: as análises leem só dele
+            with etapa('preparar_chaves', linhas=len(self.df_transacoes)):
+                self.preparar_chaves()
+            if self.usar_cache and not self.transacoes_do_cache:
+                with etapa('gravacao_cache', linhas=len(self.df_transacoes)):
+                    self.salvar_cache_transacoes()
+            with etapa('montar_cubo', linhas=len(self.df_transacoes)):
+                self.montar_cubo()
+            
+            # A dim_dates.csv funciona como cache do calendário: se já cobrir o
+            # período é só lida, se faltar algum dia só o que falta é gerado
+            with etapa('dim_dates'):
                 self.create_dim_dates()
                 
         except FileNotFoundError as e:
@@ -62,34 +113,63 @@ class BanVicDashboard:
             print(f"   {os.path.abspath(self.data_path)}")
             raise
         
-        print("✅ Dados CSV carregados com sucesso!")
+        print("✅ Dados carregados com sucesso!")
+
+    def abrir_cache_transacoes(self):
+        """
+        Abre as transações tratadas (datas, chaves e agência) do cache colunar, se
+        transacoes.csv e contas.csv não mudaram desde a carga que o gravou.
+        """
+        pasta_cache = os.path.join(self.data_path, PASTA_CACHE)
+        origens = [f'{self.data_path}transacoes.csv', f'{self.data_path}contas.csv']
+        if not os.path.exists(origens[0]):
+            raise FileNotFoundError(origens[0])
+        self.chave_cache = chave_cache(origens, pasta_cache)
+        df = abrir_cache(pasta_cache, self.chave_cache)
+        if df is not None:
+            self.df_transacoes = df
+            self.transacoes_do_cache = True
+            print(f"⚡ Transações abertas do cache ({len(df):,} registros, datas e chaves já tratadas)")
+
+    def salvar_cache_transacoes(self):
+        """Grava as transações tratadas no cache colunar (uma falha aqui não interrompe o dashboard)."""
+        if self.df_transacoes is None or self.chave_cache is None:
+            return
+        try:
+            salvar_cache(self.df_transacoes, os.path.join(self.data_path, PASTA_CACHE), self.chave_cache)
+            print("💾 Cache das transações atualizado")
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️ Não foi possível gravar o cache das transações: {e}")
+
+    def load_parquet(self):
+        """Carrega as tabelas em Parquet geradas pelo ETL (datas e tipos já prontos)."""
+        print("📊 Carregando transações (Parquet)...")
+        arquivo_transacoes = os.path.join(self.parquet_path, 'transacoes_powerbi.parquet')
+        if not os.path.exists(arquivo_transacoes):
+            raise FileNotFoundError(arquivo_transacoes)
+        self.df_transacoes = ler_parquet(arquivo_transacoes)
+        print("✅ Transações carregadas!")
+        
+        arquivo_clientes = os.path.join(self.parquet_path, 'dim_clientes.parquet')
+        if os.path.exists(arquivo_clientes):
+            self.df_clientes = ler_parquet(arquivo_clientes)
+            print("✅ Clientes carregados!")
+        
+        arquivo_agencias = os.path.join(self.parquet_path, 'dim_agencias.parquet')
+        if os.path.exists(arquivo_agencias):
+            self.df_agencias = ler_parquet(arquivo_agencias)
+            print("✅ Agências carregadas!")
 
     def processar_datas(self):
         """Converte as colunas de data para datetime e lida com erros."""
         print("🔄 Processando datas...")
         
-        # Função interna para tentar converter qualquer formato de data que aparecer
-        def corrigir_data(date_str):
-            if pd.isna(date_str):
-                return pd.NaT
-            
-            try:
-                date_str = str(date_str)
-                
-                # Limpando o formato UTC que às vezes vem com microssegundos
-                if '.' in date_str and 'UTC' in date_str:
-                    date_str = date_str.split('.')[0] + ' UTC'
-                
-                # Converte para datetime
-                return pd.to_datetime(date_str, utc=True)
-                
-            except Exception:
-                return pd.NaT
-        
-        # Aplicando a função nas colunas de data das tabelas
-        if self.df_transacoes is not None and 'data_transacao' in self.df_transacoes.columns:
+        # Aplicando a conversão vetorizada nas colunas de data das tabelas (as do cache já vêm convertidas)
+        if (self.df_transacoes is not None and 'data_transacao' in self.df_transacoes.columns
+                and not self.transacoes_do_cache):
             original_count = len(self.df_transacoes)
-            self.df_transacoes['data_transacao'] = self.df_transacoes['data_transacao'].apply(corrigir_data)
+            datas, rejeitadas = normalizar_datas(self.df_transacoes['data_transacao'], utc=True)
+            self.df_transacoes['data_transacao'] = datas
             self.df_transacoes = self.df_transacoes.dropna(subset=['data_transacao'])
             
             # Ajustando o fuso horário para o de São Paulo
@@ -98,14 +178,93 @@ class BanVicDashboard:
             final_count = len(self.df_transacoes)
             if original_count > final_count:
                 print(f"⚠️ Removidas {original_count - final_count} transações com datas inválidas")
+            if len(rejeitadas) > 0:
+                print(f"⚠️ {len(rejeitadas)} datas em formato desconhecido (ex.: {rejeitadas.head(3).tolist()})")
         
         if self.df_clientes is not None:
             for col in ['data_inclusao', 'data_nascimento']:
                 if col in self.df_clientes.columns:
-                    self.df_clientes[col] = self.df_clientes[col].apply(corrigir_data)
+                    self.df_clientes[col], _ = normalizar_datas(self.df_clientes[col], utc=True)
         
         print("✅ Datas processadas!")
 
+    def preparar_chaves(self):
+        """
+        Deriva uma vez só, direto na tabela (sem cópia), as chaves inteiras que as
+        análises usam: dia (dias desde 1970-01-01), dia da semana, mês e agência.
+        """
+        if self.df_transacoes is None or not pd.api.types.is_datetime64_any_dtype(self.df_transacoes['data_transacao']):
+            return
+        if self.transacoes_do_cache:
+            return
+        
+        datas = self.df_transacoes['data_transacao']
+        if datas.dt.tz is not None:
+            datas = datas.dt.tz_localize(None)  # horário local de São Paulo
+        dias = datas.to_numpy().astype('datetime64[D]').astype(np.int64)
+        
+        self.df_transacoes['chave_dia'] = dias.astype(np.int32)
+        # 1970-01-01 foi uma quinta-feira, então (dias + 3) % 7 dá 0 = segunda
+        self.df_transacoes['dia_semana_num'] = ((dias + 3) % 7).astype(np.int8)
+        self.df_transacoes['mes'] = datas.dt.month.to_numpy(dtype=np.int8)
+        
+        # Agência vem das contas; o join é feito uma vez aqui, e não a cada análise
+        if 'cod_agencia' not in self.df_transacoes.columns:
+            contas_file = f'{self.data_path}contas.csv'
+            if os.path.exists(contas_file):
+                print("🔗 Fazendo join com dados de contas para obter agências...")
+                df_contas = ler_tabela(contas_file, colunas=['num_conta', 'cod_agencia'])
+                indice_contas = IndiceDimensao(df_contas, 'num_conta', nome='contas')
+                indice_contas.anexar(self.df_transacoes, ['cod_agencia'])
+                print(f"✅ Join realizado: {len(self.df_transacoes)} registros")
+                print(indice_contas.resumo())
+            else:
+                print("⚠️ Arquivo contas.csv não encontrado para fazer o join")
+
+    def montar_cubo(self):
+        """
+        Um único group-by na tabela de transações, por dia x agência x "está na
+        janela do ranking". Dia da semana, meses pares e ranking saem desse
+        agregado (poucos milhares de linhas) em vez de copiar a tabela inteira.
+        """
+        if self.df_transacoes is None or 'chave_dia' not in self.df_transacoes.columns:
+            return
+        
+        df = self.df_transacoes
+        self.data_limite_ranking = df['data_transacao'].max() - pd.DateOffset(months=MESES_RANKING)
+        na_janela = pd.Series(df['data_transacao'] >= self.data_limite_ranking, name='na_janela')
+        agencia = df['cod_agencia'] if 'cod_agencia' in df.columns else pd.Series(pd.NA, index=df.index, name='cod_agencia')
+        
+        cubo = df['valor_transacao'].groupby(
+            [df['chave_dia'], agencia, na_janela], dropna=False, observed=True, sort=False
+        ).agg(['size', 'count', 'sum'])
+        cubo.columns = ['linhas', 'qtd', 'soma']
+        cubo = cubo.reset_index()
+        
+        dias = cubo['chave_dia'].to_numpy(dtype=np.int64)
+        cubo['dia_semana_num'] = ((dias + 3) % 7).astype(np.int8)
+        cubo['mes'] = pd.to_datetime(dias.astype('datetime64[D]')).month.to_numpy(dtype=np.int8)
+        self.cubo = cubo
+        print(f"✅ Agregado diário: {len(cubo):,} linhas (de {len(df):,} transações)")
+
+    def serie_diaria_transacoes(self):
+        """Transações por dia do calendário (dias sem transação entram com zero), a partir do cubo."""
+        if self.diario is None:
+            qtd = self.cubo.groupby('chave_dia')['qtd'].sum()
+            datas = pd.DatetimeIndex(qtd.index.to_numpy(dtype=np.int64).astype('datetime64[D]'))
+            self.diario = serie_diaria(pd.Series(qtd.to_numpy(), index=datas), self.dim_dates)
+        return self.diario
+
+    @staticmethod
+    def resumir(grupos):
+        """Qtd, volume e ticket médio a partir das contagens e somas do cubo."""
+        resumo = pd.DataFrame({
+            'Qtd_Transacoes': grupos['qtd'],
+            'Volume_Total': grupos['soma'],
+            'Valor_Medio': grupos['soma'] / grupos['qtd']
+        })
+        return resumo.round(2)
+
     def create_dim_dates(self):
         """Cria uma tabela calendário completa, baseada na data min/max das transações."""
         if self.df_transacoes is None:
@@ -120,25 +279,11 @@ class BanVicDashboard:
         
         print(f"📅 Período dos dados: {min_date.strftime('%d/%m/%Y')} a {max_date.strftime('%d/%m/%Y')}")
         
-        date_range = pd.date_range(start=min_date.date(), end=max_date.date(), freq='D')
-        
-        # Monta o dataframe da dimensão
-        self.dim_dates = pd.DataFrame({
-            'data': date_range,
-            'ano': date_range.year,
-            'mes': date_range.month,
-            'dia': date_range.day,
-            'dia_semana': date_range.dayofweek + 1, # Segunda = 1, Domingo = 7
-            'nome_dia_semana': date_range.day_name(),
-            'nome_mes': date_range.month_name(),
-            'trimestre': date_range.quarter,
-            'eh_fim_semana': (date_range.dayofweek >= 5).astype(int), # 1 para True, 0 para False
-            'eh_mes_par': (date_range.month % 2 == 0).astype(int)
-        })
-        
-        # Salva a dimensão em um CSV para poder usar depois
-        self.dim_dates.to_csv(f'{self.data_path}dim_dates.csv', index=False)
-        print("✅ Dimensão de datas criada e salva!")
+        # Mesmo calendário do ETL (calendario.py), com feriados e rótulos em português; o
+        # arquivo mantém as colunas antigas da dim_dates.csv (dia_semana numérico)
+        self.dim_dates = obter_calendario(min_date.tz_localize(None), max_date.tz_localize(None),
+                                          cache=f'{self.data_path}dim_dates.csv', layout='dim_dates')
+        print(f"✅ Dimensão de datas pronta: {len(self.dim_dates):,} dias (salva em dim_dates.csv)")
 
     def show_data_info(self):
         """Mostra um resumo rápido dos dados carregados."""
@@ -183,30 +328,13 @@ class BanVicDashboard:
                 print("❌ Datas não estão no formato datetime correto")
                 return
             
-            df_analise = self.df_transacoes.copy()
-            df_analise['nome_dia_semana'] = df_analise['data_transacao'].dt.day_name()
-            df_analise['dia_semana_num'] = df_analise['data_transacao'].dt.dayofweek
-            
-            # Traduzindo os nomes dos dias para português
-            dias_semana_pt = {
-                'Monday': 'Segunda-feira', 'Tuesday': 'Terça-feira', 
-                'Wednesday': 'Quarta-feira', 'Thursday': 'Quinta-feira',
-                'Friday': 'Sexta-feira', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
-            }
-            
-            df_analise['nome_dia_semana_pt'] = df_analise['nome_dia_semana'].map(dias_semana_pt)
-            
-            # Agrupando para fazer os cálculos
-            resumo_dias = df_analise.groupby(['nome_dia_semana_pt', 'dia_semana_num']).agg({
-                'valor_transacao': ['count', 'sum', 'mean']
-            }).round(2)
+            if self.cubo is None:
+                print("❌ Agregado diário não disponível")
+                return
             
-            # Renomeando as colunas depois do .agg()
-            resumo_dias.columns = ['Qtd_Transacoes', 'Volume_Total', 'Valor_Medio']
-            resumo_dias = resumo_dias.reset_index()
-            resumo_dias = resumo_dias.sort_values('dia_semana_num')
-            resumo_dias = resumo_dias.set_index('nome_dia_semana_pt')
-            resumo_dias = resumo_dias.drop('dia_semana_num', axis=1)
+            # Agrupando o agregado diário por dia da semana (0 = segunda)
+            resumo_dias = self.resumir(self.cubo.groupby('dia_semana_num')[['qtd', 'soma']].sum())
+            resumo_dias.index = pd.Index([DIAS_SEMANA_PT[d] for d in resumo_dias.index], name='nome_dia_semana_pt')
             
             print("📊 Resumo por dia da semana:")
             print(resumo_dias)
@@ -215,10 +343,16 @@ class BanVicDashboard:
             melhor_dia_qtd = resumo_dias['Qtd_Transacoes'].idxmax()
             melhor_dia_volume = resumo_dias['Volume_Total'].idxmax()
             
-            print(f"\n🏆 DESTAQUES:")
+            print(f"\n🏆 DESTAQUES (totais do período):")
             print(f"📈 Maior quantidade de transações: {melhor_dia_qtd} ({resumo_dias.loc[melhor_dia_qtd, 'Qtd_Transacoes']:,.0f} transações)")
             print(f"💰 Maior volume financeiro: {melhor_dia_volume} (R$ {resumo_dias.loc[melhor_dia_volume, 'Volume_Total']:,.2f})")
             
+            # O total não diz se o dia é mesmo diferente: transações por dia, semana a semana, com permutação
+            print(f"\n🎲 TESTE POR DIA DA SEMANA (transações por dia):")
+            resultado = teste_dias_semana(self.serie_diaria_transacoes())
+            imprimir_dias_semana(resultado)
+            self.testes_hipoteses['dias_semana'] = resultado
+            
         except Exception as e:
             print(f"❌ Erro na análise por dia da semana: {e}")
 
@@ -236,15 +370,12 @@ class BanVicDashboard:
                 print("❌ Datas não estão no formato datetime correto")
                 return
             
-            df_analise = self.df_transacoes.copy()
-            df_analise['mes'] = df_analise['data_transacao'].dt.month
-            df_analise['eh_mes_par'] = (df_analise['mes'] % 2 == 0)
-            
-            resumo_meses = df_analise.groupby('eh_mes_par').agg({
-                'valor_transacao': ['count', 'sum', 'mean']
-            }).round(2)
+            if self.cubo is None:
+                print("❌ Agregado diário não disponível")
+                return
             
-            resumo_meses.columns = ['Qtd_Transacoes', 'Volume_Total', 'Valor_Medio']
+            eh_mes_par = (self.cubo['mes'] % 2 == 0).rename('eh_mes_par')
+            resumo_meses = self.resumir(self.cubo.groupby(eh_mes_par)[['qtd', 'soma']].sum())
             resumo_meses.index = ['Meses Ímpares', 'Meses Pares']
             
             print("📊 Comparação Meses Ímpares vs Pares:")
@@ -260,16 +391,15 @@ class BanVicDashboard:
                 diff_qtd = qtd_pares - qtd_impares
                 diff_volume = vol_pares - vol_impares
                 
-                print(f"\n📊 DIFERENÇAS (Pares - Ímpares):")
+                print(f"\n📊 DIFERENÇAS BRUTAS (Pares - Ímpares):")
                 print(f"📈 Quantidade: {diff_qtd:,.0f} transações")
                 print(f"💰 Volume: R$ {diff_volume:,.2f}")
                 
-                if diff_qtd > 0:
-                    print("✅ HIPÓTESE CONFIRMADA: Meses pares têm mais transações!")
-                    print(f"📊 Meses pares têm {abs(diff_qtd):,.0f} transações a mais ({(diff_qtd/qtd_impares*100):.1f}% mais)")
-                else:
-                    print("❌ HIPÓTESE REJEITADA: Meses ímpares têm mais transações!")
-                    print(f"📊 Meses ímpares têm {abs(diff_qtd):,.0f} transações a mais ({(abs(diff_qtd)/qtd_pares*100):.1f}% mais)")
+                # O veredito vem do teste: taxa por dia (número de dias de cada grupo) e permutação dos meses
+                print(f"\n🎲 TESTE (transações por dia, permutação entre os meses):")
+                resultado = teste_meses_pares(self.serie_diaria_transacoes())
+                imprimir_meses_pares(resultado)
+                self.testes_hipoteses['meses_pares'] = resultado
             
         except Exception as e:
             print(f"❌ Erro na análise de meses pares: {e}")
@@ -284,46 +414,25 @@ class BanVicDashboard:
         print("="*50)
         
         try:
-            # Garante que a coluna 'cod_agencia' está na tabela de transações
-            if 'cod_agencia' not in self.df_transacoes.columns:
-                contas_file = f'{self.data_path}contas.csv'
-                if os.path.exists(contas_file):
-                    print("🔗 Fazendo join com dados de contas para obter agências...")
-                    df_contas = pd.read_csv(contas_file)
-                    df_analise = self.df_transacoes.merge(
-                        df_contas[['num_conta', 'cod_agencia']], 
-                        on='num_conta', 
-                        how='left'
-                    )
-                    print(f"✅ Join realizado: {len(df_analise)} registros")
-                else:
-                    print("⚠️ Arquivo contas.csv não encontrado para fazer o join")
-                    return
-            else:
-                df_analise = self.df_transacoes.copy()
-            
-            # Definindo a data de corte para pegar só os últimos 6 meses
-            if pd.api.types.is_datetime64_any_dtype(df_analise['data_transacao']):
-                data_limite = df_analise['data_transacao'].max() - pd.DateOffset(months=6)
-                df_recente = df_analise[df_analise['data_transacao'] >= data_limite]
-                print(f"📅 Analisando dados dos últimos 6 meses (desde {data_limite.strftime('%d/%m/%Y')})")
-                print(f"📊 Registros no período: {len(df_recente):,}")
-            else:
-                df_recente = df_analise
-                print("⚠️ Usando todos os dados (não foi possível filtrar por data)")
+            # O join com contas já foi feito na carga (preparar_chaves)
+            if self.cubo is None or self.cubo['cod_agencia'].isna().all():
+                print("⚠️ Agências não disponíveis (contas.csv não encontrado ou datas inválidas)")
+                return
             
-            df_recente = df_recente.dropna(subset=['cod_agencia'])
-            print(f"📊 Registros com agência identificada: {len(df_recente):,}")
+            # Últimos 6 meses: o cubo já separa o que está na janela, inclusive no dia do corte
+            recente = self.cubo[self.cubo['na_janela']]
+            print(f"📅 Analisando dados dos últimos 6 meses (desde {self.data_limite_ranking.strftime('%d/%m/%Y')})")
+            print(f"📊 Registros no período: {recente['linhas'].sum():,}")
             
-            if len(df_recente) == 0:
+            recente = recente.dropna(subset=['cod_agencia'])
+            print(f"📊 Registros com agência identificada: {recente['linhas'].sum():,}")
+            
+            if len(recente) == 0:
                 print("❌ Nenhum registro com agência encontrado")
                 return
             
-            ranking = df_recente.groupby('cod_agencia').agg({
-                'valor_transacao': ['count', 'sum', 'mean']
-            }).round(2)
+            ranking = self.resumir(recente.groupby('cod_agencia')[['qtd', 'soma']].sum())
             
-            ranking.columns = ['Qtd_Transacoes', 'Volume_Total', 'Valor_Medio']
             ranking = ranking.sort_values('Qtd_Transacoes', ascending=False)
             
             print(f"\n🏆 TOP 3 MELHORES AGÊNCIAS (por quantidade de transações):")
@@ -353,6 +462,55 @@ class BanVicDashboard:
             import traceback
             traceback.print_exc()
 
+    def ranking_agencias_janelas(self, janelas=None, k=3):
+        """
+        Ranking das agências em várias janelas (30/90/180/365 dias por padrão) e mês
+        a mês, tudo a partir das somas acumuladas do agregado diário.
+        """
+        print("\n📆 ANÁLISE: RANKING DE AGÊNCIAS POR JANELA")
+        print("="*50)
+        
+        if self.cubo is None or self.cubo['cod_agencia'].isna().all():
+            print("⚠️ Agências não disponíveis (contas.csv não encontrado ou datas inválidas)")
+            return
+        
+        try:
+            # Aqui a quantidade é a de valores válidos, igual ao ranking_agencias
+            totais = pd.DataFrame({
+                'data': self.cubo['chave_dia'].to_numpy(dtype=np.int64).astype('datetime64[D]'),
+                'cod_agencia': self.cubo['cod_agencia'],
+                'qtd': self.cubo['qtd'],
+                'n_valor': self.cubo['qtd'],
+                'soma': self.cubo['soma']
+            })
+            somas = SomasAcumuladas(totais)
+            janelas = JANELAS_PADRAO if janelas is None else janelas
+            
+            for dias in janelas:
+                ranking = ranking_janela(somas, dias)
+                acima = ranking['Acima_Media'].sum()
+                print(f"\n🏆 Últimos {dias} dias (até {somas.fim.strftime('%d/%m/%Y')}): "
+                      f"{acima} de {len(ranking)} agências acima da média")
+                print(extremos(ranking, k)[['Grupo', 'Posicao', 'Qtd_Transacoes', 'Volume_Total', 'Valor_Medio']])
+            
+            # Série mensal: quem mais subiu e mais caiu no último mês
+            mensal = ranking_por_periodo(somas)
+            ultimo = mensal[mensal['Periodo'] == mensal['Periodo'].max()].dropna(subset=['Variacao_Posicao'])
+            if len(ultimo) > 0:
+                subiu = ultimo.loc[ultimo['Variacao_Posicao'].idxmax()]
+                caiu = ultimo.loc[ultimo['Variacao_Posicao'].idxmin()]
+                print(f"\n📈 Maior subida em {subiu['Periodo']}: agência {subiu['cod_agencia']} ({subiu['Variacao_Posicao']:+d} posições)")
+                print(f"📉 Maior queda em {caiu['Periodo']}: agência {caiu['cod_agencia']} ({caiu['Variacao_Posicao']:+d} posições)")
+            
+            rankings_por_janela(somas, janelas).to_csv(f'{self.data_path}ranking_agencias_janelas.csv', index=False)
+            mensal.to_csv(f'{self.data_path}ranking_agencias_mensal.csv', index=False)
+            print(f"💾 Rankings salvos em: ranking_agencias_janelas.csv e ranking_agencias_mensal.csv")
+        
+        except Exception as e:
+            print(f"❌ Erro no ranking por janela: {e}")
+            import traceback
+            traceback.print_exc()
+
 def limpar_arquivos_duplicados(data_path):
     """Função de limpeza para remover arquivos com sufixo _corrigido."""
     print("\n🧹 LIMPEZA DE ARQUIVOS DUPLICADOS")
@@ -379,10 +537,14 @@ def limpar_arquivos_duplicados(data_path):
             )
             print(f"📝 Renomeado: {arquivo} → {arquivo_original}")
 
-def main():
-    """Orquestra a execução de todo o script."""
+def main(data_path=PASTA_DADOS_PADRAO, usar_cache=True):
+    """
+    Orquestra a execução de todo o script. Com um perfil ligado (perfil_execucao.py),
+    a carga e cada análise viram etapas do relatório de execução.
+    """
     
-    data_path = 'dados/raw/banvic_data/'
+    # As análises montam os caminhos como f'{data_path}arquivo.csv'
+    data_path = os.path.join(data_path, '')
     
     # Checa se a pasta de dados existe antes de começar
     if not os.path.exists(data_path):
@@ -395,13 +557,17 @@ def main():
     
     try:
         # Instancia a classe e começa o processo
-        dashboard = BanVicDashboard(data_path=data_path)
+        with etapa('carga'):
+            dashboard = BanVicDashboard(data_path=data_path, usar_cache=usar_cache)
         
-        # Roda as análises
-        dashboard.show_data_info()
-        dashboard.analise_transacoes_por_dia_semana()
-        dashboard.verificar_hipotese_meses_pares()
-        dashboard.ranking_agencias()
+        # Roda as análises (cada uma vira uma etapa no relatório de execução, se ligado)
+        for analise in [dashboard.show_data_info,
+                        dashboard.analise_transacoes_por_dia_semana,
+                        dashboard.verificar_hipotese_meses_pares,
+                        dashboard.ranking_agencias,
+                        dashboard.ranking_agencias_janelas]:
+            with etapa(analise.__name__):
+                analise()
         
         print("\n" + "="*60)
         print("✅ DASHBOARD EXECUTADO COM SUCESSO!")
@@ -409,6 +575,8 @@ def main():
         print("💾 Arquivos gerados:")
         print("   - dim_dates.csv")
         print("   - ranking_agencias.csv")
+        print("   - ranking_agencias_janelas.csv")
+        print("   - ranking_agencias_mensal.csv")
         print("🧹 Arquivos duplicados foram limpos automaticamente.")
         print("="*60)
         
@@ -417,6 +585,71 @@ def main():
         import traceback
         traceback.print_exc()
 
+def main_sqlite(caminho_banco, inicio=None, fim=None, agencias=None):
+    """
+    Versão das análises em cima do banco SQLite do ETL (--sqlite): os resumos vêm
+    das views SQL e o recorte por período/agências é uma consulta filtrada nos
+    índices da fato, sem carregar os CSVs.
+    """
+    if not os.path.exists(caminho_banco):
+        print(f"❌ Banco não encontrado: {os.path.abspath(caminho_banco)}")
+        print("💡 Execute primeiro: python banvic_powerbi_integration_fixed.py --sqlite")
+        return
+    
+    titulos = {
+        'vw_resumo_dias_semana': "📅 TRANSAÇÕES POR DIA DA SEMANA",
+        'vw_resumo_meses_tipo': "📆 MESES PARES x ÍMPARES",
+        'vw_resumo_agencias_6m': f"🏆 RANKING DE AGÊNCIAS (ÚLTIMOS {MESES_RANKING} MESES)"
+    }
+    for view, titulo in titulos.items():
+        with etapa(view):
+            tabela = ler_view(caminho_banco, view)
+        print("\n" + titulo)
+        print("="*40)
+        print(tabela.to_string(index=False))
+    
+    if inicio is None and fim is None and agencias is None:
+        return
+    
+    with etapa('consulta_filtrada') as medida:
+        recorte = transacoes_filtradas(caminho_banco, inicio=inicio, fim=fim, agencias=agencias,
+                                       colunas=['cod_transacao', 'data_transacao', 'cod_agencia', 'nome_agencia',
+                                                'valor_transacao'])
+        medida['linhas'] = len(recorte)
+    print(f"\n🔎 RECORTE: {inicio or 'início'} a {fim or 'fim'}" + (f", agências {agencias}" if agencias else ""))
+    print("="*40)
+    if recorte.empty:
+        print("⚠️ Nenhuma transação no recorte")
+        return
+    por_agencia = recorte.groupby(['cod_agencia', 'nome_agencia'], dropna=False)['valor_transacao'].agg(
+        Qtd_Transacoes='count', Volume_Total='sum', Valor_Medio='mean').round(2)
+    print(por_agencia.sort_values('Qtd_Transacoes', ascending=False).to_string())
+    print(f"💳 {len(recorte):,} transações, R$ {recorte['valor_transacao'].sum():,.2f}")
+
 # Ponto de entrada do script
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Dashboard BanVic (análises a partir dos CSVs)")
+    parser.add_argument('--dados', default=PASTA_DADOS_PADRAO, help="pasta com os CSVs do BanVic")
+    parser.add_argument('--sem-cache', action='store_true',
+                        help="relê e trata transacoes.csv mesmo com o cache colunar válido (.cache_transacoes)")
+    parser.add_argument('--banco', default=None,
+                        help="lê os resumos do banco SQLite do ETL (ex.: dados/processed/banvic.db) em vez dos CSVs")
+    parser.add_argument('--inicio', default=None, help="com --banco, primeiro dia do recorte (AAAA-MM-DD)")
+    parser.add_argument('--fim', default=None, help="com --banco, último dia do recorte (AAAA-MM-DD)")
+    parser.add_argument('--agencias', type=int, nargs='+', default=None, help="com --banco, agências do recorte")
+    parser.add_argument('--perfil', action='store_true',
+                        help="mede tempo, CPU, memória e linhas de cada etapa (JSON em <dados>/relatorios)")
+    parser.add_argument('--tracemalloc', action='store_true', help="inclui o pico de memória do Python por etapa")
+    parser.add_argument('--cprofile', action='store_true', help="inclui as funções mais caras do cProfile")
+    args = parser.parse_args()
+    
+    if args.perfil or args.tracemalloc or args.cprofile:
+        iniciar_perfil('dashboard', tracemalloc=args.tracemalloc, cprofile=args.cprofile)
+    try:
+        if args.banco:
+            main_sqlite(args.banco, args.inicio, args.fim, args.agencias)
+        else:
+            main(args.dados, usar_cache=not args.sem_cache)
+    finally:
+        pasta_relatorios = os.path.dirname(os.path.abspath(args.banco)) if args.banco else args.dados
+        finalizar_perfil(os.path.join(pasta_relatorios, PASTA_RELATORIOS))
\ No newline at end of file
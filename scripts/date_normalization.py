@@ -0,0 +1,67 @@
+# Normalização de datas compartilhada pelos scripts do Desafio BanVic
+# Autor: Nayara Vieira
+
+import numpy as np
+import pandas as pd
+
+# Formatos que aparecem de fato nos CSVs do BanVic, na ordem em que são testados.
+# O primeiro é o mais comum (transacoes, contas, clientes), por isso vem antes.
+# Os formatos sem 'UTC' são os que o próprio ETL grava em dados/processed.
+FORMATOS_DATA = [
+    '%Y-%m-%d %H:%M:%S UTC',
+    '%Y-%m-%d %H:%M:%S.%f UTC',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%d',
+]
+
+def normalizar_datas(date_series, utc=False, formatos=None, contagem=None):
+    """
+    Converte uma coluna de datas em texto para datetime, de forma vetorizada.
+
+    Cada formato é aplicado de uma vez na coluna inteira, e só as linhas que
+    ainda não foram convertidas seguem para o próximo formato (nada de apply
+    linha a linha).
+
+    Retorna uma tupla (datas, rejeitadas):
+    - datas: Series datetime64 com o mesmo índice da entrada (NaT onde falhou).
+      Os horários são UTC; com utc=True a Series já vem com fuso 'UTC'.
+    - rejeitadas: Series com os valores originais que não bateram com nenhum
+      formato (valores nulos na entrada não contam como rejeitados).
+
+    Se `contagem` for um dict, ele recebe quantos valores bateram com cada formato.
+    """
+    formatos = FORMATOS_DATA if formatos is None else formatos
+
+    # Se a coluna já veio como datetime, só ajusta o fuso
+    if pd.api.types.is_datetime64_any_dtype(date_series):
+        datas = date_series
+        if datas.dt.tz is not None:
+            datas = datas.dt.tz_convert('UTC').dt.tz_localize(None)
+        if utc:
+            datas = datas.dt.tz_localize('UTC')
+        return datas, date_series.iloc[0:0]
+
+    # Trabalho por posição (e não por rótulo) para não depender de índice único
+    resultado = np.full(len(date_series), np.datetime64('NaT'), dtype='datetime64[ns]')
+    posicoes = np.flatnonzero(date_series.notna().to_numpy())
+    texto = pd.Series(date_series.to_numpy()[posicoes]).astype(str).str.strip()
+
+    for fmt in formatos:
+        if len(posicoes) == 0:
+            break
+        convertidas = pd.to_datetime(texto, format=fmt, errors='coerce')
+        ok = convertidas.notna().to_numpy()
+        if contagem is not None:
+            contagem[fmt] = contagem.get(fmt, 0) + int(ok.sum())
+        resultado[posicoes[ok]] = convertidas[ok].to_numpy(dtype='datetime64[ns]')
+        posicoes = posicoes[~ok]
+        texto = texto[~ok]
+
+    datas = pd.Series(resultado, index=date_series.index, name=date_series.name)
+    rejeitadas = date_series.iloc[posicoes]
+
+    if utc:
+        datas = datas.dt.tz_localize('UTC')
+
+    return datas, rejeitadas
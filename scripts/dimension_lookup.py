@@ -0,0 +1,140 @@
+# Busca vetorizada nas dimensões do BanVic (substitui os merges em cadeia do ETL)
+# Autor: Nayara Vieira
+
+import numpy as np
+import pandas as pd
+
+# Com chaves inteiras pouco espalhadas o índice usa uma tabela densa (array posição = chave),
+# que é a busca mais rápida possível. O tamanho da tabela acompanha o número de chaves
+# (até CASAS_POR_CHAVE casas por chave, ou TABELA_DENSA_MINIMA casas em dimensões pequenas),
+# sem passar de LIMITE_TABELA_DENSA; fora disso cai no pd.Index (hash).
+LIMITE_TABELA_DENSA = 10_000_000
+CASAS_POR_CHAVE = 8
+TABELA_DENSA_MINIMA = 1024
+
+class IndiceDimensao:
+    """
+    Índice chave → posição de linha de uma tabela de dimensão, montado uma única vez.
+    
+    Cada atributo é anexado à tabela fato com um único `take` vetorizado, sem
+    criar cópias intermediárias da tabela inteira como o merge faz. As chaves que
+    não existem na dimensão são contadas (nao_encontradas) em vez de virarem NaN
+    em silêncio.
+    """
+    
+    def __init__(self, df_dim, chave, nome=None):
+        self.chave = chave
+        self.nome = nome or chave
+        self.df = df_dim.reset_index(drop=True)
+        self.consultas = 0
+        self.nao_encontradas = 0
+        self.exemplos_nao_encontrados = set()
+        self._valores = {}
+        
+        chaves = self.df[chave]
+        duplicadas = chaves.duplicated()
+        if duplicadas.any():
+            # O merge duplicaria as linhas da fato; aqui fica valendo a primeira ocorrência
+            print(f"⚠️ {self.nome}: {duplicadas.sum()} chaves duplicadas em '{chave}' (usando a primeira)")
+        
+        unicas = chaves[~duplicadas & chaves.notna()]
+        self._posicoes_unicas = unicas.index.to_numpy()
+        self._tabela = None
+        self._indice = None
+        
+        if usar_tabela_densa(unicas):
+            self._tabela = np.full(int(unicas.max()) + 1, -1, dtype=np.int64)
+            self._tabela[unicas.to_numpy(dtype=np.int64)] = self._posicoes_unicas
+        else:
+            self._indice = pd.Index(unicas.to_numpy())
+    
+    def posicoes(self, chaves):
+        """Retorna a posição na dimensão de cada chave da fato (-1 quando não existe)."""
+        chaves = pd.Series(chaves, copy=False)
+        nulas = chaves.isna().to_numpy()
+        
+        if self._tabela is not None:
+            k = chaves.fillna(-1).to_numpy(dtype=np.int64)
+            validas = (k >= 0) & (k < len(self._tabela))
+            posicoes = np.full(len(k), -1, dtype=np.int64)
+            posicoes[validas] = self._tabela[k[validas]]
+        else:
+            encontradas = self._indice.get_indexer(chaves.to_numpy())
+            posicoes = np.where(encontradas >= 0, self._posicoes_unicas[encontradas], -1)
+        
+        # Métrica de qualidade: chave preenchida na fato mas ausente na dimensão
+        faltando = (posicoes < 0) & ~nulas
+        self.consultas += int((~nulas).sum())
+        self.nao_encontradas += int(faltando.sum())
+        if faltando.any() and len(self.exemplos_nao_encontrados) < 5:
+            self.exemplos_nao_encontrados.update(chaves[faltando].unique()[:5].tolist())
+        
+        return posicoes
+    
+    def valores(self, coluna):
+        """Array da coluna da dimensão pronto para o take (inteiros viram anuláveis do mesmo tamanho)."""
+        if coluna not in self._valores:
+            serie = self.df[coluna]
+            if pd.api.types.is_integer_dtype(serie) and not isinstance(serie.dtype, pd.api.extensions.ExtensionDtype):
+                serie = serie.astype(f'Int{serie.dtype.itemsize * 8}')
+            self._valores[coluna] = serie.array
+        return self._valores[coluna]
+    
+    def anexar(self, df, colunas, chave_fato=None, renomear=None):
+        """
+        Anexa as colunas da dimensão à tabela fato `df` (no próprio df, sem cópia).
+        `chave_fato` é o nome da chave na fato (padrão: mesmo nome da dimensão).
+        """
+        renomear = renomear or {}
+        posicoes = self.posicoes(df[chave_fato or self.chave])
+        for coluna in colunas:
+            if coluna not in self.df.columns:
+                continue
+            df[renomear.get(coluna, coluna)] = self.valores(coluna).take(posicoes, allow_fill=True)
+        return df
+    
+    def metricas(self, zerar=False):
+        """Contadores de chaves (para somar os de vários processos com somar_metricas)."""
+        metricas = {
+            'consultas': self.consultas,
+            'nao_encontradas': self.nao_encontradas,
+            'exemplos': sorted(self.exemplos_nao_encontrados)[:5]
+        }
+        if zerar:
+            self.consultas = 0
+            self.nao_encontradas = 0
+            self.exemplos_nao_encontrados = set()
+        return metricas
+    
+    def somar_metricas(self, metricas):
+        self.consultas += metricas['consultas']
+        self.nao_encontradas += metricas['nao_encontradas']
+        if len(self.exemplos_nao_encontrados) < 5:
+            self.exemplos_nao_encontrados.update(metricas['exemplos'])
+    
+    def resumo(self):
+        """Texto curto com a métrica de chaves não encontradas."""
+        if self.nao_encontradas == 0:
+            return f"✅ {self.nome}: todas as {self.consultas:,} chaves encontradas"
+        exemplos = sorted(self.exemplos_nao_encontrados)[:5]
+        return (f"⚠️ {self.nome}: {self.nao_encontradas:,} de {self.consultas:,} chaves "
+                f"não encontradas (ex.: {exemplos})")
+
+def usar_tabela_densa(unicas):
+    """
+    A tabela densa vale a pena? Só com chaves inteiras, não negativas e com a maior
+    chave proporcional à quantidade de chaves (10 códigos perto de 10 milhões vão
+    pro pd.Index em vez de alocar 80 MB).
+    """
+    if not pd.api.types.is_integer_dtype(unicas) or len(unicas) == 0 or unicas.min() < 0:
+        return False
+    limite = min(LIMITE_TABELA_DENSA, max(TABELA_DENSA_MINIMA, CASAS_POR_CHAVE * len(unicas)))
+    return unicas.max() <= limite
+
+def criar_indices_dimensoes(df_contas, df_clientes, df_agencias):
+    """Monta os índices das três dimensões usadas no ETL (uma vez por execução)."""
+    return {
+        'contas': IndiceDimensao(df_contas, 'num_conta', nome='contas'),
+        'clientes': IndiceDimensao(df_clientes, 'cod_cliente', nome='clientes'),
+        'agencias': IndiceDimensao(df_agencias, 'cod_agencia', nome='agencias')
+    }
@@ -0,0 +1,38 @@
+# Estado persistido entre execuções do ETL BanVic (modo incremental)
+# Autor: Nayara Vieira
+
+import hashlib
+import json
+from pathlib import Path
+
+# Tamanho do bloco lido por vez ao calcular o hash (não carrega o arquivo inteiro)
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+def hash_arquivo(caminho):
+    """Calcula o SHA-256 do conteúdo de um arquivo, lendo em blocos."""
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(TAMANHO_BLOCO_HASH), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def carregar_estado(caminho):
+    """Lê o arquivo de estado (JSON). Retorna None se ele não existir ou estiver corrompido."""
+    caminho = Path(caminho)
+    if not caminho.exists():
+        return None
+    
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Estado do ETL ilegível ({caminho.name}): {e}")
+        return None
+
+def salvar_estado(caminho, estado):
+    """Grava o estado em um arquivo temporário e troca no final, pra não deixar JSON pela metade."""
+    caminho = Path(caminho)
+    temporario = caminho.with_suffix(caminho.suffix + '.tmp')
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, ensure_ascii=False, indent=2)
+    temporario.replace(caminho)
@@ -1,32 +1,51 @@
 # Ferramenta de diagnóstico e correção de CSVs para o Desafio BanVic
 # Autor: Nayara Vieira
 
-import pandas as pd
 import os
+import argparse
 import numpy as np
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from date_normalization import normalizar_datas
+from banvic_schema import ler_tabela
+from etl_state import hash_arquivo, carregar_estado, salvar_estado
 
-def diagnosticar_arquivos():
+# Cache do diagnóstico: arquivos com mesmo mtime/tamanho (ou mesmo hash) não são relidos
+ARQUIVO_CACHE_DIAGNOSTICO = '.diagnostico_csv.json'
+SUFIXO_CORRIGIDO = '_corrigido.csv'
+
+# Pasta do projeto usada pela linha de comando (as funções aceitam qualquer outra)
+RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASTA_DADOS = os.path.join('dados', 'raw', 'banvic_data')
+
+def colunas_de_data(colunas):
+    """Colunas que parecem ser de data pelo nome."""
+    return [col for col in colunas if 'data' in col.lower() or 'date' in col.lower()]
+
+def diagnosticar_arquivos(raiz='.'):
     """Faz uma varredura na pasta do projeto para encontrar os arquivos CSV."""
     
     print("🔍 DIAGNÓSTICO DO PROJETO")
     print("="*50)
     
-    # Varre o diretório atual e todas as subpastas atrás de arquivos .csv
+    # Varre a pasta do projeto e todas as subpastas atrás de arquivos .csv
     csv_files = []
-    for root, dirs, files in os.walk('.'):
+    for root, dirs, files in os.walk(raiz):
+        # Pastas ocultas (.git, .venv...) não têm dados do projeto
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
         for file in files:
-            if file.endswith('.csv'):
+            # Os "_corrigido" são saída desta ferramenta, não entrada
+            if file.endswith('.csv') and not file.endswith(SUFIXO_CORRIGIDO):
                 csv_files.append(os.path.join(root, file))
     
-    print(f"📁 Pasta atual: {os.path.abspath('.')}")
+    print(f"📁 Pasta do projeto: {os.path.abspath(raiz)}")
     print(f"📄 Arquivos CSV encontrados: {len(csv_files)}")
     
     for file in csv_files:
         print(f"   📎 {file}")
     
     # Checa se a estrutura de pastas que o script principal espera está no lugar
-    expected_path = 'dados/raw/banvic_data/'
+    expected_path = os.path.join(raiz, PASTA_DADOS)
     print(f"\n📂 Estrutura esperada: {os.path.abspath(expected_path)}")
     print(f"📂 Existe? {os.path.exists(expected_path)}")
     
@@ -40,13 +59,13 @@ def analisar_csv(file_path):
     
     try:
         # Lendo só o comecinho do arquivo pra não carregar tudo na memória
-        df = pd.read_csv(file_path, nrows=5)
+        df = ler_tabela(file_path, nrows=5, converter_datas=False)
         
         print(f"📊 Colunas: {list(df.columns)}")
         print(f"📏 Tamanho da amostra: {df.shape}")
         
         # Procura por colunas que parecem ser de data e mostra uns exemplos
-        date_columns = [col for col in df.columns if 'data' in col.lower() or 'date' in col.lower()]
+        date_columns = colunas_de_data(df.columns)
         
         for date_col in date_columns:
             print(f"\n📅 Coluna de data encontrada: {date_col}")
@@ -54,77 +73,161 @@ def analisar_csv(file_path):
             print(f"📋 Exemplos de datas:")
             for date in sample_dates:
                 print(f"   {date}")
-                
-        return df.columns.tolist()
         
+        return df.columns.tolist()
+    
     except Exception as e:
         print(f"❌ Erro ao analisar arquivo: {e}")
         return []
 
 def corrigir_formato_data(file_path, date_column, output_path=None):
-    """Tenta corrigir formatos de data 'quebrados' em um arquivo CSV completo."""
+    """Tenta corrigir formatos de data 'quebrados' de uma coluna em um arquivo CSV completo."""
     
     print(f"\n🔧 CORRIGINDO DATAS: {file_path}")
     print("-" * 40)
     
     try:
-        # Dessa vez, carrega o arquivo inteiro pra valer
-        df = pd.read_csv(file_path)
-        print(f"📊 Registros carregados: {len(df)}")
-        
-        if date_column not in df.columns:
-            print(f"❌ Coluna '{date_column}' não encontrada!")
-            return False
-        
-        # Minha função para tentar arrumar a bagunça das datas
-        def clean_date(date_str):
-            if pd.isna(date_str):
-                return pd.NaT
-            
-            try:
-                # Garante que é string pra poder manipular
-                date_str = str(date_str)
-                
-                # O formato com 'UTC' e microssegundos costuma dar problema, então limpo ele
-                if '.' in date_str and 'UTC' in date_str:
-                    date_part = date_str.split('.')[0]
-                    date_str = date_part + ' UTC'
-                
-                # Tenta a conversão
-                return pd.to_datetime(date_str, utc=True)
-                
-            except Exception as e:
-                print(f"⚠️ Erro ao processar data '{date_str}': {e}")
-                return pd.NaT
-        
-        # Aplica a função de limpeza na coluna
-        print("🔄 Processando datas...")
-        original_count = len(df)
-        df[date_column] = df[date_column].apply(clean_date)
-        
-        # Joga fora as linhas que não foi possível converter
-        df = df.dropna(subset=[date_column])
-        final_count = len(df)
-        
-        print(f"✅ Datas processadas!")
-        print(f"📊 Registros originais: {original_count}")
-        print(f"📊 Registros válidos: {final_count}")
-        print(f"📊 Registros removidos: {original_count - final_count}")
-        
-        # Salva uma nova versão do arquivo com o sufixo _corrigido
+        resultado = processar_csv(file_path, [date_column], output_path=output_path)
+    except Exception as e:
+        print(f"❌ Erro ao corrigir arquivo: {e}")
+        return False
+    
+    if date_column not in resultado['colunas']:
+        print(f"❌ Coluna '{date_column}' não encontrada!")
+        return False
+    
+    imprimir_diagnostico(resultado)
+    return True
+
+def processar_csv(file_path, date_columns=None, output_path=None, corrigir=True):
+    """
+    Diagnóstico e correção de um CSV com uma única leitura:
+    tipos e nulos de cada coluna, formatos de data encontrados, datas inválidas
+    e (com corrigir=True) um único "_corrigido.csv" com todas as colunas de
+    data convertidas. Não imprime nada (roda dentro do pool de processos);
+    devolve um dict com o resultado.
+    """
+    # Datas em texto, pra poder contar os formatos e listar as que não batem
+    df = ler_tabela(file_path, converter_datas=False)
+    if date_columns is None:
+        date_columns = colunas_de_data(df.columns)
+    date_columns = [col for col in date_columns if col in df.columns]
+    
+    resultado = {
+        'arquivo': file_path,
+        'linhas': len(df),
+        'colunas': {col: {'tipo': str(df[col].dtype), 'nulos': int(df[col].isna().sum())} for col in df.columns},
+        'datas': {},
+        'corrigido': None,
+        'removidas': 0
+    }
+    
+    invalidas = np.zeros(len(df), dtype=bool)
+    for col in date_columns:
+        contagem = {}
+        df[col], rejeitadas = normalizar_datas(df[col], utc=True, contagem=contagem)
+        invalidas[df.index.get_indexer(rejeitadas.index)] = True
+        resultado['datas'][col] = {
+            'formatos': {fmt: n for fmt, n in contagem.items() if n > 0},
+            'invalidas': len(rejeitadas),
+            'exemplos': [str(v) for v in rejeitadas.drop_duplicates().head(5)]
+        }
+    
+    if corrigir and date_columns:
+        # Só sai a linha com data que não bateu com nenhum formato
+        # (data vazia na origem continua vazia, não é erro)
+        df = df[~invalidas]
         if output_path is None:
-            output_path = file_path.replace('.csv', '_corrigido.csv')
-        
+            output_path = file_path.replace('.csv', SUFIXO_CORRIGIDO)
         df.to_csv(output_path, index=False)
-        print(f"💾 Arquivo salvo: {output_path}")
-        
+        resultado['corrigido'] = output_path
+        resultado['removidas'] = int(invalidas.sum())
+    
+    return resultado
+
+def imprimir_diagnostico(resultado):
+    """Mostra o resultado de processar_csv no formato do restante da ferramenta."""
+    print(f"\n🔍 {resultado['arquivo']}: {resultado['linhas']:,} registros")
+    for col, info in resultado['colunas'].items():
+        nulos = f" ({info['nulos']} nulos)" if info['nulos'] else ""
+        print(f"   📎 {col}: {info['tipo']}{nulos}")
+    
+    for col, info in resultado['datas'].items():
+        formatos = ', '.join(f"'{fmt}': {n}" for fmt, n in info['formatos'].items()) or 'nenhum'
+        print(f"📅 {col}: formatos {formatos}")
+        if info['invalidas']:
+            print(f"⚠️ {col}: {info['invalidas']} datas inválidas (ex.: {info['exemplos']})")
+    
+    if resultado['corrigido']:
+        print(f"💾 Arquivo salvo: {resultado['corrigido']} ({resultado['removidas']} registros removidos)")
+
+def assinatura_arquivo(file_path):
+    """mtime e tamanho do arquivo (checagem barata antes do hash)."""
+    info = os.stat(file_path)
+    return {'mtime_ns': info.st_mtime_ns, 'tamanho': info.st_size}
+
+def saida_em_dia(anterior, file_path, corrigir):
+    """
+    O resultado em cache serve pra esta execução? Com corrigir=True ele precisa vir de
+    uma execução que também corrigiu, e o _corrigido.csv tem que existir e ser mais
+    novo que o arquivo de origem.
+    """
+    if not corrigir:
         return True
-        
-    except Exception as e:
-        print(f"❌ Erro ao corrigir arquivo: {e}")
+    if not anterior.get('corrigir'):
         return False
+    corrigido = anterior['resultado']['corrigido']
+    if corrigido is None:
+        # Arquivo sem colunas de data: não há o que corrigir
+        return True
+    return os.path.exists(corrigido) and os.stat(corrigido).st_mtime_ns >= os.stat(file_path).st_mtime_ns
+
+def diagnosticar_em_paralelo(csv_files, processos=None, arquivo_cache=ARQUIVO_CACHE_DIAGNOSTICO, corrigir=True):
+    """
+    Roda processar_csv em todos os arquivos usando um pool de processos.
+    
+    Arquivos sem mudança desde a última execução (mesmo mtime e tamanho, ou
+    mesmo conteúdo pelo hash) reaproveitam o diagnóstico salvo em cache, desde
+    que a saída ainda sirva (ver saida_em_dia).
+    """
+    cache = carregar_estado(arquivo_cache) or {}
+    resultados = {}
+    pendentes = []
+    
+    for file_path in csv_files:
+        anterior = cache.get(file_path)
+        assinatura = assinatura_arquivo(file_path)
+        
+        if anterior is not None and saida_em_dia(anterior, file_path, corrigir):
+            if all(anterior.get(k) == v for k, v in assinatura.items()):
+                resultados[file_path] = anterior['resultado']
+                continue
+            # mtime mudou (ex.: arquivo copiado), mas o conteúdo pode ser o mesmo
+            if anterior.get('sha256') == hash_arquivo(file_path):
+                anterior.update(assinatura)
+                resultados[file_path] = anterior['resultado']
+                continue
+        pendentes.append(file_path)
+    
+    print(f"\n⚡ {len(csv_files) - len(pendentes)} arquivo(s) sem mudança (cache), {len(pendentes)} para processar")
+    
+    if pendentes:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            tarefas = {file_path: executor.submit(processar_csv, file_path, None, None, corrigir) for file_path in pendentes}
+            for file_path, tarefa in tarefas.items():
+                try:
+                    resultado = tarefa.result()
+                except Exception as e:
+                    print(f"❌ Erro ao processar {file_path}: {e}")
+                    continue
+                resultados[file_path] = resultado
+                cache[file_path] = dict(assinatura_arquivo(file_path), sha256=hash_arquivo(file_path),
+                                        corrigir=corrigir, resultado=resultado)
+    
+    salvar_estado(arquivo_cache, cache)
+    return resultados
 
-def criar_estrutura_pastas():
+def criar_estrutura_pastas(raiz='.'):
     """Garante que as pastas /dados/raw e /dados/processed existam."""
     
     print("\n📁 CRIANDO ESTRUTURA DE PASTAS")
@@ -138,28 +241,28 @@ def criar_estrutura_pastas():
     ]
     
     for folder in folders:
-        os.makedirs(folder, exist_ok=True)
+        os.makedirs(os.path.join(raiz, folder), exist_ok=True)
         print(f"✅ {folder}/")
     
     print("✅ Estrutura criada com sucesso!")
 
-def mover_csvs_para_estrutura():
+def mover_csvs_para_estrutura(raiz='.'):
     """Pega os CSVs da raiz do projeto e copia para dados/raw/banvic_data."""
     
     print("\n🚚 ORGANIZANDO ARQUIVOS CSV")
     print("="*40)
     
-    target_dir = 'dados/raw/banvic_data/'
+    target_dir = os.path.join(raiz, PASTA_DADOS)
     
     # Procura arquivos CSV soltos na pasta principal
-    csv_files = [f for f in os.listdir('.') if f.endswith('.csv')]
+    csv_files = [f for f in os.listdir(raiz) if f.endswith('.csv')]
     
     if not csv_files:
         print("ℹ️ Nenhum arquivo CSV encontrado na pasta atual")
         return
     
     for csv_file in csv_files:
-        source = csv_file
+        source = os.path.join(raiz, csv_file)
         destination = os.path.join(target_dir, csv_file)
         
         try:
@@ -170,37 +273,29 @@ def mover_csvs_para_estrutura():
         except Exception as e:
             print(f"❌ Erro ao copiar {source}: {e}")
 
-def main():
+def main(raiz='.', processos=None):
     """Orquestra todo o processo: diagnostica, organiza e corrige os arquivos."""
     
     print("🛠️ FERRAMENTA DE CORREÇÃO - DASHBOARD BANVIC")
     print("="*55)
     
     # Passo 1: Vê o que tem de arquivo na pasta
-    csv_files = diagnosticar_arquivos()
+    csv_files = diagnosticar_arquivos(raiz)
     
     # Passo 2: Cria as pastas se precisar
-    criar_estrutura_pastas()
+    criar_estrutura_pastas(raiz)
     
     # Passo 3: Move os arquivos pra pasta certa
     if csv_files:
-        mover_csvs_para_estrutura()
+        mover_csvs_para_estrutura(raiz)
     
-    # Passo 4: Analisa cada arquivo encontrado
+    # Passo 4: Diagnostica e corrige cada arquivo (uma leitura por arquivo, em paralelo)
+    csv_files = [f for f in csv_files if os.path.exists(f)]
+    resultados = diagnosticar_em_paralelo(csv_files, processos,
+                                          arquivo_cache=os.path.join(raiz, ARQUIVO_CACHE_DIAGNOSTICO))
     for csv_file in csv_files:
-        if os.path.exists(csv_file):
-            columns = analisar_csv(csv_file)
-            
-            # Se o arquivo parece ter datas, tenta aplicar a correção
-            date_columns = [col for col in columns if 'data' in col.lower() or 'date' in col.lower()]
-            
-            if date_columns:
-                print(f"\n🔧 Tentando corrigir as datas em {csv_file}...")
-                for date_col in date_columns:
-                    try:
-                        corrigir_formato_data(csv_file, date_col)
-                    except Exception as e:
-                        print(f"❌ Erro ao corrigir {date_col}: {e}")
+        if csv_file in resultados:
+            imprimir_diagnostico(resultados[csv_file])
     
     print("\n" + "="*55)
     print("✅ CORREÇÃO CONCLUÍDA!")
@@ -211,4 +306,8 @@ def main():
 
 # Ponto de entrada do script
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Diagnóstico e correção dos CSVs do BanVic")
+    parser.add_argument('--raiz', default=RAIZ_PROJETO, help="pasta do projeto (padrão: a pasta acima de scripts/)")
+    parser.add_argument('--processos', type=int, default=None, help="processos usados no diagnóstico")
+    args = parser.parse_args()
+    main(args.raiz, args.processos)
\ No newline at end of file
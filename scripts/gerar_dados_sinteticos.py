@@ -0,0 +1,344 @@
+# Gerador de dados sintéticos do BanVic em escala configurável (benchmarks de 10 mil a 50 milhões de transações)
+# Autor: Nayara Vieira
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Escalas prontas (nº de transações); também dá pra passar um número direto
+ESCALAS = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '50m': 50_000_000,
+}
+
+# Proporções da base real do desafio (~72 mil transações para ~1000 clientes,
+# 10 agências com ~10 colaboradores cada e ~2 propostas de crédito por cliente)
+TRANSACOES_POR_CLIENTE = 72
+CLIENTES_POR_AGENCIA = 5_000
+COLABORADORES_POR_AGENCIA = 10
+PROPOSTAS_POR_CLIENTE = 2
+
+# As transações são geradas e gravadas em blocos de tamanho fixo (cada bloco com
+# a própria semente), então o arquivo sai igual para a mesma semente e escala
+BLOCO_GERACAO = 1_000_000
+
+# Período coberto pelos dados, como na base original
+INICIO_DADOS = pd.Timestamp('2010-01-01')
+FIM_DADOS = pd.Timestamp('2022-12-31 23:59:59')
+
+# Metade das datas vem com microssegundos, como nos CSVs originais
+FRACAO_COM_MICROSSEGUNDOS = 0.5
+
+# Marca de "conta sem transação" no acompanhamento do último lançamento
+SEM_LANCAMENTO = np.iinfo(np.int64).min
+
+# Arquivo com os parâmetros da geração, gravado junto dos CSVs
+ARQUIVO_PARAMETROS = 'gerado.json'
+
+# Tipo de transação → sinal do valor (saídas são negativas) e peso no sorteio
+TIPOS_TRANSACAO = {
+    'Pix - Realizado': (-1, 18),
+    'Pix - Recebido': (1, 16),
+    'Compra Débito': (-1, 14),
+    'Compra Crédito': (-1, 10),
+    'Saque': (-1, 8),
+    'Pix Saque': (-1, 2),
+    'Pagamento de boleto': (-1, 8),
+    'Depósito em espécie': (1, 6),
+    'Transferência entre CC - Débito': (-1, 4),
+    'Transferência entre CC - Crédito': (1, 4),
+    'TED - Realizado': (-1, 3),
+    'TED - Recebido': (1, 3),
+    'DOC - Realizado': (-1, 1),
+    'DOC - Recebido': (1, 1),
+    'Estorno de Debito': (1, 2),
+}
+
+PRIMEIROS_NOMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela',
+                   'João', 'Larissa', 'Lucas', 'Mariana', 'Nicolas', 'Paula', 'Rafael', 'Sabrina', 'Thiago',
+                   'Valentina', 'Luiz Felipe']
+ULTIMOS_NOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Ferreira', 'Alves',
+                 'Ribeiro', 'Dias', 'Moreira', 'Nunes', 'Cunha', 'Rocha']
+LOGRADOUROS = ['Rua', 'Avenida', 'Travessa', 'Praça', 'Ladeira', 'Alameda']
+BAIRROS = ['Centro', 'Jardim Atlântico', 'Vila Piratininga', 'Cerqueira César', 'Zilah Sposito', 'Boa Vista']
+CIDADES_UF = [('São Paulo', 'SP'), ('Campinas', 'SP'), ('Rio de Janeiro', 'RJ'), ('Niterói', 'RJ'),
+              ('Belo Horizonte', 'MG'), ('Porto Alegre', 'RS'), ('Curitiba', 'PR'), ('Salvador', 'BA'),
+              ('Recife', 'PE'), ('Fortaleza', 'CE')]
+STATUS_PROPOSTA = ['Enviada', 'Aprovada', 'Em análise', 'Validação documentos']
+
+def numero_transacoes(escala):
+    """'10k', '1m', '50m' ou um número (também aceita '250000')."""
+    return ESCALAS[escala.lower()] if str(escala).lower() in ESCALAS else int(escala)
+
+def tamanhos(n_transacoes):
+    """Tamanho de cada tabela para um dado número de transações, nas proporções da base real."""
+    clientes = max(50, n_transacoes // TRANSACOES_POR_CLIENTE)
+    agencias = max(10, clientes // CLIENTES_POR_AGENCIA)
+    return {
+        'transacoes': n_transacoes,
+        'clientes': clientes,
+        'contas': clientes,
+        'agencias': agencias,
+        'colaboradores': agencias * COLABORADORES_POR_AGENCIA,
+        'propostas_credito': clientes * PROPOSTAS_POR_CLIENTE,
+    }
+
+def _segundos(inicio, fim, rng, n):
+    """n instantes (datetime64[us]) sorteados entre os arrays/datas inicio e fim."""
+    inicio = np.asarray(inicio, dtype='datetime64[us]')
+    fim = np.asarray(fim, dtype='datetime64[us]')
+    intervalo = (fim - inicio).astype(np.int64)
+    return inicio + (rng.random(n) * intervalo).astype(np.int64).astype('timedelta64[us]')
+
+def formatar_utc(instantes, rng=None, fracao_micro=0.0):
+    """
+    Datas no formato dos CSVs do BanVic: 'AAAA-MM-DD HH:MM:SS UTC', parte delas
+    com microssegundos ('AAAA-MM-DD HH:MM:SS.ffffff UTC').
+    """
+    texto = pd.Series(np.datetime_as_string(np.asarray(instantes, dtype='datetime64[us]'), unit='us'))
+    texto = texto.str.replace('T', ' ', regex=False)
+    com_micro = rng.random(len(texto)) < fracao_micro if rng is not None else np.zeros(len(texto), dtype=bool)
+    texto = texto.where(com_micro, texto.str.slice(0, 19))
+    return texto + ' UTC'
+
+def _sortear(rng, opcoes, n):
+    return np.asarray(opcoes, dtype=object)[rng.integers(0, len(opcoes), n)]
+
+def _digitos(rng, n, casas):
+    """Números com zeros à esquerda (CPF, CNPJ, CEP), vetorizado."""
+    return pd.Series(rng.integers(0, 10 ** casas, n)).astype(str).str.zfill(casas)
+
+def _enderecos(rng, n):
+    cidade_uf = rng.integers(0, len(CIDADES_UF), n)
+    cidades = np.array([c for c, _ in CIDADES_UF], dtype=object)[cidade_uf]
+    ufs = np.array([u for _, u in CIDADES_UF], dtype=object)[cidade_uf]
+    cep = _digitos(rng, n, 8)
+    return (pd.Series(_sortear(rng, LOGRADOUROS, n)) + ' ' + pd.Series(_sortear(rng, ULTIMOS_NOMES, n))
+            + ', ' + pd.Series(rng.integers(1, 2000, n)).astype(str) + ' ' + pd.Series(_sortear(rng, BAIRROS, n))
+            + ' ' + cep.str.slice(0, 5) + '-' + cep.str.slice(5) + ' ' + pd.Series(cidades) + ' / ' + pd.Series(ufs))
+
+def gerar_agencias(n, rng):
+    cidade_uf = [CIDADES_UF[i % len(CIDADES_UF)] for i in range(n)]
+    return pd.DataFrame({
+        'cod_agencia': np.arange(1, n + 1),
+        'nome': ['Agência Matriz' if i == 0 else f'Agência {cidade_uf[i][0]} {i + 1}' for i in range(n)],
+        'endereco': _enderecos(rng, n),
+        'cidade': [c for c, _ in cidade_uf],
+        'uf': [u for _, u in cidade_uf],
+        'data_abertura': np.datetime_as_string(_segundos(INICIO_DADOS, INICIO_DADOS + pd.Timedelta(days=2000), rng, n), unit='D'),
+        'tipo_agencia': np.where(rng.random(n) < 0.2, 'Digital', 'Física')
+    })
+
+def gerar_colaboradores(n_colaboradores, n_agencias, rng):
+    colaboradores = pd.DataFrame({
+        'cod_colaborador': np.arange(1, n_colaboradores + 1),
+        'primeiro_nome': _sortear(rng, PRIMEIROS_NOMES, n_colaboradores),
+        'ultimo_nome': _sortear(rng, ULTIMOS_NOMES, n_colaboradores),
+    })
+    colaboradores['email'] = ('colaborador' + colaboradores['cod_colaborador'].astype(str) + '@example.net')
+    cpf = _digitos(rng, n_colaboradores, 11)
+    colaboradores['cpf'] = (cpf.str.slice(0, 3) + '.' + cpf.str.slice(3, 6) + '.' + cpf.str.slice(6, 9)
+                            + '-' + cpf.str.slice(9))
+    colaboradores['data_nascimento'] = np.datetime_as_string(
+        _segundos(pd.Timestamp('1960-01-01'), pd.Timestamp('2000-12-31'), rng, n_colaboradores), unit='D')
+    colaboradores['endereco'] = _enderecos(rng, n_colaboradores)
+    colaboradores['cep'] = _digitos(rng, n_colaboradores, 8)
+    
+    # Cada colaborador trabalha em uma agência (em ordem, ~10 por agência)
+    colaborador_agencia = pd.DataFrame({
+        'cod_colaborador': colaboradores['cod_colaborador'],
+        'cod_agencia': (np.arange(n_colaboradores) % n_agencias) + 1
+    })
+    return colaboradores, colaborador_agencia
+
+def gerar_clientes(n, rng):
+    pj = rng.random(n) < 0.1
+    clientes = pd.DataFrame({
+        'cod_cliente': np.arange(1, n + 1),
+        'primeiro_nome': _sortear(rng, PRIMEIROS_NOMES, n),
+        'ultimo_nome': _sortear(rng, ULTIMOS_NOMES, n),
+    })
+    clientes['email'] = 'cliente' + clientes['cod_cliente'].astype(str) + '@example.org'
+    clientes['tipo_cliente'] = np.where(pj, 'PJ', 'PF')
+    clientes['data_inclusao'] = formatar_utc(_segundos(INICIO_DADOS, FIM_DADOS - pd.Timedelta(days=365), rng, n))
+    cpf = _digitos(rng, n, 11)
+    cnpj = _digitos(rng, n, 14)
+    clientes['cpfcnpj'] = np.where(
+        pj,
+        cnpj.str.slice(0, 2) + '.' + cnpj.str.slice(2, 5) + '.' + cnpj.str.slice(5, 8) + '/' + cnpj.str.slice(8, 12) + '-' + cnpj.str.slice(12),
+        cpf.str.slice(0, 3) + '.' + cpf.str.slice(3, 6) + '.' + cpf.str.slice(6, 9) + '-' + cpf.str.slice(9)
+    )
+    clientes['data_nascimento'] = np.datetime_as_string(
+        _segundos(pd.Timestamp('1950-01-01'), pd.Timestamp('2004-12-31'), rng, n), unit='D')
+    clientes['endereco'] = _enderecos(rng, n)
+    cep = _digitos(rng, n, 8)
+    clientes['cep'] = cep.str.slice(0, 5) + '-' + cep.str.slice(5)
+    return clientes
+
+def gerar_contas(clientes, colaborador_agencia, rng):
+    """Uma conta por cliente, aberta depois da inclusão do cliente, numa agência com colaborador dela."""
+    n = len(clientes)
+    colaborador = rng.integers(0, len(colaborador_agencia), n)
+    inclusao = pd.to_datetime(clientes['data_inclusao'].str.slice(0, 19)).to_numpy(dtype='datetime64[us]')
+    abertura = _segundos(inclusao, inclusao + np.timedelta64(90, 'D'), rng, n)
+    saldo_total = np.round(rng.lognormal(7.5, 1.2, n), 4)
+    return pd.DataFrame({
+        'num_conta': clientes['cod_cliente'].to_numpy(),
+        'cod_cliente': clientes['cod_cliente'].to_numpy(),
+        'cod_agencia': colaborador_agencia['cod_agencia'].to_numpy()[colaborador],
+        'cod_colaborador': colaborador_agencia['cod_colaborador'].to_numpy()[colaborador],
+        'tipo_conta': clientes['tipo_cliente'].to_numpy(),
+        'data_abertura': abertura,
+        'saldo_total': saldo_total,
+        'saldo_disponivel': np.round(saldo_total * rng.uniform(0.85, 1.0, n), 4),
+    })
+
+def gerar_propostas(n, clientes, n_colaboradores, rng):
+    """Propostas com prestação pela tabela Price (financiamento = proposta + entrada)."""
+    taxa = np.round(rng.uniform(0.008, 0.025, n), 4)
+    parcelas = rng.choice([12, 24, 36, 48, 58, 60, 72, 100, 120], n)
+    financiamento = np.round(rng.lognormal(10, 0.8, n), 2)
+    entrada = financiamento * rng.uniform(0.1, 0.4, n)
+    proposta = financiamento - entrada
+    prestacao = proposta * taxa / (1 - (1 + taxa) ** -parcelas)
+    return pd.DataFrame({
+        'cod_proposta': np.arange(1, n + 1),
+        'cod_cliente': rng.choice(clientes['cod_cliente'].to_numpy(), n),
+        'cod_colaborador': rng.integers(1, n_colaboradores + 1, n),
+        'data_entrada_proposta': formatar_utc(_segundos(INICIO_DADOS, FIM_DADOS, rng, n)),
+        'taxa_juros_mensal': taxa,
+        'valor_proposta': proposta,
+        'valor_financiamento': financiamento,
+        'valor_entrada': entrada,
+        'valor_prestacao': prestacao,
+        'quantidade_parcelas': parcelas,
+        'carencia': rng.choice([0, 0, 0, 1, 2, 3], n),
+        'status_proposta': _sortear(rng, STATUS_PROPOSTA, n)
+    })
+
+def gerar_bloco_transacoes(inicio, n, contas, pesos_contas, semente, taxa_datas_invalidas=0.0):
+    """
+    Transações de cod_transacao `inicio + 1` a `inicio + n`. A conta é sorteada
+    com pesos (poucas contas movimentam muito) e a data cai entre a abertura da
+    conta e o fim do período, com um pouco mais de movimento em dia útil.
+    """
+    rng = np.random.default_rng(semente)
+    conta = rng.choice(len(contas), n, p=pesos_contas)
+    abertura = contas['data_abertura'].to_numpy(dtype='datetime64[us]')[conta]
+    instantes = _segundos(abertura, np.datetime64(FIM_DADOS, 'us'), rng, n)
+    
+    # Fim de semana: metade das transações é adiada para um dia útil da semana seguinte
+    dia_semana = (instantes.astype('datetime64[D]').astype(np.int64) + 3) % 7
+    adiar = (dia_semana >= 5) & (rng.random(n) < 0.5)
+    dias = 7 - dia_semana[adiar] + rng.integers(0, 5, int(adiar.sum()))
+    instantes[adiar] += (dias * 86_400_000_000).astype('timedelta64[us]')
+    instantes = np.minimum(instantes, np.datetime64(FIM_DADOS, 'us'))
+    
+    nomes = list(TIPOS_TRANSACAO)
+    pesos = np.array([peso for _, peso in TIPOS_TRANSACAO.values()], dtype='float64')
+    tipo = rng.choice(len(nomes), n, p=pesos / pesos.sum())
+    sinal = np.array([s for s, _ in TIPOS_TRANSACAO.values()])[tipo]
+    valor = np.round(rng.lognormal(5.5, 1.1, n), 2) * sinal
+    
+    datas = formatar_utc(instantes, rng, FRACAO_COM_MICROSSEGUNDOS)
+    if taxa_datas_invalidas > 0:
+        # Sujeira no formato que aparece nos CSVs reais (pro fix_csv_issues.py ter o que corrigir)
+        sujas = rng.random(n) < taxa_datas_invalidas
+        datas[sujas] = _sortear(rng, ['2023-13-01 00:00:00 UTC', '31/02/2021', 'bad'], int(sujas.sum()))
+    
+    bloco = pd.DataFrame({
+        'cod_transacao': np.arange(inicio + 1, inicio + n + 1),
+        'num_conta': contas['num_conta'].to_numpy()[conta],
+        'data_transacao': datas,
+        'nome_transacao': np.asarray(nomes, dtype=object)[tipo],
+        'valor_transacao': valor
+    })
+    return bloco, conta, instantes
+
+def gerar_dados(pasta, escala='10k', semente=42, taxa_datas_invalidas=0.0, verbose=True):
+    """
+    Grava em `pasta` um conjunto completo e consistente do BanVic (agencias, clientes,
+    contas, colaboradores, colaborador_agencia, propostas_credito e transacoes),
+    com os mesmos formatos dos CSVs originais. Mesma semente e escala → mesmos arquivos.
+    Só a tabela de transações é gerada em blocos; o resto é proporcional e cabe em memória.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    n_transacoes = numero_transacoes(escala)
+    n = tamanhos(n_transacoes)
+    pasta = Path(pasta)
+    pasta.mkdir(parents=True, exist_ok=True)
+    
+    # Uma semente por tabela, pra mudar uma tabela não mexer nas outras
+    sementes = np.random.SeedSequence(semente).spawn(6)
+    rngs = [np.random.default_rng(s) for s in sementes[:5]]
+    
+    log(f"🧪 Gerando BanVic sintético: {n_transacoes:,} transações em {pasta}")
+    agencias = gerar_agencias(n['agencias'], rngs[0])
+    colaboradores, colaborador_agencia = gerar_colaboradores(n['colaboradores'], n['agencias'], rngs[1])
+    clientes = gerar_clientes(n['clientes'], rngs[2])
+    contas = gerar_contas(clientes, colaborador_agencia, rngs[3])
+    propostas = gerar_propostas(n['propostas_credito'], clientes, n['colaboradores'], rngs[4])
+    
+    for nome, tabela in [('agencias', agencias), ('colaboradores', colaboradores),
+                         ('colaborador_agencia', colaborador_agencia), ('clientes', clientes),
+                         ('propostas_credito', propostas)]:
+        tabela.to_csv(pasta / f'{nome}.csv', index=False)
+        log(f"  ✅ {nome}: {len(tabela):,} registros")
+    
+    # Pesos das contas: poucas contas concentram boa parte do movimento
+    pesos_contas = np.random.default_rng(sementes[5]).pareto(1.5, len(contas)) + 1
+    pesos_contas /= pesos_contas.sum()
+    
+    # Último lançamento de cada conta, em microssegundos (SEM_LANCAMENTO = conta sem transação)
+    ultimo_lancamento = np.full(len(contas), SEM_LANCAMENTO, dtype=np.int64)
+    with open(pasta / 'transacoes.csv', 'w', encoding='utf-8', newline='') as saida:
+        for i, inicio in enumerate(range(0, n_transacoes, BLOCO_GERACAO)):
+            tamanho = min(BLOCO_GERACAO, n_transacoes - inicio)
+            bloco, conta, instantes = gerar_bloco_transacoes(
+                inicio, tamanho, contas, pesos_contas, [semente, i], taxa_datas_invalidas
+            )
+            bloco.to_csv(saida, index=False, header=(i == 0))
+            np.maximum.at(ultimo_lancamento, conta, instantes.astype(np.int64))
+            log(f"  ✅ transacoes: {inicio + tamanho:,} de {n_transacoes:,}")
+    
+    # Contas por último, pra data_ultimo_lancamento bater com as transações geradas
+    abertura = contas['data_abertura'].to_numpy(dtype='datetime64[us]')
+    ultimo_lancamento = np.where(ultimo_lancamento == SEM_LANCAMENTO, abertura.astype(np.int64), ultimo_lancamento)
+    contas['data_abertura'] = formatar_utc(abertura)
+    contas['data_ultimo_lancamento'] = formatar_utc(ultimo_lancamento.astype('datetime64[us]'))
+    contas.to_csv(pasta / 'contas.csv', index=False)
+    log(f"  ✅ contas: {len(contas):,} registros")
+    
+    parametros = {'escala': str(escala), 'transacoes': n_transacoes, 'semente': semente,
+                  'taxa_datas_invalidas': taxa_datas_invalidas, 'tamanhos': n}
+    with open(pasta / ARQUIVO_PARAMETROS, 'w', encoding='utf-8') as f:
+        json.dump(parametros, f, ensure_ascii=False, indent=2)
+    return parametros
+
+def dados_prontos(pasta, escala, semente=42, taxa_datas_invalidas=0.0):
+    """True se `pasta` já tem os dados gerados com esses mesmos parâmetros."""
+    arquivo = Path(pasta) / ARQUIVO_PARAMETROS
+    if not arquivo.exists():
+        return False
+    with open(arquivo, encoding='utf-8') as f:
+        parametros = json.load(f)
+    return (parametros.get('transacoes') == numero_transacoes(escala) and parametros.get('semente') == semente
+            and parametros.get('taxa_datas_invalidas') == taxa_datas_invalidas)
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera CSVs sintéticos do BanVic no formato dos originais")
+    parser.add_argument('--escala', default='10k', help=f"{' / '.join(ESCALAS)} ou o número de transações")
+    parser.add_argument('--saida', required=True, help="pasta onde os CSVs são gravados")
+    parser.add_argument('--semente', type=int, default=42, help="semente (mesma semente = mesmos arquivos)")
+    parser.add_argument('--datas-invalidas', type=float, default=0.0,
+                        help="fração de data_transacao em formato quebrado (ex.: 0.001)")
+    args = parser.parse_args()
+    
+    gerar_dados(args.saida, args.escala, args.semente, args.datas_invalidas)
+
+if __name__ == "__main__":
+    main()
@@ -1,57 +1,45 @@
 # Script para buscar a cotação do Dólar via API do Banco Central do Brasil (BCB)
 # Autor: Nayara Vieira
 
-import pandas as pd
-import requests
-from datetime import datetime, timedelta
+import argparse
+import sys
 
-print("Buscando dados de taxa de câmbio do Banco Central...")
+from bcb_client import ClienteBCB, ErroBCB, SERIE_DOLAR, URL_BCB, PASTA_CACHE_PADRAO
 
-# Endpoint da API do BCB para a série histórica do dólar comercial (código 1)
-url = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.1/dados"
-
-try:
-    # Manda o GET request para a URL
-    response = requests.get(url)
-    data = response.json()
-    
-    # O JSON vem numa lista de dicionários, o pandas converte isso fácil
-    df_cambio = pd.DataFrame(data)
-    df_cambio['data'] = pd.to_datetime(df_cambio['data'], format='%d/%m/%Y')
-    df_cambio['valor'] = pd.to_numeric(df_cambio['valor'])
-    
-    # Filtrando para o período que importa para o desafio
-    df_cambio = df_cambio[df_cambio['data'] >= '2023-01-01']
-    df_cambio = df_cambio[df_cambio['data'] <= '2024-12-31']
+def main():
+    parser = argparse.ArgumentParser(description="Baixa a cotação do dólar (SGS 1) do Banco Central.")
+    parser.add_argument('--inicio', default='2023-01-01', help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument('--fim', default='2024-12-31', help="Data final (AAAA-MM-DD)")
+    parser.add_argument('--saida', default='taxa_cambio_bcb.csv', help="Arquivo CSV gerado")
+    parser.add_argument('--cache', default=str(PASTA_CACHE_PADRAO), help="Pasta do cache local das séries")
+    parser.add_argument('--base-url', default=URL_BCB, help="Endereço da API (ex.: servidor local de testes)")
+    args = parser.parse_args()
+    
+    print("Buscando dados de taxa de câmbio do Banco Central...")
+    
+    cliente = ClienteBCB(base_url=args.base_url, pasta_cache=args.cache)
+    try:
+        # Só as janelas de data que ainda não estão no cache vão para a API
+        serie = cliente.serie(SERIE_DOLAR, args.inicio, args.fim)
+    except ErroBCB as e:
+        # Sem dados de mentira: se a API falhar, o CSV anterior fica como está
+        print(f"❌ Erro ao buscar dados: {e}")
+        print(f"❌ {args.saida} não foi alterado.")
+        sys.exit(1)
+    
+    if serie.empty:
+        print(f"❌ Nenhuma cotação entre {args.inicio} e {args.fim}. {args.saida} não foi alterado.")
+        sys.exit(1)
     
     # Renomeando as colunas pra ficar mais fácil de usar no Power BI
-    df_cambio = df_cambio.rename(columns={
-        'data': 'data_cambio',
-        'valor': 'taxa_usd_brl'
-    })
+    df_cambio = serie.rename('taxa_usd_brl').rename_axis('data_cambio').reset_index()
+    df_cambio.to_csv(args.saida, index=False, date_format='%Y-%m-%d')
     
-    # Salva o resultado num arquivo CSV
-    df_cambio.to_csv('taxa_cambio_bcb.csv', index=False)
-    
-    print(f"Arquivo criado com sucesso!")
-    print(f"Período: {df_cambio['data_cambio'].min()} a {df_cambio['data_cambio'].max()}")
+    print(f"Arquivo criado com sucesso! ({cliente.consultas} consulta(s) à API; períodos já baixados vêm do cache)")
+    print(f"Período: {df_cambio['data_cambio'].min().date()} a {df_cambio['data_cambio'].max().date()}")
     print(f"Total de registros: {len(df_cambio)}")
     print("\nPrimeiras linhas:")
     print(df_cambio.head())
-    
-except Exception as e:
-    # Bloco de segurança: se a API falhar ou estiver fora do ar, cria um arquivo de exemplo
-    print(f"Erro ao buscar dados: {e}")
-    print("Criando dados de exemplo...")
-    
-    # Criando dados mockados (fake) só para o dashboard não quebrar
-    dates = pd.date_range('2023-01-01', '2024-12-31', freq='D')
-    valores = [5.2 + (i % 100) * 0.01 for i in range(len(dates))]
-    
-    df_exemplo = pd.DataFrame({
-        'data_cambio': dates,
-        'taxa_usd_brl': valores
-    })
-    
-    df_exemplo.to_csv('taxa_cambio_bcb.csv', index=False)
-    print("Arquivo de exemplo criado!")
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
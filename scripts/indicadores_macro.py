@@ -0,0 +1,119 @@
+# Indicadores macroeconômicos do BCB (câmbio, Selic, CDI, IPCA) numa tabela diária única
+# Autor: Nayara Vieira
+
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+from bcb_client import ClienteBCB, ErroBCB, URL_BCB, PASTA_CACHE_PADRAO
+from calendario import obter_calendario
+
+# Séries do SGS usadas nas análises de crédito e de transações
+SERIES_MACRO = {
+    'usd_brl': {'codigo': 1, 'descricao': 'Dólar comercial (venda), R$'},
+    'eur_brl': {'codigo': 21619, 'descricao': 'Euro (venda), R$'},
+    'selic': {'codigo': 432, 'descricao': 'Meta Selic definida pelo Copom, % a.a.'},
+    'cdi': {'codigo': 4389, 'descricao': 'CDI anualizado base 252, % a.a.'},
+    'ipca': {'codigo': 433, 'descricao': 'IPCA, variação % no mês'},
+}
+
+# Quantas séries são baixadas ao mesmo tempo (e o máximo de conexões abertas)
+CONEXOES_PADRAO = 4
+
+# Busca começa um pouco antes do período pedido, pra o primeiro dia já ter um
+# valor anterior para repetir (o IPCA é mensal, datado no dia 1º)
+FOLGA_DIAS = 45
+
+def buscar_series(nomes=None, inicio='2023-01-01', fim='2024-12-31', conexoes=CONEXOES_PADRAO,
+                  base_url=URL_BCB, pasta_cache=PASTA_CACHE_PADRAO, cliente=None):
+    """
+    Baixa várias séries do SGS em paralelo (uma thread por série, no máximo
+    `conexoes` ao mesmo tempo) usando o cache de cada série do ClienteBCB.
+    
+    Retorna um dict nome → Series. Se alguma série falhar, levanta ErroBCB com
+    todas as falhas depois que as outras terminarem (nada de série pela metade).
+    """
+    nomes = list(SERIES_MACRO) if nomes is None else list(nomes)
+    desconhecidas = [n for n in nomes if n not in SERIES_MACRO]
+    if desconhecidas:
+        raise ValueError(f"Séries desconhecidas: {desconhecidas} (disponíveis: {list(SERIES_MACRO)})")
+    
+    # Uma sessão só, com o pool do tamanho do número de threads
+    cliente = cliente or ClienteBCB(base_url=base_url, pasta_cache=pasta_cache, conexoes=conexoes)
+    
+    series = {}
+    falhas = {}
+    with ThreadPoolExecutor(max_workers=conexoes) as executor:
+        tarefas = {
+            executor.submit(cliente.serie, SERIES_MACRO[nome]['codigo'], inicio, fim): nome
+            for nome in nomes
+        }
+        for tarefa in as_completed(tarefas):
+            nome = tarefas[tarefa]
+            try:
+                series[nome] = tarefa.result()
+                print(f"  ✅ {nome}: {len(series[nome]):,} valores")
+            except ErroBCB as e:
+                falhas[nome] = str(e)
+                print(f"  ❌ {nome}: {e}")
+    
+    if falhas:
+        raise ErroBCB(f"{len(falhas)} série(s) falharam: {', '.join(sorted(falhas))}")
+    
+    return {nome: series[nome] for nome in nomes}
+
+def tabela_diaria(series, inicio, fim, cache_calendario=None):
+    """
+    Junta as séries numa tabela larga com um registro por dia do calendário
+    (mesma chave `data` da dim_datas). Dias sem publicação (fim de semana,
+    feriado, dias do mês no IPCA) repetem o último valor conhecido.
+    """
+    datas = pd.DatetimeIndex(obter_calendario(inicio, fim, cache=cache_calendario)['data'])
+    
+    tabela = pd.DataFrame({'data': datas})
+    for nome, serie in series.items():
+        # União com os dias do calendário, preenchimento pra frente e recorte:
+        # valores publicados antes do início (a folga) valem para os primeiros dias
+        todas = serie.index.union(datas)
+        tabela[nome] = serie.reindex(todas).ffill().reindex(datas).to_numpy()
+    
+    return tabela
+
+def indicadores_diarios(nomes=None, inicio='2023-01-01', fim='2024-12-31', conexoes=CONEXOES_PADRAO,
+                        base_url=URL_BCB, pasta_cache=PASTA_CACHE_PADRAO, cache_calendario=None):
+    """Busca as séries (com folga antes do início) e devolve a tabela diária alinhada."""
+    inicio_busca = pd.Timestamp(inicio) - pd.Timedelta(days=FOLGA_DIAS)
+    series = buscar_series(nomes, inicio_busca, fim, conexoes, base_url, pasta_cache)
+    return tabela_diaria(series, inicio, fim, cache_calendario)
+
+def main():
+    parser = argparse.ArgumentParser(description="Baixa indicadores do BCB e monta a tabela diária.")
+    parser.add_argument('--inicio', default='2023-01-01', help="Data inicial (AAAA-MM-DD)")
+    parser.add_argument('--fim', default='2024-12-31', help="Data final (AAAA-MM-DD)")
+    parser.add_argument('--series', nargs='+', choices=list(SERIES_MACRO), default=None,
+                        help="Séries a baixar (padrão: todas)")
+    parser.add_argument('--conexoes', type=int, default=CONEXOES_PADRAO, help="Downloads simultâneos")
+    parser.add_argument('--saida', default=str(Path(PASTA_CACHE_PADRAO).parent.parent / 'externos' / 'indicadores_macro.csv'),
+                        help="Arquivo CSV gerado")
+    parser.add_argument('--cache', default=str(PASTA_CACHE_PADRAO), help="Pasta do cache local das séries")
+    parser.add_argument('--base-url', default=URL_BCB, help="Endereço da API (ex.: servidor local de testes)")
+    args = parser.parse_args()
+    
+    print("🌐 Buscando indicadores do Banco Central...")
+    try:
+        tabela = indicadores_diarios(args.series, args.inicio, args.fim, args.conexoes,
+                                     args.base_url, args.cache)
+    except ErroBCB as e:
+        print(f"❌ {e}")
+        print(f"❌ {args.saida} não foi alterado.")
+        sys.exit(1)
+    
+    saida = Path(args.saida)
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    tabela.to_csv(saida, index=False, date_format='%Y-%m-%d')
+    print(f"💾 {saida}: {len(tabela):,} dias x {len(tabela.columns) - 1} séries")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# Leitura e escrita dos arquivos Parquet do Desafio BanVic (alternativa colunar aos CSVs)
+# Autor: Nayara Vieira
+
+import shutil
+from pathlib import Path
+
+import pandas as pd
+from date_normalization import normalizar_datas
+
+# Tipos compactos usados nos arquivos Parquet de dados/processed.
+# Chaves e partes de data viram inteiros pequenos (anuláveis), textos de
+# poucos valores distintos viram category.
+TIPOS_PARQUET = {
+    'num_conta': 'Int32',
+    'cod_cliente': 'Int32',
+    'cod_agencia': 'Int16',
+    'cod_colaborador': 'Int16',
+    'ano': 'Int16',
+    'mes': 'Int8',
+    'dia': 'Int8',
+    'trimestre': 'Int8',
+    'semestre': 'Int8',
+    'semana_ano': 'Int8',
+    'dia_ano': 'Int16',
+    'dia_semana_num': 'Int8',
+    'eh_fim_semana': 'Int8',
+    'eh_mes_par': 'Int8',
+    'eh_feriado': 'Int8',
+    'eh_dia_util': 'Int8',
+    'nome_feriado': 'category',
+    'dia_semana': 'category',
+    'mes_nome': 'category',
+    'dia_semana_pt': 'category',
+    'mes_nome_pt': 'category',
+    'mes_tipo': 'category',
+    'nome_transacao': 'category',
+    'tipo_cliente': 'category',
+    'nome_agencia': 'category',
+    'cidade': 'category',
+    'uf': 'category',
+    'tipo_agencia': 'category',
+    'categoria_valor': 'category',
+}
+
+# Coluna usada para particionar a tabela fato (uma pasta por ano)
+COLUNA_PARTICAO = 'ano'
+
+def _importar_pyarrow():
+    """Importa o pyarrow só quando o formato Parquet é de fato usado."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise ImportError(
+            "O formato Parquet precisa do pyarrow. Instale com: pip install pyarrow"
+        ) from e
+    return pa, pq, ds
+
+def preparar_tipos(df):
+    """
+    Aplica os tipos compactos de TIPOS_PARQUET e converte colunas de data em texto
+    (data_*) para datetime64, pra quem ler o Parquet não precisar reprocessar nada.
+    """
+    df = df.copy()
+    
+    for col in df.columns:
+        if col.startswith('data') and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col], _ = normalizar_datas(df[col])
+    
+    for col, tipo in TIPOS_PARQUET.items():
+        if col in df.columns and str(df[col].dtype) != tipo:
+            df[col] = df[col].astype(tipo)
+    
+    return df
+
+def salvar_parquet(df, caminho, particionar=False, parte='00000'):
+    """
+    Salva um DataFrame em Parquet com os tipos compactos.
+    
+    Com particionar=True o caminho é uma pasta (dataset) com uma subpasta por ano;
+    `parte` identifica o bloco no modo streaming, pra um bloco não sobrescrever o outro.
+    """
+    pa, pq, _ = _importar_pyarrow()
+    caminho = Path(caminho)
+    tabela = pa.Table.from_pandas(preparar_tipos(df), preserve_index=False)
+    
+    if particionar and COLUNA_PARTICAO in df.columns:
+        pq.write_to_dataset(
+            tabela,
+            caminho,
+            partition_cols=[COLUNA_PARTICAO],
+            basename_template=f'parte-{parte}-{{i}}.parquet'
+        )
+    else:
+        pq.write_table(tabela, caminho)
+
+def limpar_parquet(caminho):
+    """Remove um arquivo ou dataset Parquet anterior antes de regravar."""
+    caminho = Path(caminho)
+    if caminho.is_dir():
+        shutil.rmtree(caminho)
+    elif caminho.exists():
+        caminho.unlink()
+
+def ler_parquet(caminho, columns=None):
+    """
+    Lê um arquivo ou dataset Parquet gerado pelo ETL, já com os tipos certos
+    (datas como datetime64, categorias e inteiros pequenos).
+    """
+    pa, pq, ds = _importar_pyarrow()
+    caminho = Path(caminho)
+    
+    if caminho.is_dir():
+        particao = ds.partitioning(pa.schema([(COLUNA_PARTICAO, pa.int16())]), flavor='hive')
+        tabela = pq.read_table(caminho, columns=columns, partitioning=particao)
+    else:
+        tabela = pq.read_table(caminho, columns=columns)
+    
+    return tabela.to_pandas()
@@ -0,0 +1,172 @@
+# Perfil de comportamento dos clientes (RFM, tempo de relacionamento e faixa etária) para a dim_clientes
+# Autor: Nayara Vieira
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from dimension_lookup import IndiceDimensao
+
+# Faixas de idade (anos completos na data de referência); PJ fica sem faixa
+LIMITES_IDADE = [0, 25, 35, 45, 55, 65, np.inf]
+FAIXAS_IDADE = ['Até 24', '25-34', '35-44', '45-54', '55-64', '65+']
+
+# Notas de 1 a 5 (quintis), calculadas separadamente para PF e PJ
+NOTAS = 5
+
+# Segmentos pelas notas de recência (R), frequência (F) e valor (M), na ordem: vale o primeiro que bater
+SEGMENTOS = [
+    ('Campeões', lambda r, f, m: (r >= 4) & (f >= 4) & (m >= 4)),
+    ('Leais', lambda r, f, m: (r >= 3) & (f >= 4)),
+    ('Promissores', lambda r, f, m: (r >= 4) & (f <= 2)),
+    ('Em risco', lambda r, f, m: (r <= 2) & (f >= 3)),
+    ('Hibernando', lambda r, f, m: (r <= 2) & (f <= 2)),
+]
+SEGMENTO_PADRAO = 'Regulares'
+SEM_TRANSACOES = 'Sem transações'
+
+# Colunas acrescentadas à dim_clientes (as de clientes.csv continuam na frente, como antes)
+COLUNAS_PERFIL = ['primeira_transacao', 'ultima_transacao', 'recencia_dias', 'frequencia',
+                  'valor_movimentado', 'valor_liquido', 'ticket_medio', 'meses_relacionamento',
+                  'idade', 'faixa_etaria', 'nota_r', 'nota_f', 'nota_m', 'rfm', 'segmento']
+
+_SEM_DATA_MAX = np.iinfo(np.int64).min
+_SEM_DATA_MIN = np.iinfo(np.int64).max
+
+class PerfilClientes:
+    """
+    Totais de transações por cliente (primeira e última data, quantidade, valor
+    movimentado e líquido), somados bloco a bloco. Cada bloco é ordenado pela posição
+    do cliente e reduzido de uma vez com reduceat (sem groupby nem merge); como tudo é
+    mínimo, máximo ou soma, os blocos (e as execuções incrementais) se juntam sem reler nada.
+    """
+    
+    def __init__(self, df_clientes):
+        self.clientes = IndiceDimensao(df_clientes, 'cod_cliente', nome='clientes_perfil')
+        n = len(self.clientes.df)
+        self.primeira = np.full(n, _SEM_DATA_MIN, dtype=np.int64)
+        self.ultima = np.full(n, _SEM_DATA_MAX, dtype=np.int64)
+        self.frequencia = np.zeros(n, dtype=np.int64)
+        self.movimentado = np.zeros(n)
+        self.liquido = np.zeros(n)
+    
+    def _acumular(self, posicoes, primeira, ultima, frequencia, movimentado, liquido):
+        """Reduz por posição de cliente (ordenando as chaves) e junta aos totais."""
+        manter = posicoes >= 0
+        ordem = np.argsort(posicoes[manter], kind='stable')
+        chaves = posicoes[manter][ordem]
+        if len(chaves) == 0:
+            return
+        inicios = np.flatnonzero(np.r_[True, chaves[1:] != chaves[:-1]])
+        clientes = chaves[inicios]
+        
+        def reduzir(valores, funcao):
+            return funcao.reduceat(valores[manter][ordem], inicios)
+        
+        self.primeira[clientes] = np.minimum(self.primeira[clientes], reduzir(primeira, np.minimum))
+        self.ultima[clientes] = np.maximum(self.ultima[clientes], reduzir(ultima, np.maximum))
+        self.frequencia[clientes] += reduzir(frequencia, np.add)
+        self.movimentado[clientes] += reduzir(movimentado, np.add)
+        self.liquido[clientes] += reduzir(liquido, np.add)
+    
+    def adicionar(self, bloco):
+        """Soma um bloco de transações enriquecidas (precisa de cod_cliente, data_transacao e valor_transacao)."""
+        posicoes = self.clientes.posicoes(bloco['cod_cliente'])
+        instantes = bloco['data_transacao'].to_numpy(dtype='datetime64[ns]')
+        datas = instantes.view(np.int64)
+        sem_data = np.isnat(instantes)
+        valores = np.nan_to_num(bloco['valor_transacao'].to_numpy(dtype=np.float64, na_value=np.nan))
+        self._acumular(posicoes,
+                       np.where(sem_data, _SEM_DATA_MIN, datas),
+                       np.where(sem_data, _SEM_DATA_MAX, datas),
+                       np.ones(len(bloco), dtype=np.int64), np.abs(valores), valores)
+    
+    def somar_anterior(self, dim_anterior):
+        """Junta os totais de uma dim_clientes gravada antes (modo incremental)."""
+        posicoes = self.clientes.posicoes(pd.to_numeric(dim_anterior['cod_cliente'], errors='coerce').astype('Int64'))
+        primeira = pd.to_datetime(dim_anterior['primeira_transacao']).to_numpy(dtype='datetime64[ns]')
+        ultima = pd.to_datetime(dim_anterior['ultima_transacao']).to_numpy(dtype='datetime64[ns]')
+        self._acumular(posicoes,
+                       np.where(np.isnat(primeira), _SEM_DATA_MIN, primeira.view(np.int64)),
+                       np.where(np.isnat(ultima), _SEM_DATA_MAX, ultima.view(np.int64)),
+                       dim_anterior['frequencia'].fillna(0).to_numpy(dtype=np.int64),
+                       dim_anterior['valor_movimentado'].fillna(0).to_numpy(dtype=np.float64),
+                       dim_anterior['valor_liquido'].fillna(0).to_numpy(dtype=np.float64))
+    
+    def tabela(self, df_clientes, data_referencia):
+        """
+        dim_clientes com as colunas de COLUNAS_PERFIL. Recência, idade e tempo de
+        relacionamento são contados até `data_referencia` (a última data de transação).
+        """
+        referencia = pd.Timestamp(data_referencia).normalize()
+        dim = df_clientes.reset_index(drop=True).drop(columns=COLUNAS_PERFIL, errors='ignore')
+        posicoes = self.clientes.posicoes(dim['cod_cliente'])
+        encontrado = posicoes >= 0
+        posicoes = np.where(encontrado, posicoes, 0)
+        
+        frequencia = np.where(encontrado, self.frequencia[posicoes], 0)
+        ativo = frequencia > 0
+        primeira = _datas(self.primeira[posicoes], ativo & (self.primeira[posicoes] != _SEM_DATA_MIN))
+        ultima = _datas(self.ultima[posicoes], ativo & (self.ultima[posicoes] != _SEM_DATA_MAX))
+        
+        dim['primeira_transacao'] = primeira
+        dim['ultima_transacao'] = ultima
+        dim['recencia_dias'] = (referencia - ultima.dt.normalize()).dt.days.astype('Int32')
+        dim['frequencia'] = frequencia
+        dim['valor_movimentado'] = np.round(np.where(ativo, self.movimentado[posicoes], 0.0), 2)
+        dim['valor_liquido'] = np.round(np.where(ativo, self.liquido[posicoes], 0.0), 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            dim['ticket_medio'] = np.round(np.where(ativo, dim['valor_movimentado'] / frequencia, np.nan), 2)
+        
+        dim['meses_relacionamento'] = _meses_entre(dim['data_inclusao'], referencia)
+        idade = _meses_entre(dim['data_nascimento'], referencia) // 12
+        pf = (dim['tipo_cliente'].astype('object') == 'PF').to_numpy(dtype=bool, na_value=False)
+        dim['idade'] = idade.where(pf)
+        dim['faixa_etaria'] = pd.cut(dim['idade'].astype('float64'), LIMITES_IDADE, labels=FAIXAS_IDADE, right=False)
+        
+        # Notas por quintil dentro de cada tipo de cliente; recência menor = nota maior
+        metricas = pd.DataFrame({
+            'tipo': dim['tipo_cliente'].astype('object'),
+            'r': -dim['recencia_dias'].astype('float64'),
+            'f': dim['frequencia'].astype('float64'),
+            'm': dim['valor_movimentado'].astype('float64'),
+        }).where(pd.Series(ativo))
+        percentis = metricas.groupby('tipo')[['r', 'f', 'm']].rank(pct=True, method='average')
+        notas = np.ceil(percentis * NOTAS).clip(1, NOTAS)
+        for letra in 'rfm':
+            dim[f'nota_{letra}'] = pd.array(notas[letra].to_numpy(), dtype='Int8')
+        
+        r, f, m = (notas[letra].fillna(0).to_numpy() for letra in 'rfm')
+        completo = notas.notna().all(axis=1).to_numpy()
+        dim['rfm'] = pd.Series((r * 100 + f * 10 + m).astype(np.int64)).astype('str').where(completo)
+        segmento = np.select([regra(r, f, m) for _, regra in SEGMENTOS], [nome for nome, _ in SEGMENTOS],
+                             default=SEGMENTO_PADRAO)
+        # Cliente com transações mas sem nenhuma data válida fica sem segmento
+        dim['segmento'] = pd.Series(np.where(ativo, segmento, SEM_TRANSACOES)).where(completo | ~ativo).astype('category')
+        return dim
+
+def _datas(valores, validas):
+    """Inteiros (ns desde 1970) de volta para datas, com NaT onde não há data."""
+    datas = valores.view('datetime64[ns]').copy()
+    datas[~validas] = np.datetime64('NaT')
+    return pd.Series(datas)
+
+def _meses_entre(datas, referencia):
+    """Meses completos de cada data até `referencia` (Int32, vazio sem data)."""
+    datas = pd.to_datetime(datas)
+    meses = (referencia.year - datas.dt.year) * 12 + (referencia.month - datas.dt.month)
+    meses = meses - (referencia.day < datas.dt.day).astype('int64')
+    return meses.astype('Int32')
+
+def ler_perfil_anterior(processed_path):
+    """dim_clientes da execução anterior (CSV ou Parquet) se ela já tiver o perfil, senão None."""
+    processed_path = Path(processed_path)
+    csv = processed_path / 'dim_clientes.csv'
+    parquet = processed_path / 'dim_clientes.parquet'
+    if csv.exists():
+        dim = pd.read_csv(csv, encoding='utf-8-sig')
+    elif parquet.exists():
+        dim = pd.read_parquet(parquet)
+    else:
+        return None
+    return dim if set(COLUNAS_PERFIL) <= set(dim.columns) else None
@@ -0,0 +1,290 @@
+# Perfil de execução do BanVic: tempo, CPU, memória e linhas de cada etapa, em um relatório JSON
+# Autor: Nayara Vieira
+
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Subpasta (dentro da pasta de saída) onde ficam os relatórios de cada execução
+PASTA_RELATORIOS = 'relatorios'
+
+# Quantas funções do cProfile entram no relatório (ordenadas pelo tempo acumulado)
+TOP_FUNCOES_CPROFILE = 25
+
+MB = 1024 * 1024
+
+def memoria_processo():
+    """
+    RSS atual e pico de RSS do processo, em MB (None quando não dá pra medir).
+    Usa o psutil se estiver instalado; sem ele, /proc (Linux) e o módulo resource.
+    """
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        pico = getattr(info, 'peak_wset', None)  # só existe no Windows
+        if pico is None and resource is not None:
+            pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+        return info.rss / MB, (pico / MB if pico else None)
+    except ImportError:
+        pass
+    
+    atual = None
+    try:
+        with open('/proc/self/statm') as f:
+            atual = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / MB
+    except (OSError, ValueError, AttributeError):
+        pass
+    
+    pico = None
+    if resource is not None:
+        # ru_maxrss vem em KB no Linux e em bytes no macOS
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024) / MB
+    return atual, pico
+
+def _arredondar(valor, casas=3):
+    return round(valor, casas) if valor is not None else None
+
+class PerfilExecucao:
+    """
+    Coleta as medidas de cada etapa de uma execução (ETL, dashboard ou pipeline).
+    
+    Cada `with perfil.etapa('nome') as medida:` registra tempo de relógio, tempo de
+    CPU do processo, RSS no início/fim e o pico de RSS; a etapa pode informar quantas
+    linhas processou com medida['linhas'] = n. Etapas dentro de etapas viram
+    nomes compostos ('etl/joins'). Opcionalmente:
+    
+    - tracemalloc=True: pico de memória alocada pelo Python em cada etapa;
+    - cprofile=True: cProfile das etapas de primeiro nível, com as funções mais
+      caras no relatório e o .prof completo ao lado do JSON.
+    
+    Uma etapa que roda várias vezes (um bloco por vez no modo streaming) soma
+    tempos e linhas numa linha só, com o número de execuções.
+    
+    Com etapas rodando em paralelo (pipeline.py) a CPU e a memória são do processo
+    inteiro, então as medidas de etapas simultâneas se sobrepõem.
+    """
+
+    def __init__(self, nome, tracemalloc=False, cprofile=False):
+        self.nome = nome
+        self.usar_tracemalloc = tracemalloc
+        self.usar_cprofile = cprofile
+        self.etapas = {}
+        self.avisos = []
+        self._pilhas = threading.local()
+        self._trava = threading.Lock()
+        self._estatisticas = None
+        self._inicio = None
+
+    def iniciar(self):
+        self.iniciado_em = datetime.now().isoformat(timespec='seconds')
+        self._inicio = (time.perf_counter(), time.process_time())
+        if self.usar_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return self
+
+    def _pilha(self):
+        if not hasattr(self._pilhas, 'etapas'):
+            self._pilhas.etapas = []
+        return self._pilhas.etapas
+
+    @contextmanager
+    def etapa(self, nome, linhas=None):
+        pilha = self._pilha()
+        nome_completo = f"{pilha[-1]['etapa']}/{nome}" if pilha else nome
+        medida = {'etapa': nome_completo, 'linhas': linhas, 'status': 'ok'}
+        
+        # cProfile só nas etapas de primeiro nível de cada thread
+        perfilador = None
+        if self.usar_cprofile and not pilha:
+            perfilador = cProfile.Profile()
+            try:
+                perfilador.enable()
+            except ValueError as e:  # outro perfilador já ativo
+                self.avisos.append(f"cProfile desligado em {nome_completo}: {e}")
+                perfilador = None
+        
+        # O tracemalloc tem um pico só: a etapa de fora guarda o pico que já tinha visto
+        if self.usar_tracemalloc:
+            if pilha:
+                pilha[-1]['_pico_python'] = max(pilha[-1]['_pico_python'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            medida['_pico_python'] = 0
+        
+        rss_inicio, _ = memoria_processo()
+        relogio, cpu = time.perf_counter(), time.process_time()
+        pilha.append(medida)
+        try:
+            yield medida
+        except BaseException:
+            medida['status'] = 'erro'
+            raise
+        finally:
+            pilha.pop()
+            medida['segundos'] = _arredondar(time.perf_counter() - relogio)
+            medida['cpu_segundos'] = _arredondar(time.process_time() - cpu)
+            rss_fim, pico = memoria_processo()
+            medida['rss_inicio_mb'] = _arredondar(rss_inicio, 1)
+            medida['rss_fim_mb'] = _arredondar(rss_fim, 1)
+            medida['pico_rss_processo_mb'] = _arredondar(pico, 1)
+            
+            if self.usar_tracemalloc:
+                pico_python = max(medida.pop('_pico_python'), tracemalloc.get_traced_memory()[1])
+                medida['pico_python_mb'] = _arredondar(pico_python / MB, 1)
+                if pilha:
+                    pilha[-1]['_pico_python'] = max(pilha[-1]['_pico_python'], pico_python)
+            
+            if medida['linhas'] is not None:
+                medida['linhas'] = int(medida['linhas'])
+                if medida['segundos']:
+                    medida['linhas_por_segundo'] = round(medida['linhas'] / medida['segundos'])
+            
+            if perfilador is not None:
+                perfilador.disable()
+                with self._trava:
+                    if self._estatisticas is None:
+                        self._estatisticas = pstats.Stats(perfilador, stream=io.StringIO())
+                    else:
+                        self._estatisticas.add(perfilador)
+            
+            self._registrar(medida)
+
+    def _registrar(self, medida):
+        """Guarda a medida; uma etapa repetida (ex.: cada bloco do streaming) acumula na mesma linha."""
+        with self._trava:
+            anterior = self.etapas.get(medida['etapa'])
+            if anterior is None:
+                medida['execucoes'] = 1
+                self.etapas[medida['etapa']] = medida
+                return
+            
+            anterior['execucoes'] += 1
+            for campo in ('segundos', 'cpu_segundos'):
+                anterior[campo] = _arredondar(anterior[campo] + medida[campo])
+            if medida['linhas'] is not None:
+                anterior['linhas'] = (anterior['linhas'] or 0) + medida['linhas']
+                if anterior['segundos']:
+                    anterior['linhas_por_segundo'] = round(anterior['linhas'] / anterior['segundos'])
+            for campo in ('pico_rss_processo_mb', 'pico_python_mb'):
+                if medida.get(campo) is not None:
+                    anterior[campo] = max(anterior.get(campo) or 0, medida[campo])
+            anterior['rss_fim_mb'] = medida['rss_fim_mb']
+            if medida['status'] != 'ok':
+                anterior['status'] = medida['status']
+
+    def funcoes_mais_caras(self, n=TOP_FUNCOES_CPROFILE):
+        """As n funções com maior tempo acumulado no cProfile (lista de dicts)."""
+        if self._estatisticas is None:
+            return []
+        funcoes = []
+        for (arquivo, linha, funcao), (_, chamadas, proprio, acumulado, _) in self._estatisticas.stats.items():
+            funcoes.append({
+                'funcao': f"{Path(arquivo).name}:{linha}({funcao})",
+                'chamadas': chamadas,
+                'tempo_proprio': _arredondar(proprio),
+                'tempo_acumulado': _arredondar(acumulado)
+            })
+        return sorted(funcoes, key=lambda f: f['tempo_acumulado'], reverse=True)[:n]
+
+    def relatorio(self, extras=None):
+        """
+        Dicionário do relatório: ambiente, totais da execução e a lista de etapas
+        (na ordem em que terminaram). `extras` entra como campos a mais (ex.: o status do pipeline).
+        """
+        import numpy as np
+        import pandas as pd
+        
+        relogio, cpu = self._inicio or (time.perf_counter(), time.process_time())
+        rss, pico = memoria_processo()
+        relatorio = {
+            'execucao': self.nome,
+            'iniciado_em': getattr(self, 'iniciado_em', None),
+            'argumentos': sys.argv[1:],
+            'ambiente': {
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'numpy': np.__version__,
+                'plataforma': platform.platform(),
+                'cpus': os.cpu_count()
+            },
+            'total': {
+                'segundos': _arredondar(time.perf_counter() - relogio),
+                'cpu_segundos': _arredondar(time.process_time() - cpu),
+                'rss_fim_mb': _arredondar(rss, 1),
+                'pico_rss_processo_mb': _arredondar(pico, 1)
+            },
+            'etapas': list(self.etapas.values())
+        }
+        if self.usar_cprofile:
+            relatorio['cprofile'] = self.funcoes_mais_caras()
+        if self.avisos:
+            relatorio['avisos'] = self.avisos
+        relatorio.update(extras or {})
+        return relatorio
+
+    def salvar(self, pasta, extras=None):
+        """
+        Grava o relatório em pasta/execucao_<nome>_<data-hora>.json (um arquivo
+        por execução, pra comparar rodadas) e o .prof do cProfile, se houver.
+        """
+        pasta = Path(pasta)
+        pasta.mkdir(parents=True, exist_ok=True)
+        carimbo = datetime.now().strftime('%Y%m%d_%H%M%S')
+        arquivo = pasta / f"execucao_{self.nome}_{carimbo}.json"
+        
+        with open(arquivo, 'w', encoding='utf-8') as f:
+            json.dump(self.relatorio(extras), f, ensure_ascii=False, indent=2, default=str)
+        if self._estatisticas is not None:
+            self._estatisticas.dump_stats(arquivo.with_suffix('.prof'))
+        
+        if self.usar_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return arquivo
+
+# Perfil da execução atual (None = instrumentação desligada, as etapas só repassam)
+_perfil_ativo = None
+
+def iniciar_perfil(nome, tracemalloc=False, cprofile=False):
+    """Liga a coleta de medidas para esta execução e retorna o perfil."""
+    global _perfil_ativo
+    _perfil_ativo = PerfilExecucao(nome, tracemalloc=tracemalloc, cprofile=cprofile).iniciar()
+    return _perfil_ativo
+
+def perfil_ativo():
+    return _perfil_ativo
+
+@contextmanager
+def etapa(nome, linhas=None):
+    """
+    Mede um trecho do código no perfil ativo. Sem perfil ligado não mede nada,
+    então a instrumentação pode ficar no código sem custo.
+    """
+    if _perfil_ativo is None:
+        yield {'etapa': nome, 'linhas': linhas}
+        return
+    with _perfil_ativo.etapa(nome, linhas) as medida:
+        yield medida
+
+def finalizar_perfil(pasta, extras=None):
+    """Grava o relatório do perfil ativo em `pasta` e desliga a coleta. Retorna o caminho (ou None)."""
+    global _perfil_ativo
+    if _perfil_ativo is None:
+        return None
+    arquivo = _perfil_ativo.salvar(pasta, extras)
+    _perfil_ativo = None
+    print(f"⏱️ Relatório de execução: {arquivo}")
+    return arquivo
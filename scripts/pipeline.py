@@ -0,0 +1,412 @@
+# Pipeline do Desafio BanVic: diagnóstico → validação / crédito / ETL → calendário / câmbio / resumos / hipóteses
+#                             → câmbio x transações
+# Autor: Nayara Vieira
+#
+# Uso: python scripts/pipeline.py [--entrada PASTA] [--saida PASTA] [--etapas ...] [--pular ...]
+# Cada etapa só roda se as entradas mudaram desde a última execução (ou se faltar
+# alguma saída); etapas independentes rodam ao mesmo tempo.
+#
+# O diagnóstico não grava os "_corrigido.csv" de propósito: validação, crédito e ETL
+# leem os CSVs originais e já convertem as datas com o mesmo normalizar_datas. A
+# cópia corrigida só tiraria as linhas com data inválida, que o ETL mantém (data
+# vazia) e a validação lista em rejeitados.csv. Para gerar as cópias, use
+# scripts/fix_csv_issues.py.
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from pathlib import Path
+
+from etl_state import hash_arquivo, carregar_estado, salvar_estado
+from banvic_schema import ler_tabela
+from fix_csv_issues import diagnosticar_em_paralelo, assinatura_arquivo, ARQUIVO_CACHE_DIAGNOSTICO, SUFIXO_CORRIGIDO
+from banvic_powerbi_integration_fixed import (load_banvic_data, salvar_calendario, salvar_resumos,
+                                              PASTA_ENTRADA_PADRAO, PASTA_SAIDA_PADRAO, RAIZ_PROJETO,
+                                              FORMATOS_SAIDA, ARQUIVOS_DIMENSAO)
+from cubo_transacoes import ler_cubo, arquivo_cubo, ARQUIVO_CUBO
+from indicadores_macro import indicadores_diarios, CONEXOES_PADRAO
+from bcb_client import URL_BCB, PASTA_CACHE_PADRAO
+from perfil_execucao import etapa as medir_etapa, iniciar_perfil, finalizar_perfil, PASTA_RELATORIOS
+from banco_sqlite import conectar, carregar_tabela, arquivo_banco, CHAVES_DIMENSOES
+from validacao_dados import validar_pasta, REGRAS, ARQUIVO_REJEITADOS
+from credito import analisar_carteira, ARQUIVOS_CREDITO
+from produtividade import ARQUIVOS_PRODUTIVIDADE, TABELAS_PRODUTIVIDADE
+from testes_hipoteses import testar_pasta, ARQUIVO_TESTES, REAMOSTRAGENS_PADRAO, SEMENTE_PADRAO
+from cambio_transacoes import analisar_cambio, ARQUIVOS_CAMBIO, JANELA_PADRAO, DEFASAGEM_MAXIMA
+
+# Estado do pipeline (assinatura das entradas de cada etapa), gravado na pasta de saída
+ARQUIVO_ESTADO_PIPELINE = 'pipeline_estado.json'
+
+PASTA_EXTERNOS_PADRAO = RAIZ_PROJETO / 'dados' / 'externos'
+ARQUIVO_INDICADORES = 'indicadores_macro.csv'
+
+RESUMOS = ['resumo_dias_semana', 'resumo_meses_tipo', 'resumo_agencias_6m',
+           'ranking_agencias_janelas', 'ranking_agencias_mensal']
+
+def extensoes(formato):
+    """Extensões gravadas em cada formato de saída do ETL."""
+    return {'csv': ['.csv'], 'parquet': ['.parquet'], 'ambos': ['.csv', '.parquet']}[formato]
+
+def tabelas(config, nomes):
+    """Caminhos das tabelas `nomes` na pasta de saída, no formato configurado."""
+    return [config['saida'] / f'{nome}{ext}' for nome in nomes for ext in extensoes(config['formato'])]
+
+def periodo_do_cubo(config):
+    """Primeiro e último dia com transação, lidos do cubo diário."""
+    datas = ler_cubo(config['saida']).index.get_level_values('data').dropna()
+    if len(datas) == 0:
+        raise RuntimeError("cubo_diario sem datas válidas")
+    return datas.min(), datas.max()
+
+# ---------------------------------------------------------------------------
+# Etapas: entradas (arquivos + parâmetros), saídas esperadas e execução
+# ---------------------------------------------------------------------------
+
+def csvs_de_entrada(config):
+    """CSVs originais da pasta de entrada (sem os '_corrigido' da ferramenta de correção)."""
+    return sorted(p for p in config['entrada'].glob('*.csv') if not p.name.endswith(SUFIXO_CORRIGIDO))
+
+def executar_diagnostico(config):
+    # Só diagnóstico (corrigir=False): as etapas seguintes leem os CSVs originais
+    resultados = diagnosticar_em_paralelo(
+        [str(p) for p in csvs_de_entrada(config)], config['processos'],
+        arquivo_cache=config['saida'] / ARQUIVO_CACHE_DIAGNOSTICO, corrigir=False
+    )
+    for arquivo, resultado in sorted(resultados.items()):
+        for coluna, info in resultado['datas'].items():
+            if info['invalidas']:
+                print(f"  ⚠️ {Path(arquivo).name}.{coluna}: {info['invalidas']} datas inválidas (ex.: {info['exemplos']})")
+
+def executar_validacao(config):
+    validar_pasta(config['entrada'], config['saida'])
+
+def executar_credito(config):
+    analisar_carteira(config['entrada'], config['saida'])
+
+def executar_etl(config):
+    # O ETL incremental já decide sozinho entre anexar as transações novas e refazer tudo
+    resultado = load_banvic_data(
+        chunksize=config['chunksize'], output_format=config['formato'], incremental=True,
+        data_path=config['entrada'], processed_path=config['saida'],
+        criar_calendario=False, criar_resumos=False, sqlite=config['sqlite'],
+        processos=config['processos']
+    )
+    if resultado is None:
+        raise RuntimeError("ETL não concluído (ver mensagens acima)")
+
+def executar_calendario(config):
+    data_min, data_max = periodo_do_cubo(config)
+    dim_dates = salvar_calendario(data_min, data_max, config['saida'], config['formato'])
+    print(f"  ✅ dim_datas: {len(dim_dates):,} dias ({data_min.date()} a {data_max.date()})")
+    if config['sqlite']:
+        # O ETL do pipeline não monta o calendário, então a dim_datas do banco vem daqui
+        conexao = conectar(arquivo_banco(config['saida']))
+        try:
+            carregar_tabela(conexao, 'dim_datas', dim_dates, CHAVES_DIMENSOES['dim_datas'])
+        finally:
+            conexao.close()
+        print(f"  ✅ dim_datas no {arquivo_banco(config['saida']).name}")
+
+def executar_cambio(config):
+    data_min, data_max = periodo_do_cubo(config)
+    tabela = indicadores_diarios(inicio=data_min, fim=data_max, conexoes=config['conexoes'],
+                                 base_url=config['base_url'], pasta_cache=config['cache_bcb'])
+    config['externos'].mkdir(parents=True, exist_ok=True)
+    tabela.to_csv(config['externos'] / ARQUIVO_INDICADORES, index=False, date_format='%Y-%m-%d')
+    print(f"  ✅ {ARQUIVO_INDICADORES}: {len(tabela):,} dias")
+
+def executar_resumos(config):
+    cubo = ler_cubo(config['saida'])
+    df_agencias = ler_tabela(config['entrada'] / 'agencias.csv')
+    salvar_resumos(cubo, df_agencias, config['saida'], config['formato'],
+                   config['janelas_ranking'], mensagem="  ✅ {nome}")
+
+def executar_hipoteses(config):
+    testar_pasta(config['saida'])
+
+def executar_cambio_transacoes(config):
+    analisar_cambio(config['saida'], config['externos'] / ARQUIVO_INDICADORES)
+
+# Ordem de declaração = ordem de execução quando não há paralelismo
+ETAPAS = {
+    'diagnostico': {
+        'descricao': "diagnóstico dos CSVs de entrada, sem gravar os _corrigido.csv (fix_csv_issues)",
+        'depende': [],
+        'entradas': csvs_de_entrada,
+        'parametros': lambda c: {},
+        'saidas': lambda c: [c['saida'] / ARQUIVO_CACHE_DIAGNOSTICO],
+        'executar': executar_diagnostico
+    },
+    'validacao': {
+        'descricao': "regras de qualidade dos CSVs, reprovados em rejeitados.csv (validacao_dados)",
+        'depende': ['diagnostico'],
+        'entradas': lambda c: [c['entrada'] / f'{nome}.csv' for nome in REGRAS],
+        'parametros': lambda c: {},
+        'saidas': lambda c: [c['saida'] / ARQUIVO_REJEITADOS],
+        'executar': executar_validacao
+    },
+    'credito': {
+        'descricao': "carteira de crédito: prestações, saldo devedor e funil de aprovação (credito)",
+        'depende': ['diagnostico'],
+        'entradas': lambda c: [c['entrada'] / 'propostas_credito.csv', c['entrada'] / 'colaborador_agencia.csv'],
+        'parametros': lambda c: {},
+        'saidas': lambda c: [c['saida'] / ARQUIVOS_CREDITO[nome] for nome in ('conferencia', 'saldo', 'colaboradores')],
+        'executar': executar_credito
+    },
+    'etl': {
+        'descricao': "transações, dimensões e cubo diário (banvic_powerbi_integration_fixed)",
+        'depende': ['diagnostico'],
+        'entradas': lambda c: [c['entrada'] / nome for nome in ['transacoes.csv'] + ARQUIVOS_DIMENSAO + ARQUIVOS_PRODUTIVIDADE],
+        'parametros': lambda c: {'formato': c['formato'], 'chunksize': c['chunksize'], 'sqlite': c['sqlite']},
+        'saidas': lambda c: tabelas(c, [ARQUIVO_CUBO, 'transacoes_powerbi', 'dim_clientes', 'dim_agencias'])
+                            + ([arquivo_banco(c['saida'])] if c['sqlite'] else [])
+                            + (tabelas(c, TABELAS_PRODUTIVIDADE) if (c['entrada'] / 'colaboradores.csv').exists() else []),
+        'executar': executar_etl
+    },
+    'calendario': {
+        'descricao': "dim_datas no período das transações (calendario)",
+        'depende': ['etl'],
+        'entradas': lambda c: [arquivo_cubo(c['saida'])],
+        'parametros': lambda c: {'formato': c['formato'], 'sqlite': c['sqlite']},
+        'saidas': lambda c: tabelas(c, ['dim_datas']),
+        'executar': executar_calendario
+    },
+    'cambio': {
+        'descricao': "câmbio e indicadores do BCB no período (indicadores_macro)",
+        'depende': ['etl'],
+        'entradas': lambda c: [arquivo_cubo(c['saida'])],
+        'parametros': lambda c: {},
+        'saidas': lambda c: [c['externos'] / ARQUIVO_INDICADORES],
+        'executar': executar_cambio
+    },
+    'resumos': {
+        'descricao': "resumos executivos e rankings a partir do cubo",
+        'depende': ['etl'],
+        'entradas': lambda c: [arquivo_cubo(c['saida']), c['entrada'] / 'agencias.csv'],
+        'parametros': lambda c: {'formato': c['formato'], 'janelas': c['janelas_ranking']},
+        'saidas': lambda c: tabelas(c, RESUMOS),
+        'executar': executar_resumos
+    },
+    'hipoteses': {
+        'descricao': "testes de permutação/bootstrap: meses pares e dia da semana (testes_hipoteses)",
+        'depende': ['etl'],
+        'entradas': lambda c: [arquivo_cubo(c['saida'])],
+        'parametros': lambda c: {'reamostragens': REAMOSTRAGENS_PADRAO, 'semente': SEMENTE_PADRAO},
+        'saidas': lambda c: [c['saida'] / ARQUIVO_TESTES],
+        'executar': executar_hipoteses
+    },
+    'cambio_transacoes': {
+        'descricao': "câmbio x transações: correlação móvel, defasada e beta por agência (cambio_transacoes)",
+        'depende': ['etl', 'cambio'],
+        'entradas': lambda c: [arquivo_cubo(c['saida']), c['externos'] / ARQUIVO_INDICADORES],
+        'parametros': lambda c: {'janela': JANELA_PADRAO, 'defasagens': DEFASAGEM_MAXIMA},
+        'saidas': lambda c: [c['saida'] / nome for nome in ARQUIVOS_CAMBIO.values()],
+        'executar': executar_cambio_transacoes
+    },
+}
+
+# ---------------------------------------------------------------------------
+# Controle de mudanças e execução
+# ---------------------------------------------------------------------------
+
+def assinatura_entradas(arquivos, anteriores):
+    """
+    Hash de cada arquivo de entrada. Arquivos com o mesmo mtime/tamanho da
+    execução anterior reaproveitam o hash salvo (não são relidos).
+    """
+    assinaturas = {}
+    for caminho in arquivos:
+        if caminho is None or not Path(caminho).exists():
+            assinaturas[str(caminho)] = None
+            continue
+        atual = assinatura_arquivo(caminho)
+        anterior = anteriores.get(str(caminho)) or {}
+        if all(anterior.get(k) == v for k, v in atual.items()):
+            assinaturas[str(caminho)] = anterior
+        else:
+            assinaturas[str(caminho)] = dict(atual, sha256=hash_arquivo(caminho))
+    return assinaturas
+
+def motivo_execucao(etapa, config, estado):
+    """Retorna por que a etapa precisa rodar (ou None se nada mudou) e a assinatura atual."""
+    definicao = ETAPAS[etapa]
+    anterior = estado.get(etapa) or {}
+    assinatura = {
+        'entradas': assinatura_entradas(definicao['entradas'](config), anterior.get('entradas', {})),
+        'parametros': definicao['parametros'](config)
+    }
+    
+    if config['forcar']:
+        return "--forcar", assinatura
+    if not anterior:
+        return "primeira execução", assinatura
+    faltando = [p.name for p in definicao['saidas'](config) if not p.exists()]
+    if faltando:
+        return f"saída ausente ({', '.join(faltando)})", assinatura
+    if anterior.get('parametros') != assinatura['parametros']:
+        return "parâmetros mudaram", assinatura
+    
+    hashes_antes = {k: (v or {}).get('sha256') for k, v in anterior.get('entradas', {}).items()}
+    hashes_agora = {k: (v or {}).get('sha256') for k, v in assinatura['entradas'].items()}
+    mudaram = [Path(k).name for k in hashes_agora if hashes_agora[k] != hashes_antes.get(k)]
+    if mudaram or hashes_agora.keys() != hashes_antes.keys():
+        return f"entradas mudaram ({', '.join(mudaram) or 'lista de arquivos'})", assinatura
+    return None, assinatura
+
+def rodar_etapa(etapa, config, estado):
+    """Executa uma etapa (se precisar). Retorna (status, detalhe, assinatura ou None)."""
+    motivo, assinatura = motivo_execucao(etapa, config, estado)
+    if motivo is None:
+        print(f"⏭️ {etapa}: entradas sem mudança, pulando")
+        return 'sem mudança', '', None
+    
+    print(f"\n▶️ {etapa}: {ETAPAS[etapa]['descricao']} — {motivo}")
+    with medir_etapa(etapa):
+        ETAPAS[etapa]['executar'](config)
+    # As saídas de uma etapa são entradas da seguinte: a assinatura é tirada depois
+    # de rodar, pra gravar o estado das entradas que de fato foram usadas
+    assinatura['entradas'] = assinatura_entradas(ETAPAS[etapa]['entradas'](config), assinatura['entradas'])
+    return 'executada', motivo, assinatura
+
+def etapas_necessarias(alvos, pular):
+    """Alvos pedidos mais as dependências deles, sem as etapas puladas, na ordem de ETAPAS."""
+    incluidas = set()
+    pendentes = list(alvos)
+    while pendentes:
+        etapa = pendentes.pop()
+        if etapa in incluidas or etapa in pular:
+            continue
+        incluidas.add(etapa)
+        pendentes.extend(ETAPAS[etapa]['depende'])
+    return [etapa for etapa in ETAPAS if etapa in incluidas]
+
+def executar_pipeline(config, alvos=None, pular=(), paralelas=3):
+    """
+    Roda as etapas como um grafo de dependências: cada etapa começa assim que as
+    dependências terminam, e etapas independentes (calendário, câmbio, resumos)
+    rodam em paralelo. Uma etapa pulada (--pular) é tratada como já concluída.
+    Retorna um dict etapa → {'status', 'detalhe', 'segundos'}.
+    """
+    arquivo_estado = config['saida'] / ARQUIVO_ESTADO_PIPELINE
+    config['saida'].mkdir(parents=True, exist_ok=True)
+    estado = carregar_estado(arquivo_estado) or {}
+    
+    etapas = etapas_necessarias(alvos or list(ETAPAS), set(pular))
+    resultados = {}
+    em_andamento = {}
+    inicios = {}
+    
+    with ThreadPoolExecutor(max_workers=paralelas) as executor:
+        while len(resultados) < len(etapas):
+            # Dispara tudo que já tem as dependências resolvidas
+            for etapa in etapas:
+                if etapa in resultados or etapa in inicios:
+                    continue
+                deps = [d for d in ETAPAS[etapa]['depende'] if d in etapas]
+                if any(resultados.get(d, {}).get('status') in ('falhou', 'bloqueada') for d in deps):
+                    resultados[etapa] = {'status': 'bloqueada', 'detalhe': 'dependência falhou', 'segundos': 0.0}
+                elif all(d in resultados for d in deps):
+                    inicios[etapa] = time.perf_counter()
+                    em_andamento[executor.submit(rodar_etapa, etapa, config, estado)] = etapa
+            
+            if not em_andamento:
+                continue
+            
+            prontas, _ = wait(list(em_andamento), return_when=FIRST_COMPLETED)
+            for tarefa in prontas:
+                etapa = em_andamento.pop(tarefa)
+                segundos = time.perf_counter() - inicios.pop(etapa)
+                try:
+                    status, detalhe, assinatura = tarefa.result()
+                except Exception as e:
+                    print(f"❌ {etapa}: {e}")
+                    resultados[etapa] = {'status': 'falhou', 'detalhe': str(e), 'segundos': segundos}
+                    continue
+                
+                resultados[etapa] = {'status': status, 'detalhe': detalhe, 'segundos': segundos}
+                if assinatura is not None:
+                    estado[etapa] = dict(assinatura, concluida_em=datetime.now().isoformat(timespec='seconds'))
+                    salvar_estado(arquivo_estado, estado)
+    
+    return {etapa: resultados[etapa] for etapa in etapas}
+
+def imprimir_resultados(resultados):
+    """Quadro final com o que rodou, o que foi pulado e o que falhou."""
+    icones = {'executada': '✅', 'sem mudança': '⏭️', 'falhou': '❌', 'bloqueada': '⛔'}
+    print("\n" + "="*60)
+    print("📋 RESUMO DO PIPELINE")
+    print("="*60)
+    largura = max([12] + [len(etapa) for etapa in resultados])
+    for etapa, resultado in resultados.items():
+        detalhe = f" — {resultado['detalhe']}" if resultado['detalhe'] else ""
+        print(f"{icones[resultado['status']]} {etapa:<{largura}} {resultado['status']:<12} {resultado['segundos']:7.1f}s{detalhe}")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pipeline BanVic: diagnóstico → ETL → calendário / câmbio / resumos. "
+                    "Só roda o que mudou desde a última execução. O diagnóstico não corrige "
+                    "os CSVs: as etapas seguintes leem os originais e tratam as datas na leitura "
+                    "(as cópias _corrigido.csv saem de scripts/fix_csv_issues.py)."
+    )
+    parser.add_argument('--entrada', default=str(PASTA_ENTRADA_PADRAO), help="pasta com os CSVs originais")
+    parser.add_argument('--saida', default=str(PASTA_SAIDA_PADRAO), help="pasta dos arquivos para o Power BI")
+    parser.add_argument('--externos', default=str(PASTA_EXTERNOS_PADRAO), help="pasta dos dados do BCB")
+    parser.add_argument('--cache-bcb', default=str(PASTA_CACHE_PADRAO), help="cache local das séries do BCB")
+    parser.add_argument('--base-url', default=URL_BCB, help="endereço da API do BCB (ex.: servidor local de testes)")
+    parser.add_argument('--formato', choices=FORMATOS_SAIDA, default='csv', help="formato das saídas do ETL")
+    parser.add_argument('--chunksize', type=int, default=None, help="ETL em blocos de N linhas")
+    parser.add_argument('--sqlite', action='store_true', help="ETL grava também o banco SQLite (banvic.db)")
+    parser.add_argument('--janelas-ranking', type=int, nargs='+', default=None,
+                        help="janelas (em dias) do ranking de agências")
+    parser.add_argument('--etapas', nargs='+', choices=list(ETAPAS), default=None,
+                        help="etapas a rodar (as dependências entram junto)")
+    parser.add_argument('--pular', nargs='+', choices=list(ETAPAS), default=[],
+                        help="etapas que não devem rodar (ex.: cambio sem internet)")
+    parser.add_argument('--forcar', action='store_true', help="roda as etapas mesmo sem mudança nas entradas")
+    parser.add_argument('--paralelas', type=int, default=3, help="etapas rodando ao mesmo tempo")
+    parser.add_argument('--processos', type=int, default=None, help="processos do diagnóstico dos CSVs e do ETL")
+    parser.add_argument('--conexoes', type=int, default=CONEXOES_PADRAO, help="downloads simultâneos do BCB")
+    parser.add_argument('--perfil', action='store_true',
+                        help="mede tempo, CPU, memória e linhas de cada etapa (JSON em <saida>/relatorios)")
+    parser.add_argument('--tracemalloc', action='store_true', help="inclui o pico de memória do Python por etapa")
+    parser.add_argument('--cprofile', action='store_true', help="inclui as funções mais caras do cProfile")
+    args = parser.parse_args()
+    
+    config = {
+        'entrada': Path(args.entrada),
+        'saida': Path(args.saida),
+        'externos': Path(args.externos),
+        'cache_bcb': Path(args.cache_bcb),
+        'base_url': args.base_url,
+        'formato': args.formato,
+        'chunksize': args.chunksize,
+        'sqlite': args.sqlite,
+        'janelas_ranking': args.janelas_ranking,
+        'forcar': args.forcar,
+        'processos': args.processos,
+        'conexoes': args.conexoes
+    }
+    
+    print("🚀 PIPELINE BANVIC")
+    print("="*60)
+    print(f"📂 Entrada: {config['entrada']}")
+    print(f"📁 Saída: {config['saida']}")
+    
+    if not (config['entrada'] / 'transacoes.csv').exists():
+        print(f"❌ transacoes.csv não encontrado em {config['entrada']}")
+        sys.exit(1)
+    
+    if args.perfil or args.tracemalloc or args.cprofile:
+        iniciar_perfil('pipeline', tracemalloc=args.tracemalloc, cprofile=args.cprofile)
+    
+    resultados = executar_pipeline(config, args.etapas, args.pular, args.paralelas)
+    imprimir_resultados(resultados)
+    finalizar_perfil(config['saida'] / PASTA_RELATORIOS, extras={'pipeline': resultados})
+    
+    if any(r['status'] in ('falhou', 'bloqueada') for r in resultados.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# Produtividade de colaboradores e agências: contas abertas, volume das contas geridas e propostas
+# Autor: Nayara Vieira
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from banvic_schema import ler_tabela
+from dimension_lookup import IndiceDimensao
+
+# Arquivos de origem além de contas.csv (sem eles o ETL segue sem a produtividade)
+ARQUIVOS_PRODUTIVIDADE = ['colaboradores.csv', 'colaborador_agencia.csv', 'propostas_credito.csv']
+
+# Tabelas gravadas pelo ETL em dados/processed
+TABELA_COLABORADORES = 'dim_colaboradores'
+TABELA_PRODUTIVIDADE = 'fato_produtividade'
+TABELA_PRODUTIVIDADE_AGENCIAS = 'resumo_produtividade_agencias'
+TABELAS_PRODUTIVIDADE = [TABELA_COLABORADORES, TABELA_PRODUTIVIDADE, TABELA_PRODUTIVIDADE_AGENCIAS]
+
+# Colunas da dim_colaboradores (CPF, endereço e CEP ficam de fora do modelo do Power BI)
+COLUNAS_COLABORADORES = ['cod_colaborador', 'primeiro_nome', 'ultimo_nome', 'email', 'data_nascimento']
+
+STATUS_APROVADA = 'Aprovada'
+
+# Métricas que vêm das transações: somadas bloco a bloco e, no modo incremental,
+# somadas às da execução anterior (as demais são recalculadas das dimensões a cada execução)
+ADITIVAS = ['qtd_transacoes', 'volume_transacoes']
+
+class Produtividade:
+    """
+    Rollups por colaborador, com uma passada por tabela fato. Os índices (colaborador →
+    posição e conta → colaborador) são montados uma vez, com chaves inteiras; cada bloco
+    de transações só busca a posição do colaborador e soma com bincount.
+    
+    A última posição (len(colaboradores)) junta as contas e propostas sem colaborador
+    conhecido, que aparecem na fato com cod_colaborador vazio.
+    """
+    
+    def __init__(self, df_colaboradores, df_colaborador_agencia, df_contas, df_propostas):
+        self.colaboradores = IndiceDimensao(df_colaboradores, 'cod_colaborador', nome='colaboradores')
+        self.n = len(self.colaboradores.df)
+        
+        # Agência de cada colaborador (o colaborador_agencia tem um por colaborador)
+        lotacao = IndiceDimensao(df_colaborador_agencia, 'cod_colaborador', nome='colaborador_agencia')
+        self.agencia = lotacao.valores('cod_agencia').take(
+            lotacao.posicoes(self.colaboradores.df['cod_colaborador']), allow_fill=True)
+        
+        # Conta → posição do colaborador que gere a conta
+        posicao_conta = self._posicao(df_contas['cod_colaborador'])
+        self.contas = IndiceDimensao(pd.DataFrame({'num_conta': df_contas['num_conta'].to_numpy(),
+                                                   'posicao': posicao_conta}), 'num_conta', nome='contas')
+        self._colaborador_da_conta = self.contas.df['posicao'].to_numpy()
+        self.contas_abertas = np.bincount(posicao_conta, minlength=self.n + 1)
+        
+        posicao_proposta = self._posicao(df_propostas['cod_colaborador'])
+        aprovada = (df_propostas['status_proposta'] == STATUS_APROVADA).to_numpy(dtype=bool, na_value=False)
+        valor = np.nan_to_num(df_propostas['valor_proposta'].to_numpy(dtype=np.float64, na_value=np.nan))
+        self.propostas = np.bincount(posicao_proposta, minlength=self.n + 1)
+        self.propostas_aprovadas = np.bincount(posicao_proposta[aprovada], minlength=self.n + 1)
+        self.valor_aprovado = np.bincount(posicao_proposta, weights=np.where(aprovada, valor, 0.0), minlength=self.n + 1)
+        
+        self.qtd_transacoes = np.zeros(self.n + 1, dtype=np.int64)
+        self.volume_transacoes = np.zeros(self.n + 1)
+    
+    def _posicao(self, codigos):
+        posicoes = self.colaboradores.posicoes(codigos)
+        return np.where(posicoes >= 0, posicoes, self.n)
+    
+    def adicionar(self, bloco):
+        """Soma um bloco de transações (precisa de num_conta e valor_transacao)."""
+        posicao_conta = self.contas.posicoes(bloco['num_conta'])
+        posicao = np.where(posicao_conta >= 0, self._colaborador_da_conta[posicao_conta], self.n)
+        valores = np.nan_to_num(bloco['valor_transacao'].to_numpy(dtype=np.float64, na_value=np.nan))
+        self.qtd_transacoes += np.bincount(posicao, minlength=self.n + 1)
+        self.volume_transacoes += np.bincount(posicao, weights=valores, minlength=self.n + 1)
+    
+    def somar_anterior(self, fato):
+        """Soma as métricas de transações de uma fato_produtividade anterior (modo incremental)."""
+        codigos = pd.to_numeric(fato['cod_colaborador'], errors='coerce')
+        posicao = self._posicao(codigos.astype('Int64'))
+        for coluna in ADITIVAS:
+            soma = np.bincount(posicao, weights=fato[coluna].to_numpy(dtype=np.float64), minlength=self.n + 1)
+            atual = getattr(self, coluna)
+            atual += soma.astype(atual.dtype)
+    
+    def tabelas(self, df_agencias):
+        """dim_colaboradores, fato_produtividade (por colaborador) e o resumo por agência."""
+        colunas = [c for c in COLUNAS_COLABORADORES if c in self.colaboradores.df.columns]
+        dim = self.colaboradores.df[colunas].copy()
+        dim['cod_agencia'] = self.agencia
+        nomes = IndiceDimensao(df_agencias, 'cod_agencia', nome='agencias')
+        dim['nome_agencia'] = nomes.valores('nome').take(nomes.posicoes(dim['cod_agencia']), allow_fill=True)
+        
+        codigos = pd.array(list(self.colaboradores.df['cod_colaborador']) + [None], dtype='Int16')
+        agencias = pd.array(list(self.agencia) + [None], dtype='Int16')
+        fato = pd.DataFrame({
+            'cod_colaborador': codigos,
+            'cod_agencia': agencias,
+            'contas_abertas': self.contas_abertas,
+            'qtd_transacoes': self.qtd_transacoes,
+            'volume_transacoes': np.round(self.volume_transacoes, 2),
+            'propostas': self.propostas,
+            'propostas_aprovadas': self.propostas_aprovadas,
+            'valor_aprovado': np.round(self.valor_aprovado, 2),
+        })
+        fato['taxa_aprovacao'] = _taxa(fato['propostas_aprovadas'], fato['propostas'])
+        # A linha "sem colaborador" só entra se tiver alguma coisa
+        if not fato.iloc[-1][['contas_abertas', 'qtd_transacoes', 'propostas']].any():
+            fato = fato.iloc[:-1]
+        
+        metricas = ['contas_abertas', 'qtd_transacoes', 'volume_transacoes', 'propostas',
+                    'propostas_aprovadas', 'valor_aprovado']
+        por_agencia = fato.dropna(subset=['cod_agencia']).groupby('cod_agencia')
+        agencias = por_agencia[metricas].sum()
+        agencias.insert(0, 'colaboradores', por_agencia['cod_colaborador'].count())
+        agencias[['volume_transacoes', 'valor_aprovado']] = agencias[['volume_transacoes', 'valor_aprovado']].round(2)
+        agencias['taxa_aprovacao'] = _taxa(agencias['propostas_aprovadas'], agencias['propostas'])
+        agencias = agencias.reset_index()
+        agencias.insert(1, 'nome_agencia', nomes.valores('nome').take(nomes.posicoes(agencias['cod_agencia']), allow_fill=True))
+        agencias = agencias.sort_values('volume_transacoes', ascending=False)
+        
+        return {
+            TABELA_COLABORADORES: dim,
+            TABELA_PRODUTIVIDADE: fato.reset_index(drop=True),
+            TABELA_PRODUTIVIDADE_AGENCIAS: agencias.reset_index(drop=True),
+        }
+
+def _taxa(parte, total):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.round(parte.to_numpy(dtype=np.float64) / total.to_numpy(dtype=np.float64), 4)
+
+def criar_produtividade(data_path, df_contas):
+    """
+    Lê colaboradores, colaborador_agencia e propostas e monta os índices. `df_contas`
+    precisa de num_conta e cod_colaborador. Retorna None se faltar algum arquivo.
+    """
+    data_path = Path(data_path)
+    faltando = [nome for nome in ARQUIVOS_PRODUTIVIDADE if not (data_path / nome).exists()]
+    if faltando or 'cod_colaborador' not in df_contas.columns:
+        print(f"⏭️ Produtividade de colaboradores fica de fora (faltando: {', '.join(faltando) or 'contas.cod_colaborador'})")
+        return None
+    return Produtividade(
+        ler_tabela(data_path / 'colaboradores.csv', colunas=COLUNAS_COLABORADORES),
+        ler_tabela(data_path / 'colaborador_agencia.csv'),
+        df_contas,
+        ler_tabela(data_path / 'propostas_credito.csv',
+                   colunas=['cod_colaborador', 'valor_proposta', 'status_proposta'])
+    )
+
+def ler_produtividade_anterior(processed_path):
+    """fato_produtividade da execução anterior (CSV ou Parquet), ou None se não existir."""
+    processed_path = Path(processed_path)
+    csv = processed_path / f'{TABELA_PRODUTIVIDADE}.csv'
+    if csv.exists():
+        return pd.read_csv(csv)
+    parquet = processed_path / f'{TABELA_PRODUTIVIDADE}.parquet'
+    if parquet.exists():
+        return pd.read_parquet(parquet)
+    return None
@@ -0,0 +1,145 @@
+# Ranking de agências em janelas móveis (30/90/180/365 dias, por mês) com somas acumuladas
+# Autor: Nayara Vieira
+
+import numpy as np
+import pandas as pd
+from cubo_transacoes import consultar
+
+# Janelas padrão, em dias, terminando no último dia com transação
+JANELAS_PADRAO = [30, 90, 180, 365]
+
+# Critério de ordenação do ranking → medida das somas acumuladas
+CRITERIOS_RANKING = {'qtd': 'Qtd_Transacoes', 'soma': 'Volume_Total'}
+
+# Colunas de cada ranking (além da agência)
+CAMPOS_RANKING = ['Qtd_Transacoes', 'Volume_Total', 'Valor_Medio', 'Posicao', 'Acima_Media']
+
+class SomasAcumuladas:
+    """
+    Somas acumuladas por agência e por dia (quantidade, valores válidos e volume).
+    
+    Montadas uma vez a partir dos totais diários (ex.: o cubo do ETL), respondem
+    o total de qualquer janela de datas com duas leituras por agência, sem
+    voltar a filtrar e agrupar as transações.
+    """
+    
+    def __init__(self, totais_diarios):
+        """`totais_diarios`: colunas data, cod_agencia, qtd, n_valor, soma (uma ou mais linhas por dia/agência)."""
+        totais = totais_diarios.dropna(subset=['data', 'cod_agencia'])
+        datas = pd.to_datetime(totais['data']).dt.normalize()
+        
+        self.inicio = datas.min()
+        self.fim = datas.max()
+        self.agencias = pd.Index(np.sort(totais['cod_agencia'].unique()), name='cod_agencia')
+        n_dias = (self.fim - self.inicio).days + 1 if len(totais) else 0
+        
+        linhas = self.agencias.get_indexer(totais['cod_agencia'])
+        colunas = (datas - self.inicio).dt.days.to_numpy()
+        
+        # Posição 0 é zero, posição d+1 é o acumulado até o dia d (inclusive)
+        self.acumulado = {}
+        for medida in ('qtd', 'n_valor', 'soma'):
+            diario = np.zeros((len(self.agencias), n_dias + 1), dtype='float64')
+            np.add.at(diario, (linhas, colunas + 1), totais[medida].to_numpy(dtype='float64'))
+            self.acumulado[medida] = np.cumsum(diario, axis=1)
+    
+    @classmethod
+    def do_cubo(cls, cubo):
+        """Monta as somas a partir do cubo diário (cubo_transacoes.py)."""
+        totais = consultar(cubo, ['data', 'cod_agencia'])[['qtd', 'n_valor', 'soma']].reset_index()
+        return cls(totais)
+    
+    def _posicao(self, dia):
+        """Índice no acumulado logo depois de `dia` (limitado ao período disponível)."""
+        dias = (pd.Timestamp(dia).normalize() - self.inicio).days + 1
+        return int(np.clip(dias, 0, self.acumulado['qtd'].shape[1] - 1))
+    
+    def janela(self, inicio, fim):
+        """Totais de cada agência entre `inicio` e `fim` (inclusive)."""
+        totais = self.janelas([inicio], [fim])
+        return pd.DataFrame({medida: valores[:, 0] for medida, valores in totais.items()}, index=self.agencias)
+    
+    def janelas(self, inicios, fins):
+        """Totais de várias janelas de uma vez: dict medida → matriz (agências x janelas)."""
+        ini = np.array([self._posicao(pd.Timestamp(d) - pd.Timedelta(days=1)) for d in inicios], dtype=np.int64)
+        fi = np.maximum(np.array([self._posicao(d) for d in fins], dtype=np.int64), ini)
+        return {medida: acumulado[:, fi] - acumulado[:, ini] for medida, acumulado in self.acumulado.items()}
+
+def classificar(totais, por='qtd'):
+    """
+    Ranking das agências a partir dos totais de uma janela: posição (empates
+    ficam com a mesma posição), ticket médio e se está acima da média das agências.
+    """
+    if por not in CRITERIOS_RANKING:
+        raise ValueError(f"Critério inválido: {por} (use {list(CRITERIOS_RANKING)})")
+    
+    ranking = pd.DataFrame({
+        'Qtd_Transacoes': totais['qtd'].round().astype('int64'),
+        'Volume_Total': totais['soma'].round(2),
+        'Valor_Medio': (totais['soma'] / totais['n_valor'].replace(0, np.nan)).round(2)
+    })
+    criterio = ranking[CRITERIOS_RANKING[por]]
+    ranking['Posicao'] = criterio.rank(method='min', ascending=False).astype('int64')
+    ranking['Acima_Media'] = criterio > criterio.mean()
+    return ranking.sort_values(['Posicao', 'cod_agencia'])
+
+def ranking_janela(somas, dias, fim=None, por='qtd'):
+    """Ranking dos últimos `dias` dias terminando em `fim` (padrão: último dia disponível)."""
+    fim = somas.fim if fim is None else pd.Timestamp(fim).normalize()
+    inicio = fim - pd.Timedelta(days=dias - 1)
+    return classificar(somas.janela(inicio, fim), por)
+
+def extremos(ranking, k=3):
+    """As k melhores e as k piores agências de um ranking, com a coluna Grupo (Top/Bottom)."""
+    top = ranking.head(k).assign(Grupo='Top')
+    bottom = ranking.tail(k).iloc[::-1].assign(Grupo='Bottom')
+    return pd.concat([top, bottom])
+
+def rankings_por_janela(somas, janelas=None, por='qtd'):
+    """Tabela longa com o ranking de cada janela (em dias) terminando no último dia."""
+    janelas = JANELAS_PADRAO if janelas is None else janelas
+    partes = [ranking_janela(somas, dias, por=por).assign(Janela_Dias=dias) for dias in janelas]
+    tabela = pd.concat(partes).reset_index()
+    return tabela[['Janela_Dias', 'cod_agencia'] + [c for c in tabela.columns if c not in ('Janela_Dias', 'cod_agencia')]]
+
+def ranking_por_periodo(somas, freq='M', dias=None, por='qtd'):
+    """
+    Ranking de cada período (por padrão, cada mês) como série temporal.
+    
+    Sem `dias`, a janela é o próprio período (o mês inteiro); com `dias`, são os
+    últimos `dias` dias terminando no fim do período. Todas as janelas saem de uma
+    vez das somas acumuladas. Variacao_Posicao compara com o período anterior
+    (positivo = a agência subiu no ranking).
+    """
+    if por not in CRITERIOS_RANKING:
+        raise ValueError(f"Critério inválido: {por} (use {list(CRITERIOS_RANKING)})")
+    
+    periodos = pd.period_range(somas.inicio, somas.fim, freq=freq)
+    if len(periodos) == 0:
+        return pd.DataFrame()
+    
+    fins = periodos.end_time.normalize()
+    inicios = periodos.start_time if dias is None else fins - pd.Timedelta(days=dias - 1)
+    totais = somas.janelas(inicios, fins)
+    
+    # Matrizes agências x períodos: a posição é calculada coluna a coluna
+    def matriz(valores):
+        return pd.DataFrame(valores, index=somas.agencias, columns=periodos.astype(str))
+    
+    qtd = matriz(totais['qtd']).round().astype('int64')
+    volume = matriz(totais['soma'])
+    medio = volume / matriz(totais['n_valor']).replace(0, np.nan)
+    criterio = qtd if por == 'qtd' else volume.round(2)
+    posicao = criterio.rank(method='min', ascending=False).astype('int64')
+    
+    tabela = pd.DataFrame({
+        'Qtd_Transacoes': qtd.stack(),
+        'Volume_Total': volume.round(2).stack(),
+        'Valor_Medio': medio.round(2).stack(),
+        'Posicao': posicao.stack(),
+        'Acima_Media': (criterio > criterio.mean()).stack(),
+        'Variacao_Posicao': (posicao.shift(axis=1) - posicao).astype('Int64').stack()
+    })
+    tabela.index.names = ['cod_agencia', 'Periodo']
+    tabela = tabela.reset_index().sort_values(['Periodo', 'Posicao', 'cod_agencia'])
+    return tabela[['Periodo', 'cod_agencia'] + CAMPOS_RANKING + ['Variacao_Posicao']].reset_index(drop=True)
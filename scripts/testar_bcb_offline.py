@@ -0,0 +1,284 @@
+# Conferência offline do cliente do BCB e dos indicadores macro contra um SGS de mentira (http.server local)
+# Autor: Nayara Vieira
+#
+# Uso: python scripts/testar_bcb_offline.py
+# Sobe um servidor local que responde como a API do SGS (cotações nos dias úteis,
+# IPCA no dia 1º, 404 "Value(s) not found" em janela sem valor, falhas programadas)
+# e confere o cache, a busca só das janelas que faltam, as novas tentativas, a
+# saída de erro do get_taxa_cambio.py e o download paralelo do indicadores_macro.
+# Não acessa a internet; sai com código 1 se algo falhar.
+
+import json
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+from bcb_client import ClienteBCB, ErroBCB, SERIE_DOLAR
+from indicadores_macro import SERIES_MACRO, buscar_series, indicadores_diarios
+
+PASTA_SCRIPTS = Path(__file__).resolve().parent
+
+class ServidorSGS:
+    """
+    SGS local: /dados/serie/bcdata.sgs.<codigo>/dados com dataInicial/dataFinal.
+    Cada dia útil tem um valor (determinístico, pelo código e pela data), e as
+    séries em `mensais` só têm o dia 1º de cada mês; janela sem valor responde
+    404 com a mensagem em inglês da API de verdade.
+    
+    `falhas[codigo]` é uma fila de status HTTP devolvidos antes de responder
+    normalmente, e os códigos em `sempre_falhar` respondem 500 toda vez. As
+    falhas mandam Retry-After: 0, pra as novas tentativas não esperarem.
+    
+    Com `atraso` cada resposta demora esse tanto (em segundos) e `pico` guarda o
+    maior número de consultas atendidas ao mesmo tempo.
+    """
+    
+    def __init__(self, mensais=(SERIES_MACRO['ipca']['codigo'],)):
+        self.consultas = []
+        self.falhas = {}
+        self.sempre_falhar = set()
+        self.mensais = set(mensais)
+        self.atraso = 0.0
+        self.ativas = 0
+        self.pico = 0
+        self._trava = threading.Lock()
+        servidor = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def log_message(self, *args):
+                pass
+            
+            def do_GET(self):
+                servidor.responder(self)
+        
+        self._http = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self._http.server_port}'
+    
+    def __enter__(self):
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+    
+    def __exit__(self, *args):
+        self._http.shutdown()
+        self._http.server_close()
+    
+    def valores(self, codigo, inicio, fim):
+        """Registros da janela no formato da API (data dd/mm/aaaa, valor em texto)."""
+        datas = pd.date_range(inicio, fim, freq='MS') if codigo in self.mensais else pd.bdate_range(inicio, fim)
+        return [{'data': d.strftime('%d/%m/%Y'), 'valor': f'{codigo % 100 + d.month / 10 + d.day / 1000:.4f}'}
+                for d in datas]
+    
+    def responder(self, handler):
+        url = urlparse(handler.path)
+        parametros = parse_qs(url.query)
+        codigo = int(url.path.split('bcdata.sgs.')[1].split('/')[0])
+        inicio = pd.to_datetime(parametros['dataInicial'][0], format='%d/%m/%Y').date()
+        fim = pd.to_datetime(parametros['dataFinal'][0], format='%d/%m/%Y').date()
+        
+        with self._trava:
+            fila = self.falhas.get(codigo) or []
+            status = fila.pop(0) if fila else (500 if codigo in self.sempre_falhar else 200)
+            self.consultas.append({'codigo': codigo, 'inicio': inicio, 'fim': fim, 'status': status})
+            self.ativas += 1
+            self.pico = max(self.pico, self.ativas)
+        try:
+            time.sleep(self.atraso)
+            self._responder_consulta(handler, codigo, inicio, fim, status)
+        finally:
+            with self._trava:
+                self.ativas -= 1
+    
+    def _responder_consulta(self, handler, codigo, inicio, fim, status):
+        if status == 200:
+            registros = self.valores(codigo, inicio, fim)
+            if registros:
+                self._enviar(handler, 200, json.dumps(registros))
+            else:
+                self._enviar(handler, 404, json.dumps({'error': 'Value(s) not found', 'message': 'Value(s) not found'}))
+        else:
+            self._enviar(handler, status, 'Service Unavailable', {'Retry-After': '0'})
+    
+    def _enviar(self, handler, status, corpo, cabecalhos=None):
+        corpo = corpo.encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            handler.send_header(nome, valor)
+        handler.end_headers()
+        handler.wfile.write(corpo)
+    
+    def janelas(self, desde=0):
+        """(código, início, fim) das consultas a partir da posição `desde` do log."""
+        return [(c['codigo'], c['inicio'], c['fim']) for c in self.consultas[desde:]]
+
+class Conferencia:
+    """Acumula os resultados das conferências e imprime cada um."""
+    
+    def __init__(self):
+        self.falhas = []
+    
+    def __call__(self, condicao, descricao, detalhe=''):
+        if condicao:
+            print(f"  ✅ {descricao}")
+        else:
+            print(f"  ❌ {descricao}{f' ({detalhe})' if detalhe else ''}")
+            self.falhas.append(descricao)
+
+def conferir_cliente(servidor, pasta, conferir):
+    """Cache, janelas faltantes, 503 com nova tentativa e janela vazia (404) no ClienteBCB."""
+    print("\n🔎 ClienteBCB (série 1)")
+    cache = pasta / 'cache'
+    
+    def cliente():
+        return ClienteBCB(base_url=servidor.url, pasta_cache=cache, tentativas=3)
+    
+    # Primeira busca: uma consulta, um valor por dia útil
+    antes = len(servidor.consultas)
+    serie = cliente().serie(SERIE_DOLAR, '2023-01-02', '2023-03-31')
+    conferir(servidor.janelas(antes) == [(1, date(2023, 1, 2), date(2023, 3, 31))],
+             "primeira busca: uma consulta para o período inteiro", servidor.janelas(antes))
+    conferir(len(serie) == len(pd.bdate_range('2023-01-02', '2023-03-31')), "um valor por dia útil", len(serie))
+    
+    # Segunda execução (outra instância, mesmo cache): nenhuma consulta
+    antes = len(servidor.consultas)
+    repetida = cliente()
+    serie_cache = repetida.serie(SERIE_DOLAR, '2023-01-02', '2023-03-31')
+    conferir(len(servidor.consultas) == antes and repetida.consultas == 0,
+             "segunda execução sai toda do cache", servidor.janelas(antes))
+    conferir(serie_cache.equals(serie), "valores do cache iguais aos baixados")
+    
+    # Período mais largo: só as duas pontas que faltam
+    antes = len(servidor.consultas)
+    larga = cliente().serie(SERIE_DOLAR, '2022-12-01', '2023-04-28')
+    esperadas = [(1, date(2022, 12, 1), date(2023, 1, 1)), (1, date(2023, 4, 1), date(2023, 4, 28))]
+    conferir(sorted(servidor.janelas(antes)) == esperadas, "período mais largo busca só as janelas que faltam",
+             servidor.janelas(antes))
+    conferir(len(larga) == len(pd.bdate_range('2022-12-01', '2023-04-28')), "série larga completa", len(larga))
+    
+    # Janela só de fim de semana: 404 "Value(s) not found" vira série vazia, sem erro
+    antes = len(servidor.consultas)
+    try:
+        fim_de_semana = cliente().serie(SERIE_DOLAR, '2023-04-29', '2023-04-30')
+        conferir(fim_de_semana.empty and [c['status'] for c in servidor.consultas[antes:]] == [200],
+                 "janela sem cotação (404) volta vazia, sem erro")
+    except ErroBCB as e:
+        conferir(False, "janela sem cotação (404) volta vazia, sem erro", e)
+    antes = len(servidor.consultas)
+    cliente().serie(SERIE_DOLAR, '2022-12-01', '2023-04-30')
+    conferir(len(servidor.consultas) == antes, "janela vazia fica registrada no cache (não é buscada de novo)")
+    
+    # 503 seguido de sucesso: a sessão tenta de novo sozinha
+    antes = len(servidor.consultas)
+    servidor.falhas[SERIE_DOLAR] = [503]
+    com_retry = cliente()
+    try:
+        maio = com_retry.serie(SERIE_DOLAR, '2023-05-01', '2023-05-31')
+        status = [c['status'] for c in servidor.consultas[antes:]]
+        conferir(status == [503, 200] and len(maio) == len(pd.bdate_range('2023-05-01', '2023-05-31')),
+                 "503 é repetido e a segunda tentativa vale", status)
+    except ErroBCB as e:
+        conferir(False, "503 é repetido e a segunda tentativa vale", e)
+
+def conferir_falha_get_taxa_cambio(servidor, pasta, conferir):
+    """get_taxa_cambio.py com a API sempre em erro: código 1 e nenhum CSV gravado."""
+    print("\n🔎 get_taxa_cambio.py com falha definitiva")
+    saida = pasta / 'taxa_cambio_bcb.csv'
+    servidor.sempre_falhar.add(SERIE_DOLAR)
+    antes = len(servidor.consultas)
+    try:
+        processo = subprocess.run(
+            [sys.executable, str(PASTA_SCRIPTS / 'get_taxa_cambio.py'), '--inicio', '2023-01-02', '--fim', '2023-01-31',
+             '--saida', str(saida), '--cache', str(pasta / 'cache_falha'), '--base-url', servidor.url],
+            capture_output=True, text=True, timeout=120
+        )
+    finally:
+        servidor.sempre_falhar.discard(SERIE_DOLAR)
+    conferir(processo.returncode == 1, "sai com código 1", processo.returncode)
+    conferir(not saida.exists(), "taxa_cambio_bcb.csv não é gravado")
+    conferir(len(servidor.consultas) - antes > 1, "as tentativas foram feitas antes de desistir",
+             len(servidor.consultas) - antes)
+
+def conferir_indicadores(servidor, pasta, conferir):
+    """Download paralelo, cache por série, falha de uma série e tabela diária do indicadores_macro."""
+    print("\n🔎 indicadores_macro (5 séries)")
+    cache = pasta / 'cache_macro'
+    codigos = {nome: info['codigo'] for nome, info in SERIES_MACRO.items()}
+    
+    # Com 2 conexões e respostas lentas, no máximo 2 consultas ao mesmo tempo
+    antes = len(servidor.consultas)
+    servidor.atraso, servidor.pico = 0.2, 0
+    try:
+        series = buscar_series(inicio='2023-01-01', fim='2023-03-31', conexoes=2, base_url=servidor.url, pasta_cache=cache)
+    finally:
+        servidor.atraso = 0.0
+    consultados = sorted(c for c, _, _ in servidor.janelas(antes))
+    conferir(consultados == sorted(codigos.values()), "uma consulta por série", consultados)
+    conferir(servidor.pico == 2, "conexões simultâneas limitadas a `conexoes` (2)", f"pico {servidor.pico}")
+    conferir(len(series['ipca']) == 3 and len(series['usd_brl']) == len(pd.bdate_range('2023-01-01', '2023-03-31')),
+             "IPCA mensal (3 meses) e câmbio diário", {nome: len(serie) for nome, serie in series.items()})
+    
+    # Segunda busca: tudo do cache de cada série
+    antes = len(servidor.consultas)
+    buscar_series(inicio='2023-01-01', fim='2023-03-31', conexoes=2, base_url=servidor.url, pasta_cache=cache)
+    conferir(len(servidor.consultas) == antes, "segunda busca sai do cache de cada série", servidor.janelas(antes))
+    
+    # Uma série falhando: o erro só sobe depois que as outras terminaram (e foram pro cache)
+    cache_falha = pasta / 'cache_macro_falha'
+    servidor.sempre_falhar.add(codigos['selic'])
+    servidor.atraso = 0.1
+    cliente = ClienteBCB(base_url=servidor.url, pasta_cache=cache_falha, tentativas=1, conexoes=2)
+    try:
+        buscar_series(inicio='2023-01-01', fim='2023-03-31', conexoes=2, cliente=cliente)
+        conferir(False, "série com falha levanta ErroBCB")
+    except ErroBCB as e:
+        conferir('selic' in str(e), "série com falha levanta ErroBCB", e)
+        em_cache = sorted(nome for nome, codigo in codigos.items() if (cache_falha / f'sgs_{codigo}.csv').exists())
+        conferir(em_cache == sorted(set(codigos) - {'selic'}), "as outras séries terminaram antes do erro", em_cache)
+    finally:
+        servidor.sempre_falhar.discard(codigos['selic'])
+        servidor.atraso = 0.0
+    
+    # Tabela diária: um registro por dia do calendário, último valor repetido nos dias sem publicação
+    tabela = indicadores_diarios(inicio='2023-01-01', fim='2023-03-31', conexoes=2,
+                                 base_url=servidor.url, pasta_cache=cache).set_index('data')
+    conferir(list(tabela.index) == list(pd.date_range('2023-01-01', '2023-03-31')), "um registro por dia do calendário")
+    conferir(not tabela.isna().any().any(), "nenhum dia vazio (a folga cobre 1º de janeiro)",
+             tabela.isna().sum().to_dict())
+    ipca = series['ipca']
+    conferir((tabela.loc['2023-02-01':'2023-02-28', 'ipca'] == ipca.loc['2023-02-01']).all()
+             and (tabela.loc['2023-03-01':, 'ipca'] == ipca.loc['2023-03-01']).all(),
+             "IPCA do dia 1º repetido no mês inteiro")
+    dolar = series['usd_brl']
+    conferir(tabela.loc['2023-01-07', 'usd_brl'] == tabela.loc['2023-01-08', 'usd_brl'] == dolar.loc['2023-01-06'],
+             "fim de semana repete a cotação de sexta")
+
+def main():
+    print("🧪 CONFERÊNCIA OFFLINE DO CLIENTE DO BCB E DOS INDICADORES")
+    print("=" * 50)
+    conferir = Conferencia()
+    
+    with tempfile.TemporaryDirectory() as temporaria, ServidorSGS() as servidor:
+        pasta = Path(temporaria)
+        print(f"🌐 SGS local em {servidor.url}")
+        conferir_cliente(servidor, pasta, conferir)
+        conferir_falha_get_taxa_cambio(servidor, pasta, conferir)
+        conferir_indicadores(servidor, pasta, conferir)
+    
+    print("\n" + "=" * 50)
+    if conferir.falhas:
+        print(f"❌ {len(conferir.falhas)} conferência(s) falharam")
+        sys.exit(1)
+    print("✅ Tudo certo")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+# Testes de hipótese do BanVic (meses pares x ímpares e dia da semana) sobre as contagens diárias
+# Autor: Nayara Vieira
+#
+# As contagens são normalizadas pela exposição do calendário (quantos dias de cada tipo
+# existem no período, inclusive os dias sem nenhuma transação) e os testes de permutação
+# e bootstrap rodam nos arrays de contagens diárias, nunca nas transações linha a linha.
+
+import argparse
+from itertools import permutations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from calendario import obter_calendario
+
+DIAS_SEMANA_PT = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira',
+                  'Sexta-feira', 'Sábado', 'Domingo']
+
+REAMOSTRAGENS_PADRAO = 10_000
+SEMENTE_PADRAO = 42
+NIVEL_CONFIANCA = 0.95
+ALFA = 0.05
+
+# Reamostragens por lote no teste de dia da semana (cada lote é um array lote x semanas x 7)
+LOTE_REAMOSTRAGENS = 500
+
+ARQUIVO_TESTES = 'testes_hipoteses.csv'
+
+def serie_diaria(qtd_por_dia, calendario=None):
+    """
+    Contagem de transações em cada dia do calendário, do primeiro ao último dia com
+    transação; dias sem nenhuma transação entram com zero (são exposição também).
+    `qtd_por_dia`: Series com índice de datas (dia) e a quantidade de transações.
+    Retorna um DataFrame com data, qtd, mes, dia_semana_num (1 = segunda) e eh_feriado.
+    """
+    qtd_por_dia = qtd_por_dia[qtd_por_dia.index.notna()]
+    dias = pd.DatetimeIndex(qtd_por_dia.index).normalize()
+    qtd_por_dia = pd.Series(qtd_por_dia.to_numpy(), index=dias).groupby(level=0).sum()
+    inicio, fim = dias.min(), dias.max()
+    if calendario is None:
+        calendario = obter_calendario(inicio, fim)
+    calendario = calendario[(calendario['data'] >= inicio) & (calendario['data'] <= fim)]
+    
+    diario = calendario[['data', 'mes', 'dia_semana_num', 'eh_feriado']].reset_index(drop=True)
+    diario['qtd'] = qtd_por_dia.reindex(pd.DatetimeIndex(diario['data'])).fillna(0).to_numpy(dtype=np.float64)
+    return diario
+
+def _intervalo(amostras):
+    cauda = (1 - NIVEL_CONFIANCA) / 2 * 100
+    return np.nanpercentile(amostras, [cauda, 100 - cauda], axis=0)
+
+def _variancia_ponderada(valores, pesos):
+    """
+    Variância amostral ponderada em torno da média ponderada (pesos normalizados
+    para somar len(valores), ddof=1). Com pesos iguais é a variância comum.
+    """
+    if len(valores) < 2:
+        return 0.0
+    pesos = pesos * len(valores) / pesos.sum()
+    media = np.sum(pesos * valores) / len(valores)
+    return np.sum(pesos * (valores - media) ** 2) / (len(valores) - 1)
+
+def teste_meses_pares(diario, reamostragens=REAMOSTRAGENS_PADRAO, semente=SEMENTE_PADRAO):
+    """
+    Meses pares têm mais transações por dia que os ímpares?
+    
+    A unidade é o mês do calendário (o rótulo par/ímpar é do mês, e dias do mesmo
+    mês não são independentes): cada mês vira (transações, dias). A estatística é a
+    diferença das taxas (transações por dia) entre pares e ímpares.
+    - permutação: os rótulos par/ímpar são embaralhados entre os meses;
+    - bootstrap: os meses são reamostrados dentro de cada grupo (IC da diferença e da razão);
+    - d de Cohen nas taxas diárias de cada mês, ponderadas pelos dias do mês (o
+      numerador é a mesma diferença das taxas, então o sinal sempre bate).
+    """
+    rng = np.random.default_rng(semente)
+    datas = pd.DatetimeIndex(diario['data'])
+    chave_mes = datas.year * 12 + datas.month - 1
+    meses = diario.groupby(chave_mes.to_numpy()).agg(qtd=('qtd', 'sum'), dias=('qtd', 'size'))
+    par = (meses.index.to_numpy() % 12 + 1) % 2 == 0
+    qtd = meses['qtd'].to_numpy(dtype=np.float64)
+    dias = meses['dias'].to_numpy(dtype=np.float64)
+
+    def diferenca(rotulos):
+        # rotulos: (reamostragens, meses) booleano; taxas por dia de cada grupo via produto de matrizes
+        rotulos = rotulos.astype(np.float64)
+        taxa_par = (rotulos @ qtd) / (rotulos @ dias)
+        taxa_impar = ((1 - rotulos) @ qtd) / ((1 - rotulos) @ dias)
+        return taxa_par - taxa_impar
+    
+    taxa_par = qtd[par].sum() / dias[par].sum()
+    taxa_impar = qtd[~par].sum() / dias[~par].sum()
+    observada = taxa_par - taxa_impar
+    
+    # Permutação: cada linha é um embaralhamento dos rótulos entre os meses
+    ordem = np.argsort(rng.random((reamostragens, len(par))), axis=1)
+    permutadas = diferenca(par[ordem])
+    p_valor = (1 + np.sum(np.abs(permutadas) >= abs(observada) - 1e-12)) / (reamostragens + 1)
+    
+    # Bootstrap por mês, separado em cada grupo
+    i_par = np.flatnonzero(par)[rng.integers(0, par.sum(), (reamostragens, par.sum()))]
+    i_impar = np.flatnonzero(~par)[rng.integers(0, (~par).sum(), (reamostragens, (~par).sum()))]
+    boot_par = qtd[i_par].sum(axis=1) / dias[i_par].sum(axis=1)
+    boot_impar = qtd[i_impar].sum(axis=1) / dias[i_impar].sum(axis=1)
+    ic_diferenca = _intervalo(boot_par - boot_impar)
+    ic_razao = _intervalo(boot_par / boot_impar)
+    
+    # Desvio combinado das taxas mensais, com o mesmo peso (dias) das taxas dos grupos
+    taxas = qtd / dias
+    n_par, n_impar = par.sum(), (~par).sum()
+    desvio = np.sqrt(((n_par - 1) * _variancia_ponderada(taxas[par], dias[par])
+                      + (n_impar - 1) * _variancia_ponderada(taxas[~par], dias[~par])) / (n_par + n_impar - 2))
+    
+    return {
+        'teste': 'meses_pares',
+        'grupo': 'Meses Pares',
+        'referencia': 'Meses Ímpares',
+        'meses_grupo': int(par.sum()),
+        'meses_referencia': int((~par).sum()),
+        'dias_grupo': int(dias[par].sum()),
+        'dias_referencia': int(dias[~par].sum()),
+        'taxa_grupo': taxa_par,
+        'taxa_referencia': taxa_impar,
+        'diferenca': observada,
+        'ic_diferenca_inf': ic_diferenca[0],
+        'ic_diferenca_sup': ic_diferenca[1],
+        'razao': taxa_par / taxa_impar,
+        'ic_razao_inf': ic_razao[0],
+        'ic_razao_sup': ic_razao[1],
+        'd_cohen': observada / desvio if desvio > 0 else np.nan,
+        'p_valor': p_valor,
+        'reamostragens': reamostragens,
+    }
+
+def _semanas(diario, excluir_feriados=True):
+    """
+    Matriz semanas x 7 (segunda a domingo) das contagens, só com semanas completas.
+    Feriados viram NaN (com excluir_feriados): um feriado numa terça não é uma terça comum.
+    """
+    segunda = np.flatnonzero(diario['dia_semana_num'].to_numpy() == 1)
+    if len(segunda) == 0:
+        return np.empty((0, 7))
+    inicio = segunda[0]
+    semanas = (len(diario) - inicio) // 7
+    qtd = diario['qtd'].to_numpy(dtype=np.float64).copy()
+    if excluir_feriados:
+        qtd[diario['eh_feriado'].to_numpy() == 1] = np.nan
+    return qtd[inicio:inicio + semanas * 7].reshape(semanas, 7)
+
+def _medias_dias(matrizes):
+    """Média por dia da semana (ignora NaN) de um array (..., semanas, 7)."""
+    validos = ~np.isnan(matrizes)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(validos, matrizes, 0).sum(axis=-2) / validos.sum(axis=-2)
+
+def _razao_outros(medias):
+    """Média de cada dia dividida pela média dos outros seis dias."""
+    soma = medias.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return medias / ((soma - medias) / 6)
+
+def teste_dias_semana(diario, reamostragens=REAMOSTRAGENS_PADRAO, semente=SEMENTE_PADRAO, excluir_feriados=True):
+    """
+    Algum dia da semana tem mais transações que os outros?
+    
+    A unidade é a semana: a matriz semanas x 7 tem a contagem de cada dia (feriados fora).
+    - permutação: os 7 valores são embaralhados dentro de cada semana (mantém a tendência
+      de longo prazo); estatística global = variância das 7 médias, e por dia o desvio
+      da média do dia em relação à média geral;
+    - bootstrap: semanas reamostradas, IC da razão de cada dia contra os outros seis.
+    Retorna um DataFrame com uma linha por dia da semana (p_valor_global em todas).
+    """
+    rng = np.random.default_rng(semente)
+    semanas = _semanas(diario, excluir_feriados)
+    n = len(semanas)
+    medias = _medias_dias(semanas)
+    geral = np.nanmean(semanas)
+    variancia = medias.var()
+    razao = _razao_outros(medias)
+    
+    validos = ~np.isnan(semanas)
+    valores = np.where(validos, semanas, 0.0)
+    contagens = validos.astype(np.float64)
+    # Soma e número de dias válidos num array complexo só: uma busca por índice em vez de duas
+    plano = (valores + 1j * contagens).ravel()
+    # As 5040 ordens possíveis dos 7 dias (coluna k = de onde vem o k-ésimo dia):
+    # sortear uma por semana sai bem mais barato que um argsort por semana
+    ordens = np.array(list(permutations(range(7))), dtype=np.int32).T.copy()
+    base = np.arange(n, dtype=np.int32) * 7
+    
+    maiores_global = 0
+    maiores_dia = np.zeros(7)
+    razoes_boot = []
+    for inicio in range(0, reamostragens, LOTE_REAMOSTRAGENS):
+        lote = min(LOTE_REAMOSTRAGENS, reamostragens - inicio)
+        # Permutação dentro de cada semana, um dia da semana por vez
+        sorteio = rng.integers(0, ordens.shape[1], (lote, n), dtype=np.int32)
+        somas = np.empty((lote, 7), dtype=np.complex128)
+        for dia in range(7):
+            posicoes = ordens[dia][sorteio]
+            posicoes += base
+            somas[:, dia] = plano[posicoes].sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            permutadas = somas.real / somas.imag
+        maiores_global += np.sum(permutadas.var(axis=1) >= variancia - 1e-12)
+        maiores_dia += np.sum(np.abs(permutadas - geral) >= np.abs(medias - geral) - 1e-12, axis=0)
+        
+        # Bootstrap: quantas vezes cada semana saiu no sorteio com reposição vira um peso
+        sorteio = rng.integers(0, n, (lote, n)) + (np.arange(lote) * n)[:, None]
+        pesos = np.bincount(sorteio.ravel(), minlength=lote * n).reshape(lote, n).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            razoes_boot.append(_razao_outros((pesos @ valores) / (pesos @ contagens)))
+    
+    ic = _intervalo(np.concatenate(razoes_boot))
+    dias_validos = validos.sum(axis=0)
+    return pd.DataFrame({
+        'teste': 'dias_semana',
+        'grupo': DIAS_SEMANA_PT,
+        'referencia': 'outros dias',
+        'semanas': n,
+        'dias_grupo': dias_validos,
+        'taxa_grupo': medias,
+        'taxa_referencia': (medias.sum() - medias) / 6,
+        'diferenca': medias - (medias.sum() - medias) / 6,
+        'razao': razao,
+        'ic_razao_inf': ic[0],
+        'ic_razao_sup': ic[1],
+        'p_valor': (1 + maiores_dia) / (reamostragens + 1),
+        'p_valor_global': (1 + maiores_global) / (reamostragens + 1),
+        'reamostragens': reamostragens,
+    })
+
+def testar_hipoteses(qtd_por_dia, calendario=None, reamostragens=REAMOSTRAGENS_PADRAO, semente=SEMENTE_PADRAO):
+    """Os dois testes juntos numa tabela (uma linha por grupo testado)."""
+    diario = serie_diaria(qtd_por_dia, calendario)
+    meses = pd.DataFrame([teste_meses_pares(diario, reamostragens, semente)])
+    dias = teste_dias_semana(diario, reamostragens, semente)
+    return pd.concat([meses, dias], ignore_index=True)
+
+def imprimir_meses_pares(resultado):
+    r = resultado
+    print(f"📅 Exposição: {int(r['meses_grupo'])} meses pares ({int(r['dias_grupo']):,} dias) x "
+          f"{int(r['meses_referencia'])} ímpares ({int(r['dias_referencia']):,} dias)")
+    print(f"📊 Transações por dia: pares {r['taxa_grupo']:.2f} x ímpares {r['taxa_referencia']:.2f}")
+    print(f"📏 Diferença: {r['diferenca']:+.2f}/dia (IC {NIVEL_CONFIANCA:.0%}: {r['ic_diferenca_inf']:+.2f} a "
+          f"{r['ic_diferenca_sup']:+.2f}); razão {r['razao']:.3f} ({r['ic_razao_inf']:.3f} a {r['ic_razao_sup']:.3f}); "
+          f"d de Cohen {r['d_cohen']:.2f}")
+    print(f"🎲 Permutação ({int(r['reamostragens']):,} reamostragens): p = {r['p_valor']:.4f}")
+    if r['p_valor'] < ALFA and r['diferenca'] > 0:
+        print("✅ HIPÓTESE CONFIRMADA: meses pares têm mais transações por dia (significativo)")
+    elif r['p_valor'] < ALFA:
+        print("❌ HIPÓTESE REJEITADA: meses ímpares têm mais transações por dia (significativo)")
+    else:
+        print(f"➖ SEM EVIDÊNCIA: a diferença por dia não é significativa (p ≥ {ALFA})")
+
+def imprimir_dias_semana(resultado):
+    tabela = resultado[['grupo', 'taxa_grupo', 'razao', 'ic_razao_inf', 'ic_razao_sup', 'p_valor']].copy()
+    tabela.columns = ['Dia', 'Transacoes_por_dia', 'Razao_vs_outros', 'IC_inf', 'IC_sup', 'p_valor']
+    print(tabela.round(4).to_string(index=False))
+    p_global = resultado['p_valor_global'].iloc[0]
+    print(f"🎲 Permutação dentro das semanas ({int(resultado['reamostragens'].iloc[0]):,} reamostragens, "
+          f"{int(resultado['semanas'].iloc[0]):,} semanas, feriados fora): p global = {p_global:.4f}")
+    if p_global < ALFA:
+        melhor = resultado.loc[resultado['razao'].idxmax()]
+        print(f"✅ Há efeito de dia da semana; o maior é {melhor['grupo']} "
+              f"({melhor['razao']:.3f}x os outros dias, IC {melhor['ic_razao_inf']:.3f} a {melhor['ic_razao_sup']:.3f})")
+    else:
+        print(f"➖ SEM EVIDÊNCIA de diferença entre os dias da semana (p ≥ {ALFA})")
+
+def testar_pasta(processed_path, reamostragens=REAMOSTRAGENS_PADRAO, semente=SEMENTE_PADRAO):
+    """Roda os testes sobre o cubo_diario do ETL e grava testes_hipoteses.csv na mesma pasta."""
+    from cubo_transacoes import ler_cubo
+    
+    cubo = ler_cubo(processed_path)
+    qtd_por_dia = cubo['qtd'].groupby(level='data').sum()
+    resultado = testar_hipoteses(qtd_por_dia, reamostragens=reamostragens, semente=semente)
+    
+    print("🔍 HIPÓTESE DOS MESES PARES")
+    print("="*50)
+    imprimir_meses_pares(resultado.iloc[0])
+    print("\n📈 TRANSAÇÕES POR DIA DA SEMANA")
+    print("="*50)
+    imprimir_dias_semana(resultado.iloc[1:])
+    resultado.to_csv(Path(processed_path) / ARQUIVO_TESTES, index=False, encoding='utf-8-sig')
+    print(f"\n💾 {ARQUIVO_TESTES}")
+    return resultado
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Testes de hipótese sobre o cubo diário do ETL")
+    parser.add_argument('--saida', default=str(Path(__file__).resolve().parent.parent / "dados" / "processed"),
+                        help="pasta do ETL (lê o cubo_diario e grava testes_hipoteses.csv)")
+    parser.add_argument('--reamostragens', type=int, default=REAMOSTRAGENS_PADRAO)
+    parser.add_argument('--semente', type=int, default=SEMENTE_PADRAO)
+    args = parser.parse_args()
+    testar_pasta(args.saida, args.reamostragens, args.semente)
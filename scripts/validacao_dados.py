@@ -0,0 +1,262 @@
+# Validação de qualidade dos dados do BanVic: regras declarativas, checadas de forma vetorizada
+# Autor: Nayara Vieira
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from banvic_schema import ESQUEMAS, ler_tabela
+from dimension_lookup import IndiceDimensao
+
+# Arquivo com as linhas reprovadas (uma linha por linha x regra), gravado na pasta de saída
+ARQUIVO_REJEITADOS = 'rejeitados.csv'
+
+# Limites de valor (em reais). Acima disso o valor é tratado como erro de digitação/carga
+LIMITE_VALOR_TRANSACAO = 1_000_000
+LIMITE_VALOR_PROPOSTA = 10_000_000
+
+# Datas aceitas: nada antes disso nem depois de hoje (com um dia de folga por causa do fuso)
+DATA_MINIMA = pd.Timestamp('1900-01-01')
+FOLGA_FUTURO = pd.Timedelta(days=1)
+
+# Regras por tabela. Tipos de regra:
+# - obrigatorio: colunas que não podem ficar vazias (datas inválidas também viram vazio na leitura)
+# - unico: colunas que não podem repetir (a primeira ocorrência passa, as repetidas são rejeitadas)
+# - referencia: coluna → (tabela, chave) onde o código precisa existir
+# - intervalo: coluna → (mínimo, máximo), inclusive; None deixa o lado aberto
+# - datas: colunas de data que precisam estar entre DATA_MINIMA e hoje
+# - ordem: pares (a, b) em que a <= b quando os dois estão preenchidos
+# - depois_de: coluna → (tabela, chave, coluna da tabela): a data não pode ser de um
+#   dia anterior ao da data na outra tabela (ex.: transação antes da abertura da conta)
+REGRAS = {
+    'transacoes': {
+        'obrigatorio': ['cod_transacao', 'num_conta', 'data_transacao', 'valor_transacao'],
+        'unico': ['cod_transacao'],
+        'referencia': {'num_conta': ('contas', 'num_conta')},
+        'intervalo': {'valor_transacao': (-LIMITE_VALOR_TRANSACAO, LIMITE_VALOR_TRANSACAO)},
+        'datas': ['data_transacao'],
+        'depois_de': {'data_transacao': ('contas', 'num_conta', 'data_abertura')},
+    },
+    'contas': {
+        'obrigatorio': ['num_conta', 'cod_cliente', 'cod_agencia', 'data_abertura'],
+        'unico': ['num_conta'],
+        'referencia': {
+            'cod_cliente': ('clientes', 'cod_cliente'),
+            'cod_agencia': ('agencias', 'cod_agencia'),
+            'cod_colaborador': ('colaboradores', 'cod_colaborador'),
+        },
+        'datas': ['data_abertura', 'data_ultimo_lancamento'],
+        'ordem': [('data_abertura', 'data_ultimo_lancamento')],
+    },
+    'clientes': {
+        'obrigatorio': ['cod_cliente'],
+        'unico': ['cod_cliente'],
+        'datas': ['data_inclusao', 'data_nascimento'],
+    },
+    'agencias': {
+        'obrigatorio': ['cod_agencia'],
+        'unico': ['cod_agencia'],
+        'datas': ['data_abertura'],
+    },
+    'colaboradores': {
+        'obrigatorio': ['cod_colaborador'],
+        'unico': ['cod_colaborador'],
+        'datas': ['data_nascimento'],
+    },
+    'colaborador_agencia': {
+        'obrigatorio': ['cod_colaborador', 'cod_agencia'],
+        'referencia': {
+            'cod_colaborador': ('colaboradores', 'cod_colaborador'),
+            'cod_agencia': ('agencias', 'cod_agencia'),
+        },
+    },
+    'propostas_credito': {
+        'obrigatorio': ['cod_proposta', 'cod_cliente', 'valor_financiamento', 'quantidade_parcelas'],
+        'unico': ['cod_proposta'],
+        'referencia': {
+            'cod_cliente': ('clientes', 'cod_cliente'),
+            'cod_colaborador': ('colaboradores', 'cod_colaborador'),
+        },
+        'intervalo': {
+            'valor_proposta': (0, LIMITE_VALOR_PROPOSTA),
+            'valor_financiamento': (0, LIMITE_VALOR_PROPOSTA),
+            'valor_entrada': (0, LIMITE_VALOR_PROPOSTA),
+            'valor_prestacao': (0, LIMITE_VALOR_PROPOSTA),
+            'taxa_juros_mensal': (0, 1),
+            'quantidade_parcelas': (1, 600),
+            'carencia': (0, 120),
+        },
+        'datas': ['data_entrada_proposta'],
+        'ordem': [('valor_entrada', 'valor_financiamento')],
+    },
+}
+
+# Chave mostrada no arquivo de rejeitados (a primeira coluna do esquema)
+CHAVES = {tabela: next(iter(ESQUEMAS[tabela]['tipos'])) for tabela in REGRAS}
+
+COLUNAS_REJEITADOS = ['tabela', 'linha', 'chave', 'regra', 'coluna', 'valor', 'motivo']
+
+def _datas(serie):
+    """Datas sem fuso (UTC), pra comparar colunas de tabelas diferentes."""
+    if serie.dt.tz is not None:
+        return serie.dt.tz_convert('UTC').dt.tz_localize(None)
+    return serie
+
+def _falhas(df, regras, tabelas, indices, agora):
+    """Gera (regra, coluna, máscara de linhas reprovadas, motivo) para cada regra da tabela."""
+    for coluna in regras.get('obrigatorio', []):
+        if coluna in df.columns:
+            yield 'obrigatorio', coluna, df[coluna].isna().to_numpy(), "vazio ou inválido"
+    
+    for coluna in regras.get('unico', []):
+        if coluna in df.columns:
+            repetida = df[coluna].duplicated(keep='first') & df[coluna].notna()
+            yield 'unico', coluna, repetida.to_numpy(), f"{coluna} repetido"
+    
+    for coluna, (tabela, chave) in regras.get('referencia', {}).items():
+        if coluna in df.columns and tabela in tabelas:
+            posicoes = indices(tabela, chave).posicoes(df[coluna])
+            faltando = (posicoes < 0) & df[coluna].notna().to_numpy()
+            yield 'referencia', coluna, faltando, f"não existe em {tabela}.{chave}"
+    
+    for coluna, (minimo, maximo) in regras.get('intervalo', {}).items():
+        if coluna not in df.columns:
+            continue
+        valores = df[coluna].to_numpy(dtype=np.float64, na_value=np.nan)
+        fora = np.isinf(valores)
+        if minimo is not None:
+            fora |= valores < minimo
+        if maximo is not None:
+            fora |= valores > maximo
+        yield 'intervalo', coluna, fora, f"fora de [{minimo}, {maximo}]"
+    
+    for coluna in regras.get('datas', []):
+        if coluna in df.columns:
+            datas = _datas(df[coluna])
+            fora = ((datas < DATA_MINIMA) | (datas > agora + FOLGA_FUTURO)).to_numpy()
+            yield 'datas', coluna, fora, f"data fora de {DATA_MINIMA.date()} a hoje"
+    
+    for antes, depois in regras.get('ordem', []):
+        if antes in df.columns and depois in df.columns:
+            a, b = df[antes], df[depois]
+            if pd.api.types.is_datetime64_any_dtype(a):
+                a, b = _datas(a), _datas(b)
+            invertida = (a > b).to_numpy(dtype=bool, na_value=False)
+            yield 'ordem', antes, invertida, f"{antes} maior que {depois}"
+    
+    for coluna, (tabela, chave, coluna_ref) in regras.get('depois_de', {}).items():
+        if coluna not in df.columns or chave not in df.columns or tabela not in tabelas:
+            continue
+        indice = indices(tabela, chave)
+        if coluna_ref not in indice.df.columns:
+            continue
+        posicoes = indice.posicoes(df[chave])
+        referencia = pd.Series(indice.valores(coluna_ref).take(posicoes, allow_fill=True), copy=False)
+        # Compara por dia: a hora da abertura e a da transação podem estar em fusos diferentes
+        dia = _datas(df[coluna]).dt.normalize().to_numpy()
+        dia_ref = _datas(referencia).dt.normalize().to_numpy()
+        antes = dia < dia_ref
+        yield 'depois_de', coluna, antes, f"anterior a {tabela}.{coluna_ref}"
+
+def validar_tabela(nome, df, tabelas, agora=None, cache_indices=None):
+    """
+    Checa as REGRAS de uma tabela. `tabelas` (nome → DataFrame) são as outras
+    tabelas usadas nas regras de referência. Retorna um DataFrame com uma linha
+    por (linha reprovada, regra), nas COLUNAS_REJEITADOS; `linha` é a linha no CSV
+    (o cabeçalho é a linha 1).
+    """
+    agora = pd.Timestamp.now() if agora is None else agora
+    cache_indices = {} if cache_indices is None else cache_indices
+
+    def indices(tabela, chave):
+        if (tabela, chave) not in cache_indices:
+            cache_indices[(tabela, chave)] = IndiceDimensao(tabelas[tabela], chave, nome=f'{tabela}.{chave}')
+        return cache_indices[(tabela, chave)]
+    
+    partes = []
+    chave = CHAVES.get(nome)
+    for regra, coluna, mascara, motivo in _falhas(df, REGRAS.get(nome, {}), tabelas, indices, agora):
+        if not mascara.any():
+            continue
+        # Só as linhas reprovadas viram texto; o resto da checagem fica em arrays
+        reprovadas = df.loc[mascara]
+        partes.append(pd.DataFrame({
+            'tabela': nome,
+            'linha': np.flatnonzero(mascara) + 2,
+            'chave': reprovadas[chave].astype(str).to_numpy() if chave in df.columns else '',
+            'regra': regra,
+            'coluna': coluna,
+            'valor': reprovadas[coluna].astype(str).to_numpy(),
+            'motivo': motivo,
+        }))
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS_REJEITADOS)
+    return pd.concat(partes, ignore_index=True)
+
+def validar_tabelas(tabelas, agora=None):
+    """Valida todas as tabelas de `tabelas` (nome → DataFrame) e junta os rejeitados."""
+    cache_indices = {}
+    resultados = [validar_tabela(nome, df, tabelas, agora, cache_indices)
+                  for nome, df in tabelas.items() if nome in REGRAS]
+    resultados = [r for r in resultados if not r.empty]
+    if not resultados:
+        return pd.DataFrame(columns=COLUNAS_REJEITADOS)
+    return pd.concat(resultados, ignore_index=True)
+
+def ler_tabelas(data_path, tabelas=None):
+    """
+    Lê os CSVs de `data_path` que têm regras e ainda não estão em `tabelas`
+    (quem já leu alguma tabela, como o ETL, passa ela pronta).
+    """
+    data_path = Path(data_path)
+    tabelas = dict(tabelas or {})
+    for nome in REGRAS:
+        arquivo = data_path / f'{nome}.csv'
+        if nome not in tabelas and arquivo.exists():
+            tabelas[nome] = ler_tabela(arquivo)
+    return tabelas
+
+def linhas_rejeitadas(rejeitados, tabela):
+    """Posições (0, 1, 2...) das linhas de `tabela` reprovadas em pelo menos uma regra."""
+    linhas = rejeitados.loc[rejeitados['tabela'] == tabela, 'linha'].to_numpy(dtype=np.int64)
+    return np.unique(linhas) - 2
+
+def salvar_rejeitados(rejeitados, pasta):
+    """Grava o arquivo de rejeitados (sempre, mesmo vazio, pra não sobrar o de uma execução anterior)."""
+    caminho = Path(pasta) / ARQUIVO_REJEITADOS
+    rejeitados.to_csv(caminho, index=False, encoding='utf-8-sig')
+    return caminho
+
+def resumo_validacao(rejeitados, tabelas):
+    """Linhas de texto com as falhas por tabela/regra/coluna."""
+    if rejeitados.empty:
+        return [f"✅ Nenhuma falha nas regras ({sum(len(df) for df in tabelas.values()):,} linhas checadas)"]
+    linhas = []
+    contagem = rejeitados.groupby(['tabela', 'regra', 'coluna', 'motivo'], sort=False).size()
+    for (tabela, regra, coluna, motivo), qtd in contagem.items():
+        linhas.append(f"⚠️ {tabela}.{coluna} ({regra}): {qtd:,} linhas — {motivo}")
+    return linhas
+
+def validar_pasta(data_path, pasta_saida, tabelas=None):
+    """Lê (o que faltar), valida, grava o rejeitados.csv em `pasta_saida` e retorna os rejeitados."""
+    tabelas = ler_tabelas(data_path, tabelas)
+    rejeitados = validar_tabelas(tabelas)
+    Path(pasta_saida).mkdir(parents=True, exist_ok=True)
+    caminho = salvar_rejeitados(rejeitados, pasta_saida)
+    for linha in resumo_validacao(rejeitados, tabelas):
+        print(linha)
+    print(f"💾 {caminho.name}: {len(rejeitados):,} falhas")
+    return rejeitados
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Valida os CSVs do BanVic e grava as linhas reprovadas")
+    parser.add_argument('--entrada', default=str(Path(__file__).resolve().parent.parent / "dados" / "raw" / "banvic_data"),
+                        help="pasta com os CSVs originais do BanVic")
+    parser.add_argument('--saida', default=str(Path(__file__).resolve().parent.parent / "dados" / "processed"),
+                        help="pasta onde o rejeitados.csv é gravado")
+    args = parser.parse_args()
+    
+    print("🔎 VALIDAÇÃO DOS DADOS BANVIC")
+    print("="*60)
+    validar_pasta(args.entrada, args.saida)